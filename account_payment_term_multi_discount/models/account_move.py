@@ -4,6 +4,24 @@ from odoo import models, fields, _
 class AccountMove(models.Model):
     _inherit = 'account.move'
 
+    def _get_applicable_early_discount(self, payment_date):
+        """
+        Applicable multi-discount for a payment on payment_date: the one with
+        the highest percentage among those whose discount date is not past.
+
+        :return: tuple (discount record or False, discount date or False)
+        """
+        self.ensure_one()
+        invoice_date = self.invoice_date or fields.Date.context_today(self)
+        possible_discounts = []
+        for discount in self.invoice_payment_term_id.discount_ids:
+            discount_date = discount._get_discount_date(invoice_date)
+            if payment_date <= discount_date:
+                possible_discounts.append((discount, discount_date))
+        if not possible_discounts:
+            return False, False
+        return max(possible_discounts, key=lambda x: x[0].discount_percentage)
+
     def _is_eligible_for_early_payment_discount(self, currency, reference_date):
         """Extend to support multiple early payment discounts"""
         self.ensure_one()
@@ -76,17 +94,7 @@ class AccountMove(models.Model):
             
         # Determine applicable discount
         payment_date = self.env.context.get('payment_date') or fields.Date.context_today(self)
-        invoice_date = self.invoice_date or fields.Date.context_today(self)
-        
-        applicable_discount = False
-        possible_discounts = []
-        for discount in self.invoice_payment_term_id.discount_ids:
-            discount_date = discount._get_discount_date(invoice_date)
-            if payment_date <= discount_date:
-                possible_discounts.append(discount)
-        
-        if possible_discounts:
-            applicable_discount = max(possible_discounts, key=lambda d: d.discount_percentage)
+        applicable_discount, _discount_date = self._get_applicable_early_discount(payment_date)
             
         dynamic_percentage = applicable_discount.discount_percentage if applicable_discount else 0.0
         standard_percentage = self.invoice_payment_term_id.discount_percentage or 0.0
@@ -133,7 +141,6 @@ class AccountMove(models.Model):
             total_original_gross = sum(l.amount_currency for l in term_lines)
             
             # Calculate Dynamic Original Discount based on current date (Context Today)
-            invoice_date = self.invoice_date or fields.Date.context_today(self)
             payment_date = fields.Date.context_today(self)
             
             # Find applicable discount percentage and date
@@ -142,13 +149,8 @@ class AccountMove(models.Model):
             
             # Check Multi-Discount
             if self.invoice_payment_term_id.discount_ids:
-                possible_discounts = []
-                for discount in self.invoice_payment_term_id.discount_ids:
-                    discount_date = discount._get_discount_date(invoice_date)
-                    if payment_date <= discount_date:
-                        possible_discounts.append((discount, discount_date))
-                if possible_discounts:
-                    best_discount, best_discount_date = max(possible_discounts, key=lambda x: x[0].discount_percentage)
+                best_discount, best_discount_date = self._get_applicable_early_discount(payment_date)
+                if best_discount:
                     discount_percentage = best_discount.discount_percentage
             # Check Single Standard Discount
             elif self.invoice_payment_term_id.early_discount:
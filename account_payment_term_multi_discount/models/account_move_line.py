@@ -13,17 +13,8 @@ class AccountMoveLine(models.Model):
 
         payment_date = payment_date or fields.Date.context_today(self)
         
-        # Find applicable discount
-        applicable_discount = False
-        possible_discounts = []
-        for discount in move.invoice_payment_term_id.discount_ids:
-            discount_date = discount._get_discount_date(move.invoice_date or fields.Date.context_today(self))
-            if payment_date <= discount_date:
-                possible_discounts.append(discount)
-        
-        if possible_discounts:
-            # Pick the one with highest percentage
-            applicable_discount = max(possible_discounts, key=lambda d: d.discount_percentage)
+        # Find applicable discount (the one with highest percentage)
+        applicable_discount, _discount_date = move._get_applicable_early_discount(payment_date)
         
         if not applicable_discount:
             # No discount applicable. 
@@ -13,23 +13,38 @@ class PaymentGatewayController(http.Controller):
 
     @http.route(
         "/payment/gateway/get_bank_list",
-        type="jsonrpc",
+        type="http",
         auth="public",
+        methods=["GET"],
         website=True,
-        csrf=True,
+        sitemap=False,
     )
     def get_rutavity_gateway_bank_list(self):
         """
         Get the list of available banks.
 
+        The list is served from the server-side cache with an ETag and a
+        Cache-Control max-age matching the remaining TTL, so browsers reuse it
+        and revalidate it with If-None-Match.
+
         :return: JSON response with the list of available banks
-        :rtype: dict
+        :rtype: werkzeug.wrappers.Response
         """
         try:
             gateway = request.env["payment.gateway"]
-            return gateway.get_bank_list()
+            response, etag, max_age = gateway.get_bank_list_with_cache_info()
         except Exception as e:
-            return {"error": str(e)}
+            return request.make_json_response(
+                {"error": str(e)}, headers=[("Cache-Control", "no-store")]
+            )
+
+        headers = [
+            ("ETag", '"%s"' % etag),
+            ("Cache-Control", "public, max-age=%d" % max_age),
+        ]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response("", headers=headers, status=304)
+        return request.make_json_response(response, headers=headers)
 
     @http.route(
         "/payment/gateway/check_pending_transactions",
@@ -59,31 +74,16 @@ class PaymentGatewayController(http.Controller):
             if not isinstance(document_ids, list) or not document_ids:
                 return {"success": False, "error": "Invalid document IDs"}
 
-            # Get the documents (sale orders or invoices)
-            documents = request.env[document_model].sudo().browse(document_ids)
-
-            if not documents.exists():
-                return {
-                    "success": True,
-                    "has_pending": False,
-                }
-
-            if not documents.transaction_ids:
-                return {
-                    "success": True,
-                    "has_pending": False,
-                }
-
-            # Filter pending transactions
-            pending_transactions = documents.transaction_ids.filtered(
-                lambda tx: (
-                    tx.state in ["pending", "draft"] and tx.gateway_status == "3"
-                )
+            # Indexed lookup of the pending transactions of the documents
+            has_pending = request.env[
+                "payment.transaction"
+            ]._has_rutavity_pending_transactions(
+                document_model, [int(document_id) for document_id in document_ids]
             )
 
             return {
                 "success": True,
-                "has_pending": bool(pending_transactions),
+                "has_pending": has_pending,
             }
         except Exception as e:
             _logger.error(
@@ -143,17 +143,14 @@ class PaymentGatewayController(http.Controller):
             if not transaction_id:
                 raise ValidationError(_("Transaction ID not found"))
 
-            # Search for existing transaction by ID
-            transaction = (
-                request.env["payment.transaction"].sudo().browse(int(transaction_id))
-            )
-
-            # Check if the transaction exists
-            if not transaction.exists():
-                raise ValidationError(_("Transaction not found"))
+            # Reject forged confirmations before queuing them
+            gateway = request.env["payment.gateway"].sudo()
+            if not gateway.validate_transaction_signature(post.get("x_signature"), post):
+                raise ValidationError(_("Invalid signature"))
 
-            # Process the transaction
-            transaction._process("rutavity", post)
+            # Queue the confirmation (duplicates are ignored); the payment and
+            # reconciliation work is done in background by the inbox cron
+            request.env["payment.rutavity.notification"].sudo()._enqueue(post)
 
             return request.make_json_response(
                 {"success": True, "message": _("Transaction processed successfully")}
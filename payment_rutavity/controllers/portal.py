@@ -3,12 +3,10 @@ from odoo.http import request
 from odoo.exceptions import AccessError
 from odoo.addons.account_payment.controllers import portal as account_payment_portal
 from odoo.addons.payment.controllers.portal import PaymentPortal
-from datetime import datetime, timedelta
 
 
 class PortalAccount(account_payment_portal.PortalAccount):
-    # Rate limiting: track requests per IP
-    _rate_limit_cache = {}
+    # Rate limiting: requests per IP (see payment.rutavity.rate.limit)
     _max_requests_per_minute = 10
     _max_invoices_per_request = 20
 
@@ -85,6 +83,7 @@ class PortalAccount(account_payment_portal.PortalAccount):
         values.update(
             {
                 "invoices": invoices,
+                "payment_summary": invoices._get_payment_summary(),
                 "invoice_count": len(invoices),
                 "page_title": _(
                     "Payment for %(invoice_count)s %(invoice_singular)s",
@@ -288,14 +287,15 @@ class PortalAccount(account_payment_portal.PortalAccount):
                     "error": _("All invoices found are already paid or cancelled"),
                 }
 
-            # Prepare invoice data for response
+            # Prepare invoice data for response (one payment summary for all invoices)
+            payment_summary = payable_invoices._get_payment_summary()
             invoice_data = []
             for invoice in payable_invoices:
                 invoice_data.append(
                     {
                         "id": invoice.id,
                         "name": invoice.name,
-                        "amount_due": invoice._get_invoice_next_payment_values().get('amount_due'),
+                        "amount_due": payment_summary[invoice.id].get('amount_due'),
                         "currency": invoice.currency_id.name,
                         "currency_symbol": invoice.currency_id.symbol,
                     }
@@ -309,7 +309,7 @@ class PortalAccount(account_payment_portal.PortalAccount):
                 "success": True,
                 "invoices": invoice_data,
                 "invoice_count": len(payable_invoices),
-                "total_amount": sum(inv._get_invoice_next_payment_values().get('amount_due') for inv in payable_invoices),
+                "total_amount": sum(data["amount_due"] for data in invoice_data),
                 "payment_url": payment_url,
             }
 
@@ -327,60 +327,18 @@ class PortalAccount(account_payment_portal.PortalAccount):
     def _check_rate_limit(self, client_ip):
         """
         Check if the client IP has exceeded rate limit.
-        Uses a simple in-memory cache with timestamp tracking.
+        Uses a token bucket per IP (burst of _max_requests_per_minute requests,
+        refilled at _max_requests_per_minute per minute) shared by all workers.
 
         :param str client_ip: Client IP address
         :return: True if request is allowed, False if rate limit exceeded
         :rtype: bool
         """
-        current_time = datetime.now()
-        
-        # Clean old entries (older than 1 minute)
-        self._clean_rate_limit_cache(current_time)
-        
-        # Get or initialize IP tracking
-        if client_ip not in self._rate_limit_cache:
-            self._rate_limit_cache[client_ip] = []
-        
-        # Get recent requests for this IP
-        ip_requests = self._rate_limit_cache[client_ip]
-        
-        # Count requests in last minute
-        one_minute_ago = current_time - timedelta(minutes=1)
-        recent_requests = [req for req in ip_requests if req > one_minute_ago]
-        
-        # Check if limit exceeded
-        if len(recent_requests) >= self._max_requests_per_minute:
-            return False
-        
-        # Add current request
-        recent_requests.append(current_time)
-        self._rate_limit_cache[client_ip] = recent_requests
-        
-        return True
-
-    def _clean_rate_limit_cache(self, current_time):
-        """
-        Clean expired entries from rate limit cache.
-        Removes entries older than 2 minutes.
-
-        :param datetime current_time: Current timestamp
-        """
-        two_minutes_ago = current_time - timedelta(minutes=2)
-        
-        # Remove expired IPs
-        expired_ips = []
-        for ip, requests in self._rate_limit_cache.items():
-            # Keep only recent requests
-            recent = [req for req in requests if req > two_minutes_ago]
-            if recent:
-                self._rate_limit_cache[ip] = recent
-            else:
-                expired_ips.append(ip)
-        
-        # Clean up expired IPs
-        for ip in expired_ips:
-            del self._rate_limit_cache[ip]
+        return request.env["payment.rutavity.rate.limit"].sudo()._consume(
+            client_ip,
+            self._max_requests_per_minute,
+            self._max_requests_per_minute / 60.0,
+        )
 
     def _get_account_searchbar_filters(self):
         """
@@ -2,4 +2,7 @@ from . import payment_provider
 from . import payment_transaction
 from . import payment_method
 from . import payment_gateway
-from . import res_partner
\ No newline at end of file
+from . import payment_rutavity_notification
+from . import payment_rutavity_rate_limit
+from . import res_partner
+from . import account_move
\ No newline at end of file
@@ -0,0 +1,54 @@
+from odoo import models
+
+
+class AccountMove(models.Model):
+    _inherit = "account.move"
+
+    def _get_payment_summary(self):
+        """
+        Batched payment summary of the invoices.
+
+        Returns the next payment values of each invoice (next due date, amount
+        due, applicable early payment discount and due date extension state),
+        computed once per invoice. The payment term lines, multi-discounts and
+        extension fields are prefetched for the whole recordset first, so each
+        invoice is computed from the cache.
+
+        :return: dict mapping invoice id to its next payment values
+        :rtype: dict
+        """
+        self.fetch([
+            "move_type",
+            "state",
+            "name",
+            "currency_id",
+            "invoice_date",
+            "invoice_date_due",
+            "invoice_payment_term_id",
+            "amount_untaxed",
+            "amount_residual",
+            "payment_state",
+            "extended_due_date",
+            "extension_keep_discount",
+        ])
+        self.line_ids.fetch([
+            "display_type",
+            "account_id",
+            "date",
+            "date_maturity",
+            "balance",
+            "amount_currency",
+            "amount_residual",
+            "amount_residual_currency",
+            "discount_date",
+            "discount_amount_currency",
+            "discount_balance",
+            "reconciled",
+        ])
+        self.invoice_payment_term_id.discount_ids.fetch([
+            "discount_percentage",
+            "discount_days",
+            "delay_type",
+            "days_next_month",
+        ])
+        return {move.id: move._get_invoice_next_payment_values() for move in self}
@@ -1,13 +1,29 @@
+import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import hashlib
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
 from odoo import api, models, _
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
 from typing import Literal
 
 _logger = logging.getLogger(__name__)
 
+# Per-worker (process) state shared by every request served by the worker:
+# - pooled HTTP sessions keyed by pool size, so connections are kept alive
+# - authentication tokens keyed by database and credentials
+_http_sessions = {}
+_http_sessions_lock = threading.Lock()
+_token_cache = {}
+_token_refresh_locks = {}
+_token_refresh_locks_lock = threading.Lock()
+# - PSE bank list keyed by database: (response, fetched_at, etag)
+_bank_list_cache = {}
+
 
 class PaymentGateway(models.AbstractModel):
     """
@@ -25,6 +41,21 @@ class PaymentGateway(models.AbstractModel):
     TOKEN_EXPIRATION_MINUTES = 20
     TOKEN_SAFETY_MARGIN_MINUTES = 2  # Refresh token 2 minutes before expiration
     GET_BANK_LIST_ENDPOINT = "payment/pse/banks"
+    TRANSACTION_VALIDATION_URL = "https://secure.epayco.co/validation/v1/reference/%s"
+
+    # HTTP connection pool defaults (overridable with system parameters)
+    HTTP_POOL_SIZE = 10
+    HTTP_CONNECT_TIMEOUT = 5
+    HTTP_READ_TIMEOUT = 30
+
+    # PSE bank list cache (TTL overridable with payment_rutavity.bank_list_ttl)
+    BANK_LIST_TTL_SECONDS = 3600
+    BANK_LIST_PARAM = "payment_rutavity.pse_bank_list"
+    BANK_LIST_FETCHED_PARAM = "payment_rutavity.pse_bank_list_fetched_at"
+
+    TOKEN_PARAM = "payment_rutavity.payment_gateway_token"
+    TOKEN_EXPIRATION_PARAM = "payment_rutavity.payment_gateway_token_expiration"
+    TOKEN_CREDENTIALS_PARAM = "payment_rutavity.payment_gateway_token_credentials"
 
     def _get_credentials(self):
         """
@@ -46,20 +77,159 @@ class PaymentGateway(models.AbstractModel):
 
         return username, password
 
-    def _get_stored_token_data(self):
+    def _get_http_pool_size(self):
+        """
+        Get the size of the HTTP connection pool (``payment_rutavity.http_pool_size``).
+
+        :return: maximum number of kept-alive connections per host
+        """
+        return int(
+            self.env["ir.config_parameter"].sudo().get_param(
+                "payment_rutavity.http_pool_size", self.HTTP_POOL_SIZE
+            )
+        )
+
+    def _get_http_session(self):
+        """
+        Get the pooled HTTP session of the current worker.
+
+        The session keeps TCP/TLS connections alive between requests, so PSE
+        transactions and bank-list fetches do not pay a new handshake each time.
+
+        :return: requests.Session shared by the worker
+        """
+        pool_size = self._get_http_pool_size()
+        session = _http_sessions.get(pool_size)
+        if session is None:
+            with _http_sessions_lock:
+                session = _http_sessions.get(pool_size)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=pool_size, pool_maxsize=pool_size
+                    )
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    _http_sessions[pool_size] = session
+        return session
+
+    def _get_http_timeout(self):
+        """
+        Get the (connect, read) timeout of the requests to the payment gateway.
+
+        Read from ``payment_rutavity.http_connect_timeout`` and
+        ``payment_rutavity.http_read_timeout`` (seconds).
+
+        :return: tuple (connect_timeout, read_timeout)
+        """
+        IrConfigParam = self.env["ir.config_parameter"].sudo()
+        return (
+            float(IrConfigParam.get_param(
+                "payment_rutavity.http_connect_timeout", self.HTTP_CONNECT_TIMEOUT
+            )),
+            float(IrConfigParam.get_param(
+                "payment_rutavity.http_read_timeout", self.HTTP_READ_TIMEOUT
+            )),
+        )
+
+    def _get_worker_cache_key(self):
+        """
+        Key of the in-memory caches (token and bank list) of the worker.
+
+        :return: database name
+        """
+        return self.env.cr.dbname
+
+    def _get_credentials_hash(self):
+        """
+        Hash of the current credentials, so a token obtained with other
+        credentials is never reused.
+
+        :return: hexadecimal digest
+        """
+        username, password = self._get_credentials()
+        return hashlib.sha256(f"{username}:{password}".encode()).hexdigest()[:32]
+
+    def _get_token_cache_key(self):
+        """
+        Key of the in-memory authentication token of the worker.
+
+        :return: tuple (database name, credentials hash)
+        """
+        return self._get_worker_cache_key(), self._get_credentials_hash()
+
+    def _read_system_params(self, *keys, cr=None):
+        """
+        Read system parameters with a direct query, bypassing the parameter
+        cache, so values committed by another worker are seen right away.
+
+        :param keys: parameter keys
+        :param cr: cursor to read with (default: the request cursor)
+        :return: dict {key: value} of the parameters found
+        """
+        cr = cr or self.env.cr
+        cr.execute(SQL(
+            "SELECT key, value FROM ir_config_parameter WHERE key IN %s",
+            tuple(keys),
+        ))
+        return dict(cr.fetchall())
+
+    def _store_system_params(self, values):
+        """
+        Store system parameters in their own transaction and without
+        ``set_param``, so other workers can read them right away and the
+        registry cache of every worker is not invalidated on each write.
+
+        :param values: dict {key: value}
+        """
+        with self.env.registry.cursor() as cr:
+            cr.execute(SQL(
+                """
+                INSERT INTO ir_config_parameter (key, value, create_uid, create_date, write_uid, write_date)
+                SELECT key, value, %(uid)s, (now() AT TIME ZONE 'UTC'), %(uid)s, (now() AT TIME ZONE 'UTC')
+                  FROM unnest(%(keys)s::varchar[], %(values)s::text[]) AS p(key, value)
+                ON CONFLICT (key) DO UPDATE
+                   SET value = EXCLUDED.value,
+                       write_uid = EXCLUDED.write_uid,
+                       write_date = EXCLUDED.write_date
+                """,
+                keys=list(values),
+                values=list(values.values()),
+                uid=self.env.uid,
+            ))
+
+    def _delete_system_params(self, keys):
+        """
+        Delete system parameters in their own transaction, like
+        ``_store_system_params`` writes them, so both never wait on each other
+        from different transactions.
+
+        :param keys: parameter keys
+        """
+        with self.env.registry.cursor() as cr:
+            cr.execute(SQL(
+                "DELETE FROM ir_config_parameter WHERE key IN %s",
+                tuple(keys),
+            ))
+
+    def _get_stored_token_data(self, cr=None):
         """
         Retrieve stored token and expiration time from database.
 
+        :param cr: cursor to read with (default: the request cursor)
         :return: tuple (token, expiration_datetime) or (None, None) if not found
+            or obtained with other credentials
         """
-        IrConfigParam = self.env["ir.config_parameter"].sudo()
-        token = IrConfigParam.get_param("payment_rutavity.payment_gateway_token")
-        expiration_str = IrConfigParam.get_param(
-            "payment_rutavity.payment_gateway_token_expiration"
+        values = self._read_system_params(
+            self.TOKEN_PARAM, self.TOKEN_EXPIRATION_PARAM, self.TOKEN_CREDENTIALS_PARAM, cr=cr
         )
+        token = values.get(self.TOKEN_PARAM)
+        expiration_str = values.get(self.TOKEN_EXPIRATION_PARAM)
 
         if not token or not expiration_str:
             return None, None
+        if values.get(self.TOKEN_CREDENTIALS_PARAM) != self._get_credentials_hash():
+            return None, None
 
         try:
             expiration = datetime.fromisoformat(expiration_str)
@@ -75,12 +245,11 @@ class PaymentGateway(models.AbstractModel):
         :param token: authentication token from payment gateway
         :param expiration_datetime: datetime when token expires
         """
-        IrConfigParam = self.env["ir.config_parameter"].sudo()
-        IrConfigParam.set_param("payment_rutavity.payment_gateway_token", token)
-        IrConfigParam.set_param(
-            "payment_rutavity.payment_gateway_token_expiration",
-            expiration_datetime.isoformat(),
-        )
+        self._store_system_params({
+            self.TOKEN_PARAM: token,
+            self.TOKEN_EXPIRATION_PARAM: expiration_datetime.isoformat(),
+            self.TOKEN_CREDENTIALS_PARAM: self._get_credentials_hash(),
+        })
         _logger.info(
             "Payment gateway token stored successfully, expires at %s",
             expiration_datetime,
@@ -116,10 +285,10 @@ class PaymentGateway(models.AbstractModel):
         _logger.info("Authenticating with payment gateway API at %s", url)
 
         try:
-            response = requests.post(
+            response = self._get_http_session().post(
                 url,
                 auth=(username, password),
-                timeout=30,
+                timeout=self._get_http_timeout(),
                 headers={"Content-Type": "application/json"},
             )
 
@@ -166,20 +335,57 @@ class PaymentGateway(models.AbstractModel):
         """
         Get a valid authentication token, using cached token if available or authenticating if needed.
 
+        Lookup order: worker memory, then database (token refreshed by another
+        worker), then authentication. Both caches are bound to the credentials,
+        so a token of the previous credentials is never served after a change.
+
+        The refresh is single-flight: the threads of a worker wait on a lock,
+        and the workers wait on a database advisory lock held in its own
+        transaction. The stored token is read again once the lock is acquired,
+        so only one worker of the whole system authenticates at expiry.
+
         :return: valid authentication token
         """
-        # Check if we have a valid stored token
-        token, expiration = self._get_stored_token_data()
-
+        cache_key = self._get_token_cache_key()
+        token, expiration = _token_cache.get(cache_key, (None, None))
         if token and self._is_token_valid(expiration):
-            _logger.info(
-                "Using cached payment gateway token (expires at %s)", expiration
-            )
             return token
 
-        # Token is expired or not found, authenticate
-        _logger.info("Token expired or not found, authenticating with payment gateway")
-        return self._authenticate()
+        with _token_refresh_locks_lock:
+            refresh_lock = _token_refresh_locks.setdefault(cache_key, threading.Lock())
+
+        with refresh_lock:
+            # Another thread may have refreshed the token while we waited
+            token, expiration = _token_cache.get(cache_key, (None, None))
+            if token and self._is_token_valid(expiration):
+                return token
+
+            # Serialize the refresh between workers; released when the lock transaction ends
+            with self.env.registry.cursor() as lock_cr:
+                lock_cr.execute(SQL(
+                    "SELECT pg_advisory_xact_lock(hashtext(%s))",
+                    "payment_rutavity.token:%s:%s" % cache_key,
+                ))
+
+                # Check if we have a valid stored token, with a snapshot taken after
+                # the lock so the token stored by the previous holder is seen
+                with self.env.registry.cursor() as read_cr:
+                    token, expiration = self._get_stored_token_data(cr=read_cr)
+                if token and self._is_token_valid(expiration):
+                    _logger.info(
+                        "Using stored payment gateway token (expires at %s)", expiration
+                    )
+                    _token_cache[cache_key] = (token, expiration)
+                    return token
+
+                # Token is expired or not found, authenticate (the token is stored
+                # and committed in its own transaction before the lock is released)
+                _logger.info("Token expired or not found, authenticating with payment gateway")
+                token = self._authenticate()
+                _token_cache[cache_key] = (
+                    token, datetime.now() + timedelta(minutes=self.TOKEN_EXPIRATION_MINUTES)
+                )
+                return token
 
     @api.model
     def validate_transaction_signature(self, signature: str, data: dict):
@@ -267,8 +473,12 @@ class PaymentGateway(models.AbstractModel):
         _logger.info("Making %s request to payment gateway: %s", method, url)
 
         try:
-            response = requests.request(
-                method=method, url=url, json=data, headers=request_headers, timeout=30
+            response = self._get_http_session().request(
+                method=method,
+                url=url,
+                json=data,
+                headers=request_headers,
+                timeout=self._get_http_timeout(),
             )
 
             if response.status_code in (200, 201):
@@ -291,23 +501,188 @@ class PaymentGateway(models.AbstractModel):
                 _("Error connecting to payment gateway API: %s"), str(e)
             )
 
+    @api.model
+    def get_transactions_status(self, references):
+        """
+        Get the current status of several transactions from the payment gateway.
+
+        The requests are sent in parallel over the pooled session (at most one
+        per pooled connection). Transactions whose status cannot be read are
+        left out of the result.
+
+        :param references: ePayco references (x_ref_payco) of the transactions
+        :return: dict {reference: transaction data} with the same keys as the
+            confirmation data (x_cod_response, x_signature, x_extra1, ...)
+        :rtype: dict
+        """
+        if not references:
+            return {}
+
+        session = self._get_http_session()
+        timeout = self._get_http_timeout()
+
+        def fetch(reference):
+            # Runs in a worker thread: only HTTP here, no ORM access
+            try:
+                response = session.get(
+                    self.TRANSACTION_VALIDATION_URL % reference, timeout=timeout
+                )
+                response_data = response.json() if response.status_code == 200 else {}
+            except (requests.exceptions.RequestException, ValueError) as e:
+                _logger.warning("Could not read status of transaction %s: %s", reference, e)
+                return reference, None
+            if not response_data.get("success") or not response_data.get("data"):
+                return reference, None
+            return reference, response_data["data"]
+
+        max_workers = min(self._get_http_pool_size(), len(references))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(fetch, references)
+        return {reference: data for reference, data in results if data}
+
     @api.model
     def clear_token_cache(self):
         """
         Clear stored token from cache.
 
-        Useful for testing or forcing re-authentication.
+        Useful for testing or forcing re-authentication. The stored token is
+        deleted in its own transaction, like it is stored.
         """
-        IrConfigParam = self.env["ir.config_parameter"].sudo()
-        IrConfigParam.set_param("payment_rutavity.payment_gateway_token", False)
-        IrConfigParam.set_param(
-            "payment_rutavity.payment_gateway_token_expiration", False
-        )
+        dbname = self._get_worker_cache_key()
+        for cache_key in [key for key in list(_token_cache) if key[0] == dbname]:
+            _token_cache.pop(cache_key, None)
+        self._delete_system_params([
+            self.TOKEN_PARAM, self.TOKEN_EXPIRATION_PARAM, self.TOKEN_CREDENTIALS_PARAM,
+        ])
         _logger.info("Payment gateway token cache cleared")
 
+    def _get_bank_list_ttl(self):
+        """
+        Get the time to live of the cached bank list.
+
+        :return: TTL in seconds
+        """
+        return int(
+            self.env["ir.config_parameter"].sudo().get_param(
+                "payment_rutavity.bank_list_ttl", self.BANK_LIST_TTL_SECONDS
+            )
+        )
+
+    def _is_bank_list_fresh(self, fetched_at, ttl):
+        """
+        Check if a cached bank list is younger than the TTL.
+
+        :param fetched_at: datetime when the list was fetched
+        :param ttl: TTL in seconds
+        :return: True if the list is still fresh, False otherwise
+        """
+        return datetime.now() - fetched_at < timedelta(seconds=ttl)
+
+    def _get_cached_bank_list(self, ttl):
+        """
+        Get the cached bank list from worker memory while it is fresh, otherwise
+        from database, where another worker or the cron may have stored a newer
+        list.
+
+        :param ttl: TTL in seconds
+        :return: tuple (response, fetched_at, etag) or (None, None, None) if not cached
+        """
+        cache_key = self._get_worker_cache_key()
+        cached = _bank_list_cache.get(cache_key)
+        if cached and self._is_bank_list_fresh(cached[1], ttl):
+            return cached
+
+        values = self._read_system_params(self.BANK_LIST_PARAM, self.BANK_LIST_FETCHED_PARAM)
+        if not values.get(self.BANK_LIST_PARAM) or not values.get(self.BANK_LIST_FETCHED_PARAM):
+            return cached or (None, None, None)
+
+        try:
+            response = json.loads(values[self.BANK_LIST_PARAM])
+            fetched_at = datetime.fromisoformat(values[self.BANK_LIST_FETCHED_PARAM])
+        except (ValueError, TypeError):
+            _logger.warning("Invalid PSE bank list cache in database")
+            return cached or (None, None, None)
+
+        if cached and cached[1] >= fetched_at:
+            return cached
+        _bank_list_cache[cache_key] = (response, fetched_at, self._make_etag(values[self.BANK_LIST_PARAM]))
+        return _bank_list_cache[cache_key]
+
+    def _make_etag(self, payload):
+        """
+        Make the ETag of a serialized response.
+
+        :param payload: serialized response
+        :return: ETag (without quotes)
+        """
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def _refresh_bank_list(self):
+        """
+        Fetch the bank list from the payment gateway and cache it.
+
+        :return: tuple (response, fetched_at, etag)
+        :raises ValidationError: if the request fails or the response has no banks
+        """
+        response = self.make_api_request(endpoint=self.GET_BANK_LIST_ENDPOINT, method="GET")
+        if not isinstance(response, dict) or response.get("success") is False or not response.get("data"):
+            raise ValidationError(_("Invalid PSE bank list response from payment gateway."))
+
+        payload = json.dumps(response, sort_keys=True)
+        fetched_at = datetime.now()
+        self._store_system_params({
+            self.BANK_LIST_PARAM: payload,
+            self.BANK_LIST_FETCHED_PARAM: fetched_at.isoformat(),
+        })
+        _bank_list_cache[self._get_worker_cache_key()] = (response, fetched_at, self._make_etag(payload))
+        _logger.info("PSE bank list refreshed (%s banks)", len(response["data"]))
+        return _bank_list_cache[self._get_worker_cache_key()]
+
+    @api.model
+    def get_bank_list_with_cache_info(self):
+        """
+        Get the list of available banks with its HTTP cache information.
+
+        The list is served from cache while it is younger than the TTL. Once the
+        worker copy expires the database copy is read again, and the payment
+        gateway is only called when the database copy has expired too; if the
+        payment gateway fails, the expired (stale) list is served until the
+        next successful refresh.
+
+        :return: tuple (response, etag, max_age) where max_age is the number of
+            seconds the response can still be reused by the browser
+        :raises ValidationError: if there is no cached list and the request fails
+        """
+        ttl = self._get_bank_list_ttl()
+        response, fetched_at, etag = self._get_cached_bank_list(ttl)
+
+        if response is None:
+            response, fetched_at, etag = self._refresh_bank_list()
+        elif not self._is_bank_list_fresh(fetched_at, ttl):
+            try:
+                response, fetched_at, etag = self._refresh_bank_list()
+            except ValidationError as e:
+                _logger.warning("Serving stale PSE bank list (fetched at %s): %s", fetched_at, e)
+                return response, etag, 0
+
+        age = (datetime.now() - fetched_at).total_seconds()
+        return response, etag, max(int(ttl - age), 0)
+
     @api.model
     def get_bank_list(self):
         """
         Get the list of available banks.
         """
-        return self.make_api_request(endpoint=self.GET_BANK_LIST_ENDPOINT, method="GET")
+        response, _etag, _max_age = self.get_bank_list_with_cache_info()
+        return response
+
+    @api.model
+    def _cron_refresh_bank_list(self):
+        """
+        Refresh the cached bank list in background, so checkout requests do not
+        wait for the payment gateway. On failure the cached list is kept.
+        """
+        try:
+            self._refresh_bank_list()
+        except ValidationError as e:
+            _logger.warning("Could not refresh PSE bank list: %s", e)
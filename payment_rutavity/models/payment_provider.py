@@ -11,3 +11,10 @@ class PaymentProvider(models.Model):
     epayco_public_key = fields.Char(string="PUBLIC_KEY", groups="base.group_system")
     epayco_private_key = fields.Char(string="PRIVATE_KEY", groups="base.group_system")
     epayco_p_key = fields.Char(string="P_KEY", groups="base.group_system")
+
+    def write(self, vals):
+        res = super().write(vals)
+        # New API credentials: drop the authentication token of the old ones
+        if {"epayco_public_key", "epayco_private_key"} & vals.keys():
+            self.env["payment.gateway"].clear_token_cache()
+        return res
@@ -0,0 +1,298 @@
+import json
+import logging
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+
+class PaymentRutavityNotification(models.Model):
+    """
+    Inbox of the confirmations sent by the Rutavity gateway.
+
+    The webhook only stores the confirmation (idempotently) and acknowledges it;
+    a cron drains the inbox, processing each confirmation with the transaction
+    row locked, so retries of the gateway and the customer redirect never
+    process the same transaction in parallel.
+    """
+
+    _name = "payment.rutavity.notification"
+    _description = "Rutavity Gateway Confirmation"
+    _order = "id"
+    _rec_name = "ref_payco"
+
+    # === CONSTANTS ===#
+    MAX_ATTEMPTS = 8
+    BATCH_SIZE = 50
+
+    # === FIELDS ===#
+    transaction_id = fields.Many2one(
+        comodel_name="payment.transaction",
+        string="Transaction",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    ref_payco = fields.Char(
+        string="Gateway Reference",
+        required=True,
+        help="ePayco reference of the payment (x_ref_payco).",
+    )
+    gateway_transaction_id = fields.Char(
+        string="Gateway Transaction ID",
+        required=True,
+        help="ePayco transaction ID (x_transaction_id).",
+    )
+    gateway_status = fields.Char(
+        string="Gateway Status",
+        required=True,
+        help="Status code of the confirmation (x_cod_response). A status change "
+        "is a new confirmation; a retry of the same status is a duplicate.",
+    )
+    payload = fields.Json(
+        string="Payload",
+        required=True,
+        help="Data posted by the gateway.",
+    )
+    state = fields.Selection(
+        string="State",
+        selection=[
+            ("pending", "Pending"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+            ("ignored", "Ignored"),
+        ],
+        default="pending",
+        required=True,
+    )
+    attempts = fields.Integer(string="Attempts", default=0)
+    next_attempt = fields.Datetime(
+        string="Next Attempt",
+        default=fields.Datetime.now,
+        help="The confirmation is not processed before this date (retry backoff).",
+    )
+    last_error = fields.Text(string="Last Error")
+    processed_at = fields.Datetime(string="Processed At")
+
+    # Idempotency key of the inbox, required by the ON CONFLICT insert
+    _unique_confirmation = models.Constraint(
+        "UNIQUE(ref_payco, gateway_transaction_id, gateway_status)",
+        "This gateway confirmation has already been received.",
+    )
+    _pending_idx = models.Index("(next_attempt) WHERE state = 'pending'")
+
+    # === BUSINESS METHODS ===#
+    @api.model
+    def _enqueue(self, confirmation_data: dict):
+        """
+        Store a gateway confirmation in the inbox, ignoring duplicates.
+
+        :param dict confirmation_data: Data posted by the gateway
+        :return: True if the confirmation is new, False if it is a duplicate
+        :rtype: bool
+        :raises ValidationError: If the confirmation is incomplete or its transaction does not exist
+        """
+        ref_payco = confirmation_data.get("x_ref_payco")
+        gateway_transaction_id = confirmation_data.get("x_transaction_id")
+        transaction_id = confirmation_data.get("x_extra1")
+        if not ref_payco or not gateway_transaction_id or not transaction_id:
+            raise ValidationError(_("Incomplete gateway confirmation"))
+
+        transaction = (
+            self.env["payment.transaction"].sudo().browse(int(transaction_id)).exists()
+        )
+        if not transaction:
+            raise ValidationError(_("Transaction not found"))
+
+        return bool(self._enqueue_batch([(transaction, confirmation_data)]))
+
+    @api.model
+    def _enqueue_batch(self, confirmations):
+        """
+        Store several gateway confirmations in the inbox with a single
+        statement, ignoring duplicates, and trigger the inbox cron.
+
+        :param list confirmations: List of (transaction, confirmation data)
+        :return: Number of new confirmations
+        :rtype: int
+        """
+        if not confirmations:
+            return 0
+
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO payment_rutavity_notification (
+                transaction_id, ref_payco, gateway_transaction_id, gateway_status,
+                payload, state, attempts, next_attempt,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT c.transaction_id, c.ref_payco, c.gateway_transaction_id, c.gateway_status,
+                   c.payload, 'pending', 0, (now() AT TIME ZONE 'UTC'),
+                   %(uid)s, (now() AT TIME ZONE 'UTC'), %(uid)s, (now() AT TIME ZONE 'UTC')
+              FROM unnest(
+                    %(transaction_ids)s::int[], %(refs_payco)s::varchar[],
+                    %(gateway_transaction_ids)s::varchar[], %(gateway_statuses)s::varchar[],
+                    %(payloads)s::jsonb[]
+                   ) AS c(transaction_id, ref_payco, gateway_transaction_id, gateway_status, payload)
+            ON CONFLICT (ref_payco, gateway_transaction_id, gateway_status) DO NOTHING
+            """,
+            transaction_ids=[transaction.id for transaction, _data in confirmations],
+            refs_payco=[str(data.get("x_ref_payco")) for _tx, data in confirmations],
+            gateway_transaction_ids=[str(data.get("x_transaction_id")) for _tx, data in confirmations],
+            gateway_statuses=[str(data.get("x_cod_response")) for _tx, data in confirmations],
+            payloads=[json.dumps(data) for _tx, data in confirmations],
+            uid=self.env.uid,
+        ))
+        new_count = self.env.cr.rowcount
+        if new_count:
+            self.env.ref("payment_rutavity.cron_process_rutavity_notifications")._trigger()
+        return new_count
+
+    def _get_retry_delay(self, attempts):
+        """
+        Get the delay before the next attempt (exponential backoff).
+
+        :param int attempts: Number of failed attempts
+        :return: The delay
+        :rtype: timedelta
+        """
+        return timedelta(minutes=min(2 ** attempts, 240))
+
+    @api.model
+    def _cron_process_notifications(self):
+        """
+        Drain the inbox: process the pending confirmations whose next attempt is
+        due, in arrival order, committing after each one.
+
+        Confirmations are claimed with ``FOR UPDATE SKIP LOCKED`` (on the inbox
+        row and on its transaction), so several cron workers can drain the inbox
+        in parallel without processing the same transaction twice. Only the
+        oldest pending confirmation of each transaction is claimed.
+        """
+        while True:
+            self.env.cr.execute(SQL(
+                """
+                SELECT n.id
+                  FROM payment_rutavity_notification n
+                 WHERE n.state = 'pending'
+                   AND n.next_attempt <= (now() AT TIME ZONE 'UTC')
+                   -- Confirmations waiting for an older one of the same transaction
+                   -- (in backoff) would otherwise fill the batch and starve the rest
+                   AND NOT EXISTS (
+                        SELECT 1
+                          FROM payment_rutavity_notification o
+                         WHERE o.transaction_id = n.transaction_id
+                           AND o.state = 'pending'
+                           AND o.id < n.id
+                   )
+                 ORDER BY n.id
+                 LIMIT %(limit)s
+                   FOR UPDATE SKIP LOCKED
+                """,
+                limit=self.BATCH_SIZE,
+            ))
+            notification_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not notification_ids:
+                return
+
+            processed = 0
+            for notification in self.browse(notification_ids):
+                processed += notification._process_notification()
+                self.env.cr.commit()
+
+            if not processed:
+                # Every transaction of the batch is locked by another worker
+                return
+
+    def _process_notification(self):
+        """
+        Process a confirmation with its transaction row locked.
+
+        :return: False if the confirmation or its transaction is being processed by another worker
+        :rtype: bool
+        """
+        self.ensure_one()
+        # Claim the confirmation again: the batch locks end at the previous commit
+        self.env.cr.execute(SQL(
+            """
+            SELECT id FROM payment_rutavity_notification
+             WHERE id = %s AND state = 'pending'
+               FOR UPDATE SKIP LOCKED
+            """,
+            self.id,
+        ))
+        if not self.env.cr.fetchone():
+            return False
+        self.invalidate_recordset()
+
+        self.env.cr.execute(SQL(
+            "SELECT id FROM payment_transaction WHERE id = %s FOR UPDATE SKIP LOCKED",
+            self.transaction_id.id,
+        ))
+        if not self.env.cr.fetchone():
+            return False
+
+        # Keep the arrival order: wait for older pending confirmations of the same transaction
+        if self.search_count([
+            ("transaction_id", "=", self.transaction_id.id),
+            ("state", "=", "pending"),
+            ("id", "<", self.id),
+        ], limit=1):
+            return False
+
+        # Late confirmations can not move the transaction out of a final status
+        if self.transaction_id._is_rutavity_final_status_change(self.gateway_status):
+            _logger.info(
+                "Rutavity confirmation %s ignored: status %s received after final status %s",
+                self.ref_payco,
+                self.gateway_status,
+                self.transaction_id.gateway_status,
+            )
+            self.write({
+                "state": "ignored",
+                "processed_at": fields.Datetime.now(),
+                "last_error": _(
+                    "Status %(status)s received after the final status %(final_status)s",
+                    status=self.gateway_status,
+                    final_status=self.transaction_id.gateway_status,
+                ),
+            })
+            return True
+
+        try:
+            with self.env.cr.savepoint():
+                self.transaction_id._process("rutavity", dict(self.payload))
+        except Exception as e:
+            attempts = self.attempts + 1
+            failed = attempts >= self.MAX_ATTEMPTS
+            _logger.warning(
+                "Rutavity confirmation %s (attempt %s) failed: %s", self.ref_payco, attempts, e
+            )
+            self.write({
+                "state": "failed" if failed else "pending",
+                "attempts": attempts,
+                "next_attempt": fields.Datetime.now() + self._get_retry_delay(attempts),
+                "last_error": str(e),
+            })
+            return True
+
+        self.write({
+            "state": "done",
+            "attempts": self.attempts + 1,
+            "processed_at": fields.Datetime.now(),
+            "last_error": False,
+        })
+        return True
+
+    def action_retry(self):
+        """Queue failed confirmations again."""
+        self.filtered(lambda n: n.state == "failed").write({
+            "state": "pending",
+            "attempts": 0,
+            "next_attempt": fields.Datetime.now(),
+        })
+        self.env.ref("payment_rutavity.cron_process_rutavity_notifications")._trigger()
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+# Per-worker (process) front cache of token buckets: {client_key: (tokens, timestamp)}
+# Bounded LRU, so scraping from many IPs cannot grow the worker memory.
+_local_buckets = OrderedDict()
+_local_buckets_lock = threading.Lock()
+
+
+class PaymentRutavityRateLimit(models.Model):
+    """
+    Token buckets of the public portal routes, shared by every Odoo worker.
+
+    Each request consumes one token of the bucket of its client; tokens are
+    refilled continuously up to the bucket capacity. A check is O(1): a lookup
+    in the bounded per-worker LRU, which already rejects clients that emptied
+    their bucket in this worker, and a single atomic upsert on the shared bucket.
+    """
+
+    _name = "payment.rutavity.rate.limit"
+    _description = "Rutavity Portal Rate Limit Bucket"
+    _log_access = False
+    _rec_name = "client_key"
+
+    # === CONSTANTS ===#
+    LOCAL_BUCKETS_SIZE = 10000
+    STALE_BUCKET_HOURS = 1
+
+    # === FIELDS ===#
+    client_key = fields.Char(string="Client", required=True)
+    tokens = fields.Float(string="Tokens")
+    refilled_at = fields.Datetime(string="Refilled At")
+    allowed = fields.Boolean(string="Last Request Allowed")
+
+    _unique_client_key = models.Constraint(
+        "UNIQUE(client_key)",
+        "There can only be one bucket per client.",
+    )
+
+    # === BUSINESS METHODS ===#
+    @api.model
+    def _consume(self, client_key, capacity, refill_per_second):
+        """
+        Consume one token of the bucket of a client.
+
+        :param str client_key: The client (IP address)
+        :param int capacity: Maximum number of tokens (burst size)
+        :param float refill_per_second: Tokens refilled per second
+        :return: True if the request is allowed, False if the bucket is empty
+        :rtype: bool
+        """
+        if not self._consume_local(client_key, capacity, refill_per_second):
+            return False
+
+        # Tokens of the bucket refilled up to now (SET expressions see the old row)
+        refilled_tokens = SQL(
+            """LEAST(%(capacity)s, b.tokens + %(refill_per_second)s
+                    * EXTRACT(EPOCH FROM (now() AT TIME ZONE 'UTC') - b.refilled_at))""",
+            capacity=capacity,
+            refill_per_second=refill_per_second,
+        )
+        # Short transaction of its own: the bucket row is not locked while the
+        # request is served, and the consumption is kept even if it fails
+        with self.env.registry.cursor() as cr:
+            cr.execute(SQL(
+                """
+                INSERT INTO payment_rutavity_rate_limit AS b (client_key, tokens, refilled_at, allowed)
+                VALUES (%(client_key)s, %(capacity)s - 1, (now() AT TIME ZONE 'UTC'), TRUE)
+                ON CONFLICT (client_key) DO UPDATE
+                   SET tokens = %(refilled)s - CASE WHEN %(refilled)s >= 1 THEN 1 ELSE 0 END,
+                       allowed = %(refilled)s >= 1,
+                       refilled_at = (now() AT TIME ZONE 'UTC')
+                RETURNING b.allowed
+                """,
+                client_key=client_key,
+                capacity=capacity,
+                refilled=refilled_tokens,
+            ))
+            return cr.fetchone()[0]
+
+    @api.model
+    def _consume_local(self, client_key, capacity, refill_per_second):
+        """
+        Consume one token of the bucket of a client in the per-worker LRU.
+
+        :return: False if the client emptied its bucket in this worker
+        :rtype: bool
+        """
+        now = time.monotonic()
+        with _local_buckets_lock:
+            tokens, timestamp = _local_buckets.pop(client_key, (capacity, now))
+            tokens = min(capacity, tokens + (now - timestamp) * refill_per_second)
+            allowed = tokens >= 1
+            _local_buckets[client_key] = (tokens - 1 if allowed else tokens, now)
+            if len(_local_buckets) > self.LOCAL_BUCKETS_SIZE:
+                _local_buckets.popitem(last=False)
+        return allowed
+
+    @api.autovacuum
+    def _gc_stale_buckets(self):
+        """Delete the buckets of clients without recent requests (full again)."""
+        self.env.cr.execute(SQL(
+            "DELETE FROM payment_rutavity_rate_limit WHERE refilled_at < %s",
+            fields.Datetime.now() - timedelta(hours=self.STALE_BUCKET_HOURS),
+        ))
@@ -13,6 +13,18 @@ import json
 class PaymentTransaction(models.Model):
     _inherit = "payment.transaction"
 
+    # === CONSTANTS ===#
+    # Final gateway statuses and the status changes still allowed from each one
+    RUTAVITY_FINAL_STATUS_CHANGES = {
+        "1": {"6"},  # Approved -> Reversed
+        "2": set(),
+        "4": set(),
+        "6": set(),
+        "9": set(),
+        "10": set(),
+        "11": set(),
+    }
+
     # === FIELDS ===#
     # https://docs.epayco.com/docs/paginas-de-respuestas#c%C3%B3digos-de-respuesta
     gateway_status = fields.Selection(
@@ -73,8 +85,19 @@ class PaymentTransaction(models.Model):
         help="Translated type of transaction for display purposes",
     )
 
+    gateway_last_poll = fields.Datetime(
+        string="Gateway Last Poll",
+        readonly=True,
+        copy=False,
+        help="Last time the pending status of the transaction was polled from the gateway.",
+    )
+
+    # Lookup of pending gateway transactions (provider_code is not stored: provider_id is used)
+    _gateway_pending_idx = models.Index("(provider_id, gateway_status, state)")
+
     # === CONSTANTS ===#
     PSE_TRANSACTION_ENDPOINT = "payment/process/pse"
+    PENDING_POLL_BATCH_SIZE = 100
 
     # === COMPUTE METHODS ===#
     @api.depends("gateway_response_data")
@@ -134,6 +157,68 @@ class PaymentTransaction(models.Model):
                 record.transaction_type_translated = False
 
     # === BUSINESS METHODS ===#
+    @api.model
+    def _get_rutavity_pending_domain(self):
+        """
+        Domain of the Rutavity transactions pending at the gateway (status "3").
+
+        :return: The domain, matching the (provider_id, gateway_status, state) index
+        :rtype: list
+        """
+        providers = self.env["payment.provider"].sudo().search([("code", "=", "rutavity")])
+        return [
+            ("provider_id", "in", providers.ids),
+            ("gateway_status", "=", "3"),
+            ("state", "in", ["pending", "draft"]),
+        ]
+
+    @api.model
+    def _has_rutavity_pending_transactions(self, document_model, document_ids):
+        """
+        Check if some documents have a Rutavity transaction pending at the gateway.
+
+        :param str document_model: 'sale.order' or 'account.move'
+        :param list document_ids: The document IDs
+        :return: True if there is a pending transaction
+        :rtype: bool
+        """
+        document_field = "sale_order_ids" if document_model == "sale.order" else "invoice_ids"
+        return bool(self.sudo().search_count(
+            self._get_rutavity_pending_domain() + [(document_field, "in", document_ids)],
+            limit=1,
+        ))
+
+    @api.model
+    def _cron_poll_rutavity_pending_transactions(self):
+        """
+        Poll the gateway for the Rutavity transactions pending at the gateway.
+
+        The least recently polled transactions are polled first, in batches of
+        PENDING_POLL_BATCH_SIZE. Status changes are queued in the confirmation
+        inbox, which processes them like the gateway confirmations.
+        """
+        transactions = self.search(
+            self._get_rutavity_pending_domain() + [("provider_reference", "!=", False)],
+            order="gateway_last_poll ASC NULLS FIRST, id",
+            limit=self.PENDING_POLL_BATCH_SIZE,
+        )
+        if not transactions:
+            return
+
+        statuses = self.env["payment.gateway"].sudo().get_transactions_status(
+            transactions.mapped("provider_reference")
+        )
+
+        confirmations = []
+        for transaction in transactions:
+            data = statuses.get(transaction.provider_reference)
+            if not data or str(data.get("x_cod_response")) == transaction.gateway_status:
+                continue
+            confirmations.append((transaction, {"x_extra1": str(transaction.id), **data}))
+
+        self.env["payment.rutavity.notification"].sudo()._enqueue_batch(confirmations)
+        transactions.write({"gateway_last_poll": fields.Datetime.now()})
+
     def _get_specific_rendering_values(self, processing_values):
         """
         Override of `payment` to return Rutavity-specific rendering values.
@@ -156,6 +241,19 @@ class PaymentTransaction(models.Model):
 
         return rendering_values
 
+    def _is_rutavity_final_status_change(self, status: str):
+        """
+        Check if a gateway status would move the transaction out of a final
+        status (e.g. a late pending confirmation received after the approval).
+
+        :param str status: The status of the confirmation
+        :return: True if the status change is not allowed
+        :rtype: bool
+        """
+        self.ensure_one()
+        allowed = self.RUTAVITY_FINAL_STATUS_CHANGES.get(self.gateway_status)
+        return allowed is not None and status != self.gateway_status and status not in allowed
+
     def _set_rutavity_gateway_response(
         self, status: str, message: str, response_data: dict
     ):
@@ -652,8 +750,22 @@ class PaymentTransaction(models.Model):
                 )
             )
 
-        # Create individual payments
-        created_payments = self.env["account.payment"]
+        # Build the values of every payment at once
+        payment_date = fields.Date.context_today(self)
+        company = self.provider_id.company_id
+        conversion_rates = {}
+
+        def convert(amount, from_currency, to_currency):
+            # One rate lookup per currency pair for the whole batch
+            key = (from_currency.id, to_currency.id)
+            if key not in conversion_rates:
+                conversion_rates[key] = from_currency._get_conversion_rate(
+                    from_currency, to_currency, company, payment_date
+                )
+            return to_currency.round(amount * conversion_rates[key])
+
+        paid_invoices = self.env["account.move"]
+        payment_values_list = []
 
         for invoice in self.invoice_ids.filtered(lambda inv: inv.state == "posted"):
             custom_amount = invoice_amounts_map.get(invoice.id)
@@ -673,7 +785,7 @@ class PaymentTransaction(models.Model):
                 )
                 custom_amount = invoice.amount_residual
 
-            # Create payment for this specific invoice
+            # Payment for this specific invoice
             payment_values = {
                 "amount": custom_amount,
                 "payment_type": "inbound" if custom_amount > 0 else "outbound",
@@ -681,7 +793,7 @@ class PaymentTransaction(models.Model):
                 "partner_id": self.partner_id.commercial_partner_id.id,
                 "partner_type": "customer",
                 "journal_id": self.provider_id.journal_id.id,
-                "company_id": self.provider_id.company_id.id,
+                "company_id": company.id,
                 "payment_method_line_id": payment_method_line.id,
                 "payment_token_id": self.token_id.id if self.token_id else False,
                 "payment_transaction_id": self.id,
@@ -696,213 +808,242 @@ class PaymentTransaction(models.Model):
             if destination_account_id:
                 payment_values["destination_account_id"] = destination_account_id
 
-            # Check for Early Payment Discount (Proportional Logic)
-            payment_date = fields.Date.context_today(self)
-            if invoice._is_eligible_for_early_payment_discount(
-                self.currency_id, payment_date
-            ):
-                # 1. Calculate Original Net Amount dynamically based on date
-                term_lines = invoice.line_ids.filtered(
-                    lambda l: l.display_type == "payment_term"
+            # Early Payment Discount (Proportional Logic)
+            payment_values["write_off_line_vals"] += (
+                self._prepare_early_payment_write_off_lines(
+                    invoice,
+                    custom_amount,
+                    payment_values["payment_type"],
+                    payment_date,
+                    convert,
                 )
+            )
 
-                # Default: use what's in line (Single Discount Logic)
-                # But for Multi-Discount, we must recalculate "Original Net" based on CURRENT valid percentage
-
-                discount_percentage = 0.0
-                invoice_date = invoice.invoice_date or fields.Date.context_today(self)
-
-                # Check Multi-Discount first (if module installed/configured)
-                if (
-                    hasattr(invoice.invoice_payment_term_id, "discount_ids")
-                    and invoice.invoice_payment_term_id.discount_ids
-                ):
-                    possible_discounts = []
-                    for discount in invoice.invoice_payment_term_id.discount_ids:
-                        discount_date = discount._get_discount_date(invoice_date)
-                        if payment_date <= discount_date:
-                            possible_discounts.append(discount)
-                    if possible_discounts:
-                        best_discount = max(
-                            possible_discounts, key=lambda d: d.discount_percentage
-                        )
-                        discount_percentage = best_discount.discount_percentage
-                # Check Single Standard Discount
-                elif invoice.invoice_payment_term_id.early_discount:
-                    discount_percentage = (
-                        invoice.invoice_payment_term_id.discount_percentage
-                    )
+            paid_invoices |= invoice
+            payment_values_list.append(payment_values)
 
-                # Calculate Dynamic Values
-                total_original_gross = sum(abs(l.amount_currency) for l in term_lines)
-                total_original_discount = 0.0
-
-                if discount_percentage:
-                    percentage = discount_percentage / 100.0
-                    if (
-                        invoice.invoice_payment_term_id.early_pay_discount_computation
-                        in ("excluded", "mixed")
-                    ):
-                        total_original_discount = self.currency_id.round(
-                            invoice.amount_untaxed * percentage
-                        )
-                    else:
-                        total_original_discount = self.currency_id.round(
-                            total_original_gross * percentage
-                        )
-
-                # Original Net = Gross - Discount
-                original_net_amount = total_original_gross - abs(
-                    total_original_discount
-                )
+        if not payment_values_list:
+            return self.env["account.payment"]
 
-                # Check if discount > 0 to avoid division by zero or invalid logic
-                if discount_percentage > 0 and not self.currency_id.is_zero(
-                    original_net_amount
-                ):
-                    # 2. Calculate Ratio (Payment / Dynamic Net)
-                    ratio = custom_amount / original_net_amount
-
-                    # 3. Prepare EPD AML Values
-                    epd_aml_values_list = []
-                    for aml in term_lines:
-                        epd_aml_values_list.append(
-                            {
-                                "aml": aml,
-                                "amount_currency": -aml.amount_residual_currency,
-                                "balance": aml.currency_id._convert(
-                                    -aml.amount_residual_currency,
-                                    aml.company_currency_id,
-                                    self.provider_id.company_id,
-                                    payment_date,
-                                ),
-                            }
-                        )
-
-                    # 4. Calculate Full Discount Balance (Dynamic)
-                    # Use the dynamically calculated total_original_discount
-                    full_discount_amount = abs(total_original_discount)
-
-                    sign = 1 if payment_values["payment_type"] == "inbound" else -1
-                    open_amount_currency = full_discount_amount * sign
-
-                    open_balance = self.currency_id._convert(
-                        open_amount_currency,
-                        self.provider_id.company_id.currency_id,
-                        self.provider_id.company_id,
-                        payment_date,
-                    )
+        # Create and post all payments at once (same order as paid_invoices)
+        payments = self.env["account.payment"].create(payment_values_list)
+        payments.action_post()
 
-                    # 5. Get Full Write-off Lines
-                    # PASS PAYMENT_DATE IN CONTEXT so account_move override picks it up
-                    early_payment_values = (
-                        self.env["account.move"]
-                        .with_context(payment_date=payment_date)
-                        ._get_invoice_counterpart_amls_for_early_payment_discount(
-                            epd_aml_values_list, open_balance
-                        )
-                    )
+        # Reconcile every payment with its invoice in a single reconciliation
+        self._reconcile_payments_with_invoices(payments, paid_invoices)
+
+        # Log message on invoices and payments (like native Odoo does), in bulk
+        transaction_link = self._get_html_link()
+        messages = {
+            payment: _(
+                "The payment related to transaction %(ref)s has been posted: %(link)s",
+                ref=transaction_link,
+                link=payment._get_html_link(),
+            )
+            for payment in payments
+        }
+        paid_invoices._message_log_batch(
+            bodies={
+                invoice.id: messages[payment]
+                for payment, invoice in zip(payments, paid_invoices)
+            }
+        )
+        payments._message_log_batch(
+            bodies={payment.id: message for payment, message in messages.items()}
+        )
+
+        # Return first payment (Odoo expects single payment for backward compatibility)
+        return payments[:1]
 
-                    # 6. Scale and Add to Payment Values
-                    for aml_values_list in early_payment_values.values():
-                        for write_off_line in aml_values_list:
-                            write_off_line["amount_currency"] *= ratio
-                            write_off_line["balance"] *= ratio
-                            write_off_line["partner_id"] = invoice.partner_id.id
-                            payment_values["write_off_line_vals"].append(write_off_line)
+    def _prepare_early_payment_write_off_lines(
+        self, invoice, custom_amount, payment_type, payment_date, convert
+    ):
+        """
+        Prepare the early payment discount write-off lines of a partial payment.
+
+        The discount lines of the full payment are scaled by the ratio between
+        the paid amount and the discounted (net) amount of the invoice.
+
+        :param invoice: The invoice to pay
+        :param float custom_amount: The amount paid for the invoice
+        :param str payment_type: The payment type ('inbound' or 'outbound')
+        :param date payment_date: The payment date
+        :param convert: Function (amount, from_currency, to_currency) converting at the payment date
+        :return: The write-off lines values
+        :rtype: list of dict
+        """
+        self.ensure_one()
 
-            # Create and post payment
-            payment = self.env["account.payment"].create(payment_values)
-            payment.action_post()
+        if not invoice._is_eligible_for_early_payment_discount(
+            self.currency_id, payment_date
+        ):
+            return []
 
-            # Reconcile with this specific invoice
-            self._reconcile_payment_with_invoice(payment, invoice)
+        # 1. Calculate Original Net Amount dynamically based on date
+        term_lines = invoice.line_ids.filtered(
+            lambda l: l.display_type == "payment_term"
+        )
 
-            # Log message on invoice and payment (like native Odoo does)
-            message = _(
-                "The payment related to transaction %(ref)s has been posted: %(link)s",
-                ref=self._get_html_link(),
-                link=payment._get_html_link(),
+        # Default: use what's in line (Single Discount Logic)
+        # But for Multi-Discount, we must recalculate "Original Net" based on CURRENT valid percentage
+
+        discount_percentage = 0.0
+
+        # Check Multi-Discount first (if module installed/configured)
+        if invoice.invoice_payment_term_id.discount_ids:
+            best_discount, _discount_date = invoice._get_applicable_early_discount(
+                payment_date
             )
-            # Log on this specific invoice
-            invoice.message_post(body=message)
-            # Log on the payment itself
-            payment.message_post(body=message)
+            if best_discount:
+                discount_percentage = best_discount.discount_percentage
+        # Check Single Standard Discount
+        elif invoice.invoice_payment_term_id.early_discount:
+            discount_percentage = invoice.invoice_payment_term_id.discount_percentage
+
+        # Calculate Dynamic Values
+        total_original_gross = sum(abs(l.amount_currency) for l in term_lines)
+        total_original_discount = 0.0
+
+        if discount_percentage:
+            percentage = discount_percentage / 100.0
+            if invoice.invoice_payment_term_id.early_pay_discount_computation in (
+                "excluded",
+                "mixed",
+            ):
+                total_original_discount = self.currency_id.round(
+                    invoice.amount_untaxed * percentage
+                )
+            else:
+                total_original_discount = self.currency_id.round(
+                    total_original_gross * percentage
+                )
 
-            created_payments |= payment
+        # Original Net = Gross - Discount
+        original_net_amount = total_original_gross - abs(total_original_discount)
 
-        # Return first payment (Odoo expects single payment for backward compatibility)
-        return created_payments[:1] if created_payments else self.env["account.payment"]
+        # Check if discount > 0 to avoid division by zero or invalid logic
+        if discount_percentage <= 0 or self.currency_id.is_zero(original_net_amount):
+            return []
+
+        # 2. Calculate Ratio (Payment / Dynamic Net)
+        ratio = custom_amount / original_net_amount
+
+        # 3. Prepare EPD AML Values
+        epd_aml_values_list = [
+            {
+                "aml": aml,
+                "amount_currency": -aml.amount_residual_currency,
+                "balance": convert(
+                    -aml.amount_residual_currency,
+                    aml.currency_id,
+                    aml.company_currency_id,
+                ),
+            }
+            for aml in term_lines
+        ]
+
+        # 4. Calculate Full Discount Balance (Dynamic)
+        # Use the dynamically calculated total_original_discount
+        full_discount_amount = abs(total_original_discount)
+
+        sign = 1 if payment_type == "inbound" else -1
+        open_balance = convert(
+            full_discount_amount * sign,
+            self.currency_id,
+            self.provider_id.company_id.currency_id,
+        )
 
-    def _reconcile_payment_with_invoice(self, payment, invoice):
+        # 5. Get Full Write-off Lines
+        # PASS PAYMENT_DATE IN CONTEXT so account_move override picks it up
+        early_payment_values = (
+            self.env["account.move"]
+            .with_context(payment_date=payment_date)
+            ._get_invoice_counterpart_amls_for_early_payment_discount(
+                epd_aml_values_list, open_balance
+            )
+        )
+
+        # 6. Scale the write-off lines
+        write_off_lines = []
+        for aml_values_list in early_payment_values.values():
+            for write_off_line in aml_values_list:
+                write_off_line["amount_currency"] *= ratio
+                write_off_line["balance"] *= ratio
+                write_off_line["partner_id"] = invoice.partner_id.id
+                write_off_lines.append(write_off_line)
+        return write_off_lines
+
+    def _reconcile_payments_with_invoices(self, payments, invoices):
         """
-        Reconcile a payment with a specific invoice.
+        Reconcile each payment with its invoice, all pairs in a single reconciliation.
 
-        For invoices with multiple installments (payment term lines), this method
-        ensures proper reconciliation respecting the installment order and amounts.
+        For invoices with multiple installments (payment term lines), the
+        reconciliation respects the installment order and amounts. Each pair is
+        a separate group of the reconciliation plan, so a payment is never
+        matched with another invoice of the batch.
 
-        :param payment: The payment record
-        :param invoice: The invoice to reconcile with
+        :param payments: The payment records
+        :param invoices: The invoices to reconcile with (same order as payments)
         :return: None
         """
         self.ensure_one()
 
-        # Ensure both payment and invoice moves are posted
-        if payment.move_id.state != "posted":
+        if payments.move_id.filtered(lambda move: move.state != "posted"):
             raise ValidationError(
                 _("Payment move must be posted before reconciliation")
             )
-        if invoice.state != "posted":
+        if invoices.filtered(lambda invoice: invoice.state != "posted"):
             raise ValidationError(_("Invoice must be posted before reconciliation"))
 
-        # Get payment move lines on receivable/payable account
-        payment_lines = payment.move_id.line_ids.filtered(
-            lambda line: line.account_id == payment.destination_account_id
-            and not line.reconciled
-        )
+        reconciliation_plan = []
+        for payment, invoice in zip(payments, invoices):
+            # Get payment move lines on receivable/payable account
+            payment_lines = payment.move_id.line_ids.filtered(
+                lambda line: line.account_id == payment.destination_account_id
+                and not line.reconciled
+            )
 
-        # Get invoice move lines on receivable/payable account (payment term lines)
-        # Sort by date_maturity to respect installment order
-        invoice_lines = invoice.line_ids.filtered(
-            lambda line: line.account_id == payment.destination_account_id
-            and not line.reconciled
-            and line.display_type == "payment_term"
-        ).sorted(lambda l: (l.date_maturity or l.date, l.id))
+            # Get invoice move lines on receivable/payable account (payment term lines)
+            # Sort by date_maturity to respect installment order
+            invoice_lines = invoice.line_ids.filtered(
+                lambda line: line.account_id == payment.destination_account_id
+                and not line.reconciled
+                and line.display_type == "payment_term"
+            ).sorted(lambda l: (l.date_maturity or l.date, l.id))
 
-        if not payment_lines:
-            self._log_message_on_linked_documents(
-                _(
-                    "Warning: No payment lines found to reconcile for payment %(payment)s",
-                    payment=payment.name,
+            if not payment_lines:
+                self._log_message_on_linked_documents(
+                    _(
+                        "Warning: No payment lines found to reconcile for payment %(payment)s",
+                        payment=payment.name,
+                    )
                 )
-            )
-            return
+                continue
 
-        if not invoice_lines:
-            self._log_message_on_linked_documents(
-                _(
-                    "Warning: No invoice lines found to reconcile for invoice %(invoice)s",
-                    invoice=invoice.name,
+            if not invoice_lines:
+                self._log_message_on_linked_documents(
+                    _(
+                        "Warning: No invoice lines found to reconcile for invoice %(invoice)s",
+                        invoice=invoice.name,
+                    )
                 )
-            )
-            return
+                continue
+
+            reconciliation_plan.append(payment_lines + invoice_lines)
 
-        # Combine lines and reconcile
-        # Odoo's reconcile() method handles partial amounts automatically
-        # When payment amount < total invoice amount, it will create partial reconciliation
-        # respecting the order of invoice_lines (earliest installment first)
-        lines_to_reconcile = payment_lines + invoice_lines
+        if not reconciliation_plan:
+            return
 
         try:
             # Let Odoo handle the reconciliation (including partial amounts automatically)
-            lines_to_reconcile.reconcile()
+            self.env["account.move.line"]._reconcile_plan(reconciliation_plan)
         except Exception as e:
             # Log error but don't fail the transaction
             self._log_message_on_linked_documents(
                 _(
-                    "Error reconciling payment %(payment)s with invoice %(invoice)s: %(error)s",
-                    payment=payment.name,
-                    invoice=invoice.name,
+                    "Error reconciling payments %(payments)s with invoices %(invoices)s: %(error)s",
+                    payments=", ".join(payments.mapped("name")),
+                    invoices=", ".join(invoices.mapped("name")),
                     error=str(e),
                 )
             )
@@ -224,8 +224,12 @@ patch(PaymentForm.prototype, {
         try {
             // Disable the bank select element
             this.bankFieldElement.disabled = true;
-            // Fetch bank list from server
-            const result = await rpc('/payment/gateway/get_bank_list');
+            // Fetch bank list from server (plain GET, so the browser can reuse it
+            // while cached and revalidate it with its ETag)
+            const response = await fetch('/payment/gateway/get_bank_list', {
+                headers: { Accept: 'application/json' },
+            });
+            const result = await response.json();
 
             if (result?.error || result?.success === false || !result?.data) {
                 throw new Error(result.error || result?.textResponse || 'Invalid response format');
@@ -0,0 +1,106 @@
+"""
+Multi-invoice payments of Rutavity transactions (custom amount per invoice).
+"""
+
+import logging
+import time
+
+from odoo.fields import Command
+from odoo.tests.common import tagged
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+_logger = logging.getLogger(__name__)
+
+
+class RutavityMultiplePaymentsCommon(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.provider = cls.env.ref("payment_rutavity.payment_provider_rutavity")
+        cls.provider.write({
+            "state": "test",
+            "company_id": cls.company_data["company"].id,
+            "journal_id": cls.company_data["default_journal_bank"].id,
+        })
+        cls.payment_method = cls.env.ref("payment.payment_method_pse")
+
+    def _create_invoices(self, count, amount=100.0):
+        return self.env["account.move"].create([
+            {
+                "move_type": "out_invoice",
+                "partner_id": self.partner_a.id,
+                "invoice_date": "2026-01-01",
+                "invoice_line_ids": [Command.create({
+                    "name": "Test Product",
+                    "price_unit": amount,
+                    "quantity": 1,
+                    "tax_ids": [],
+                })],
+            }
+            for _i in range(count)
+        ])
+
+    def _create_transaction(self, invoices, amounts):
+        return self.env["payment.transaction"].create({
+            "provider_id": self.provider.id,
+            "payment_method_id": self.payment_method.id,
+            "reference": "RUTAVITY-TEST-%s" % invoices[:1].id,
+            "amount": sum(amounts),
+            "currency_id": invoices.currency_id.id,
+            "partner_id": self.partner_a.id,
+            "invoice_ids": [Command.set(invoices.ids)],
+            "documents_data": {
+                "type": "multiple_invoices",
+                "data": [
+                    {"id": invoice.id, "amount": amount, "currency_id": invoice.currency_id.id}
+                    for invoice, amount in zip(invoices, amounts)
+                ],
+            },
+        })
+
+
+@tagged("post_install", "-at_install")
+class TestMultiplePayments(RutavityMultiplePaymentsCommon):
+
+    def test_one_payment_per_invoice_with_custom_amounts(self):
+        invoices = self._create_invoices(3)
+        invoices.action_post()
+        transaction = self._create_transaction(invoices, [100.0, 40.0, 60.0])
+
+        transaction._create_payment()
+
+        payments = self.env["account.payment"].search([
+            ("payment_transaction_id", "=", transaction.id)
+        ])
+        self.assertEqual(len(payments), 3)
+        self.assertEqual(sorted(payments.mapped("amount")), [40.0, 60.0, 100.0])
+        # Each payment is reconciled with its own invoice only
+        self.assertEqual(invoices.mapped("amount_residual"), [0.0, 60.0, 40.0])
+        for payment in payments:
+            self.assertEqual(payment.reconciled_invoice_ids, payment.invoice_ids)
+
+
+@tagged("post_install", "-at_install", "-standard", "rutavity_benchmark")
+class TestMultiplePaymentsBenchmark(RutavityMultiplePaymentsCommon):
+    """
+    Run with: --test-tags rutavity_benchmark
+    """
+
+    def test_benchmark_100_invoices(self):
+        invoices = self._create_invoices(100)
+        invoices.action_post()
+        transaction = self._create_transaction(invoices, [100.0] * 100)
+        self.env.flush_all()
+
+        queries_before = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        transaction._create_payment()
+        self.env.flush_all()
+        duration = time.perf_counter() - start
+        queries = self.env.cr.sql_log_count - queries_before
+
+        _logger.info(
+            "Rutavity 100-invoice transaction: %.2fs, %s queries", duration, queries
+        )
+        self.assertTrue(all(invoice.payment_state in ("paid", "in_payment") for invoice in invoices))
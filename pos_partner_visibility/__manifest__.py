@@ -1,9 +1,10 @@
 {
     'name': 'Contactos - Cliente POS',
-    'version': '1.0',
+    'version': '1.1',
     'category': 'Rutavity/Point of Sale',
     'summary': 'Campo adicional para seleccionar determinar si el cliente es visible en el POS',
-    'description': 'Campo adicional para seleccionar determinar si el cliente es visible en el POS',
+    'description': 'Campo adicional para seleccionar determinar si el cliente es visible en el POS. '
+                   'Cada POS carga solo los clientes asignados; los demás se buscan en el servidor.',
     'author': '@LeonardoSepulvedaCh',
     'website': 'https://github.com/LeonardoSepulvedaCh',
     'depends': ['point_of_sale', 'sale', 'contacts'],
@@ -1,4 +1,5 @@
 from odoo import models, fields, api
+from odoo.fields import Domain
 
 
 class ResPartner(models.Model):
@@ -27,6 +28,40 @@ class ResPartner(models.Model):
         fields.append("pos_config_ids")
         return fields
 
+    @api.model
+    def _load_pos_data_domain(self, data, config):
+        """
+        Only load the POS customers assigned to the opening POS, plus the
+        partners the POS needs (customers of its open orders and the company).
+        Other customers are found with the server search of the customer list.
+        """
+        domain = super()._load_pos_data_domain(data, config)
+        return Domain.AND([
+            domain,
+            Domain("pos_customer", "=", True) & Domain("pos_config_ids", "in", config.id)
+            | Domain("id", "in", self._get_pos_required_partner_ids(config)),
+        ])
+
+    @api.model
+    def _get_pos_required_partner_ids(self, config):
+        """
+        Partners loaded even if they are not assigned to the POS.
+        """
+        orders = self.env["pos.order"].search_fetch(
+            [("config_id", "=", config.id), ("state", "=", "draft"), ("partner_id", "!=", False)],
+            ["partner_id"],
+        )
+        return list(set(orders.partner_id.ids) | {config.company_id.partner_id.id})
+
+    @api.model
+    def get_new_partner(self, config_id, domain, offset):
+        """
+        Search customers on the server on demand (customers of other POS),
+        restricted to the POS customers.
+        """
+        domain = Domain.AND([domain, [("pos_customer", "=", True)]])
+        return super().get_new_partner(config_id, domain, offset)
+
     @api.onchange("pos_customer")
     def _onchange_pos_customer(self):
         """
@@ -1,12 +1,16 @@
 {
     'name': 'POS - Paginación de Productos',
-    'version': '1.0.0',
+    'version': '1.1.0',
     'category': 'Rutavity/Point of Sale',
     'summary': 'Agrega paginación configurable de productos en el POS con mejoras visuales',
     'description': """
         Este módulo agrega paginación en la pantalla principal del POS:
         - Número de productos por página configurable (por defecto 20)
-        - Ordena los productos por los más vendidos
+        - Ordena los productos por los más vendidos (contadores precalculados,
+          con ventana opcional de días por POS)
+        - Carga por páginas opcional para catálogos grandes: al iniciar solo
+          favoritos y más vendidos, el resto se trae del servidor por páginas
+          y se guarda en IndexedDB para consultarlo sin conexión
         - La búsqueda funciona en todos los productos
         - Controles de navegación visualmente atractivos fijos en la parte inferior
         - Mejoras en las tarjetas de productos:
@@ -20,6 +24,7 @@
     'depends': ['point_of_sale'],
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
         'views/pos_config_views.xml',
     ],
     'assets': {
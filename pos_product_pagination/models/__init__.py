@@ -2,4 +2,6 @@
 
 from . import product_template
 from . import pos_config
-
+from . import pos_order
+from . import pos_product_sales_counter
+from . import pos_product_sales_daily
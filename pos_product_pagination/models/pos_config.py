@@ -11,3 +11,31 @@ class PosConfig(models.Model):
              'Valores recomendados: entre 10 y 50 productos.'
     )
 
+    pos_sales_window_days = fields.Integer(
+        string='Ventana de Más Vendidos (días)',
+        default=0,
+        help='Ordenar los productos por las ventas de los últimos N días. '
+             '0 ordena por todo el histórico de ventas del POS.'
+    )
+
+    products_lazy_loading = fields.Boolean(
+        string='Carga de Productos por Páginas',
+        default=False,
+        help='Para catálogos grandes: el POS carga al iniciar solo los favoritos y '
+             'los más vendidos, y trae del servidor las demás páginas y las '
+             'búsquedas a medida que se consultan.'
+    )
+
+    products_initial_load = fields.Integer(
+        string='Más Vendidos Cargados al Iniciar',
+        default=200,
+        help='Cantidad de productos más vendidos (además de los favoritos) que '
+             'se cargan al iniciar el POS con la carga por páginas.'
+    )
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'pos_sales_window_days' in vals:
+            # La ventana más amplia pudo cambiar: recalcular los días de ventas en el cron
+            self.env['pos.product.sales.daily'].sudo()._request_rebuild()
+        return res
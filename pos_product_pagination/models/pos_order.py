@@ -0,0 +1,21 @@
+from odoo import fields, models
+
+
+class PosOrder(models.Model):
+    _inherit = 'pos.order'
+
+    pos_sales_counted = fields.Boolean(
+        string='Sumada a los Más Vendidos',
+        copy=False,
+        readonly=True,
+        help='La orden ya se sumó a los contadores de ventas por producto del POS'
+    )
+
+    # Órdenes pendientes de sumar a los contadores (lectura del cron)
+    _pos_sales_uncounted_idx = models.Index('(id) WHERE pos_sales_counted IS NOT TRUE')
+
+    def action_pos_order_paid(self):
+        """Disparar el cron que suma las órdenes pagadas a los contadores de ventas"""
+        res = super().action_pos_order_paid()
+        self.env.ref('pos_product_pagination.ir_cron_count_pos_product_sales').sudo()._trigger()
+        return res
@@ -0,0 +1,172 @@
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+
+class PosProductSalesCounter(models.Model):
+    """
+    Cantidad vendida en el POS por (compañía, producto), acumulada de forma
+    incremental a partir de las órdenes pagadas.
+
+    Evita recorrer todo el histórico de pos.order.line en cada carga del POS:
+    las órdenes pagadas se suman una sola vez (marcadas en pos_sales_counted)
+    por un cron que se dispara al pagar una orden.
+    """
+    _name = 'pos.product.sales.counter'
+    _description = 'POS Product Sales Counter'
+    _log_access = False
+    _rec_name = 'product_tmpl_id'
+
+    # Estados de orden que cuentan como venta
+    COUNTED_ORDER_STATES = ('paid', 'done', 'invoiced')
+    BATCH_SIZE = 1000
+
+    company_id = fields.Many2one(
+        comodel_name='res.company',
+        string='Company',
+        required=True,
+        ondelete='cascade',
+    )
+    product_tmpl_id = fields.Many2one(
+        comodel_name='product.template',
+        string='Product',
+        required=True,
+        ondelete='cascade',
+    )
+    qty_sold = fields.Float(
+        string='Quantity Sold',
+        help='Cantidad total vendida en el POS (las devoluciones restan)'
+    )
+
+    # Índice único requerido por el upsert ON CONFLICT
+    _company_product_uniq = models.Constraint(
+        'UNIQUE(company_id, product_tmpl_id)',
+        'Solo puede existir un contador por compañía y producto.',
+    )
+
+    @api.model
+    def _get_order_lines_sales(self, order_ids):
+        """
+        Consulta de las cantidades vendidas de las órdenes dadas agregadas por
+        (compañía, producto, día)
+        """
+        return SQL(
+            """
+            SELECT po.company_id,
+                   pp.product_tmpl_id,
+                   (po.date_order AT TIME ZONE 'UTC')::date AS date,
+                   SUM(pol.qty) AS qty_sold
+              FROM pos_order_line pol
+              JOIN pos_order po ON po.id = pol.order_id
+              JOIN product_product pp ON pp.id = pol.product_id
+             WHERE po.id = ANY(%s)
+             GROUP BY po.company_id, pp.product_tmpl_id, (po.date_order AT TIME ZONE 'UTC')::date
+            """,
+            list(order_ids),
+        )
+
+    @api.model
+    def _add_orders(self, order_ids):
+        """Sumar las líneas de las órdenes dadas a los contadores (total y diario)"""
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO pos_product_sales_counter (company_id, product_tmpl_id, qty_sold)
+            SELECT s.company_id, s.product_tmpl_id, SUM(s.qty_sold)
+              FROM (%(sales)s) s
+             GROUP BY s.company_id, s.product_tmpl_id
+             ORDER BY s.company_id, s.product_tmpl_id
+            ON CONFLICT (company_id, product_tmpl_id) DO UPDATE
+               SET qty_sold = pos_product_sales_counter.qty_sold + EXCLUDED.qty_sold
+            """,
+            sales=self._get_order_lines_sales(order_ids),
+        ))
+        self.env['pos.product.sales.daily']._add_orders(order_ids)
+
+    @api.model
+    def _cron_count_paid_orders(self):
+        """
+        Sumar a los contadores las órdenes pagadas que aún no se han contado,
+        por bloques confirmados uno a uno. Las órdenes se toman con
+        FOR UPDATE SKIP LOCKED, así varias ejecuciones no cuentan dos veces
+        la misma orden. Antes reconstruye los días de ventas si un POS cambió
+        su ventana de más vendidos.
+        """
+        self.env['pos.product.sales.daily']._rebuild_if_requested()
+        while True:
+            self.env.cr.execute(SQL(
+                """
+                SELECT id
+                  FROM pos_order
+                 WHERE pos_sales_counted IS NOT TRUE
+                   AND state IN %(states)s
+                 ORDER BY id
+                 LIMIT %(limit)s
+                   FOR UPDATE SKIP LOCKED
+                """,
+                states=self.COUNTED_ORDER_STATES,
+                limit=self.BATCH_SIZE,
+            ))
+            order_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not order_ids:
+                break
+
+            self._add_orders(order_ids)
+            self.env.cr.execute(SQL(
+                "UPDATE pos_order SET pos_sales_counted = TRUE WHERE id = ANY(%s)",
+                order_ids,
+            ))
+            _logger.info('Contadores de ventas POS: %s órdenes sumadas', len(order_ids))
+            self.env.cr.commit()
+
+        self.env['pos.order'].invalidate_model(['pos_sales_counted'])
+        self.invalidate_model()
+
+    @api.model
+    def _get_sales_query(self, company, window_days=0):
+        """
+        Subconsulta (product_tmpl_id, qty_sold) de la compañía, para ordenar
+        productos por más vendidos en SQL
+
+        :param company: compañía
+        :param int window_days: solo los últimos N días (0 = todo el histórico)
+        """
+        if window_days:
+            return SQL(
+                """
+                SELECT product_tmpl_id, SUM(qty_sold) AS qty_sold
+                  FROM pos_product_sales_daily
+                 WHERE company_id = %s
+                   AND date >= %s
+                 GROUP BY product_tmpl_id
+                """,
+                company.id,
+                fields.Date.context_today(self) - timedelta(days=window_days),
+            )
+        return SQL(
+            "SELECT product_tmpl_id, qty_sold FROM pos_product_sales_counter WHERE company_id = %s",
+            company.id,
+        )
+
+    @api.model
+    def _get_qty_sold(self, company, product_tmpl_ids, window_days=0):
+        """
+        Cantidad vendida de los productos dados en la compañía
+
+        :param company: compañía
+        :param product_tmpl_ids: ids de product.template
+        :param int window_days: solo los últimos N días (0 = todo el histórico)
+        :return: {product_tmpl_id: cantidad}
+        """
+        if window_days:
+            return self.env['pos.product.sales.daily']._get_qty_sold(
+                company, product_tmpl_ids, window_days
+            )
+        counters = self.sudo().search_fetch([
+            ('company_id', '=', company.id),
+            ('product_tmpl_id', 'in', list(product_tmpl_ids)),
+        ], ['product_tmpl_id', 'qty_sold'])
+        return {counter.product_tmpl_id.id: counter.qty_sold for counter in counters}
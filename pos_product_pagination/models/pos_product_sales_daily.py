@@ -0,0 +1,137 @@
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+
+class PosProductSalesDaily(models.Model):
+    """
+    Cantidad vendida en el POS por (compañía, producto, día), usada por los
+    POS con una ventana de más vendidos (pos.config.pos_sales_window_days).
+
+    Solo se conservan los días de la ventana más amplia configurada: sin
+    ventanas la tabla queda vacía.
+    """
+    _name = 'pos.product.sales.daily'
+    _description = 'POS Product Daily Sales'
+    _log_access = False
+    _order = 'date desc'
+    _rec_name = 'product_tmpl_id'
+
+    # Reconstrucción pendiente, hecha por el cron de los contadores
+    REBUILD_PARAM = 'pos_product_pagination.sales_daily_rebuild'
+
+    company_id = fields.Many2one(
+        comodel_name='res.company',
+        string='Company',
+        required=True,
+        ondelete='cascade',
+    )
+    product_tmpl_id = fields.Many2one(
+        comodel_name='product.template',
+        string='Product',
+        required=True,
+        ondelete='cascade',
+    )
+    date = fields.Date(string='Date', required=True)
+    qty_sold = fields.Float(string='Quantity Sold')
+
+    # Índice único requerido por el upsert ON CONFLICT (y la lectura por ventana)
+    _company_date_product_uniq = models.Constraint(
+        'UNIQUE(company_id, date, product_tmpl_id)',
+        'Solo puede existir un registro por compañía, día y producto.',
+    )
+
+    @api.model
+    def _get_window_start(self):
+        """Primer día de la ventana más amplia configurada (None sin ventanas)"""
+        configs = self.env['pos.config'].sudo().with_context(active_test=False).search_fetch(
+            [('pos_sales_window_days', '>', 0)], ['pos_sales_window_days'],
+        )
+        if not configs:
+            return None
+        window_days = max(configs.mapped('pos_sales_window_days'))
+        return fields.Date.context_today(self) - timedelta(days=window_days)
+
+    @api.model
+    def _add_orders(self, order_ids, date_from=None):
+        """Sumar las líneas de las órdenes dadas a los días de la ventana"""
+        date_from = date_from or self._get_window_start()
+        if not date_from:
+            return
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO pos_product_sales_daily (company_id, product_tmpl_id, date, qty_sold)
+            SELECT s.company_id, s.product_tmpl_id, s.date, s.qty_sold
+              FROM (%(sales)s) s
+             WHERE s.date >= %(date_from)s
+             ORDER BY s.company_id, s.date, s.product_tmpl_id
+            ON CONFLICT (company_id, date, product_tmpl_id) DO UPDATE
+               SET qty_sold = pos_product_sales_daily.qty_sold + EXCLUDED.qty_sold
+            """,
+            sales=self.env['pos.product.sales.counter']._get_order_lines_sales(order_ids),
+            date_from=date_from,
+        ))
+
+    @api.model
+    def _rebuild(self):
+        """
+        Reconstruir los días de la ventana más amplia a partir de las órdenes
+        ya contadas (al ampliar o activar la ventana de un POS)
+        """
+        self.env.cr.execute(SQL("DELETE FROM pos_product_sales_daily"))
+        date_from = self._get_window_start()
+        if date_from:
+            self.env.cr.execute(SQL(
+                """
+                SELECT id
+                  FROM pos_order
+                 WHERE pos_sales_counted IS TRUE
+                   AND date_order >= %s
+                """,
+                date_from,
+            ))
+            order_ids = [row[0] for row in self.env.cr.fetchall()]
+            if order_ids:
+                self._add_orders(order_ids, date_from)
+        self.invalidate_model()
+
+    @api.model
+    def _request_rebuild(self):
+        """Programar la reconstrucción de los días en la próxima ejecución del cron de contadores"""
+        self.env['ir.config_parameter'].sudo().set_param(self.REBUILD_PARAM, '1')
+        self.env.ref('pos_product_pagination.ir_cron_count_pos_product_sales').sudo()._trigger()
+
+    @api.model
+    def _rebuild_if_requested(self):
+        """Reconstruir los días si se pidió (se llama desde el cron de contadores)"""
+        IrConfigParam = self.env['ir.config_parameter'].sudo()
+        if IrConfigParam.get_param(self.REBUILD_PARAM) != '1':
+            return
+        self._rebuild()
+        IrConfigParam.set_param(self.REBUILD_PARAM, '0')
+        self.env.cr.commit()
+
+    @api.model
+    def _get_qty_sold(self, company, product_tmpl_ids, window_days):
+        """Cantidad vendida de los productos dados en los últimos window_days días"""
+        grouped_data = self.sudo()._read_group(
+            domain=[
+                ('company_id', '=', company.id),
+                ('date', '>=', fields.Date.context_today(self) - timedelta(days=window_days)),
+                ('product_tmpl_id', 'in', list(product_tmpl_ids)),
+            ],
+            groupby=['product_tmpl_id'],
+            aggregates=['qty_sold:sum'],
+        )
+        return {product_tmpl.id: qty_sold for product_tmpl, qty_sold in grouped_data}
+
+    @api.autovacuum
+    def _gc_days_out_of_window(self):
+        """Eliminar los días que salieron de la ventana más amplia configurada"""
+        date_from = self._get_window_start()
+        if date_from:
+            self.env.cr.execute(SQL("DELETE FROM pos_product_sales_daily WHERE date < %s", date_from))
+        else:
+            self.env.cr.execute(SQL("DELETE FROM pos_product_sales_daily"))
+        self.invalidate_model()
@@ -1,4 +1,6 @@
 from odoo import api, fields, models
+from odoo.fields import Domain
+from odoo.tools import SQL
 
 
 class ProductTemplate(models.Model):
@@ -11,50 +13,25 @@ class ProductTemplate(models.Model):
         help='Cantidad total vendida de este producto en el POS'
     )
 
-    @api.depends_context('company')
+    @api.depends_context('company', 'pos_sales_window_days')
     def _compute_pos_total_qty_sold(self):
         """
         Calcula la cantidad total vendida de cada producto template en el POS.
         Se usa para ordenar los productos por más vendidos.
-        Utiliza read_group para agregación eficiente a nivel de base de datos.
+        Lee los contadores precalculados (pos.product.sales.counter) en lugar de
+        agregar todo el histórico de pos.order.line; con la ventana del contexto
+        (pos_sales_window_days) solo suma las ventas de los últimos N días.
         """
-        # Inicializar todos los productos en 0
-        for product in self:
-            product.pos_total_qty_sold = 0.0
-
-        if not self.ids:
-            return
-
-        # Obtener las variantes de productos de los templates actuales
-        product_variants = self.env['product.product'].search([
-            ('product_tmpl_id', 'in', self.ids)
-        ])
-        
-        if not product_variants:
-            return
-        
-        # Usar read_group para agregar cantidades a nivel de base de datos
-        # Esto es mucho más eficiente que cargar todas las líneas en memoria
-        grouped_data = self.env['pos.order.line']._read_group(
-            domain=[
-                ('product_id', 'in', product_variants.ids),
-                ('order_id.state', 'in', ['paid', 'done', 'invoiced']),
-                ('order_id.company_id', '=', self.env.company.id)
-            ],
-            groupby=['product_id'],
-            aggregates=['qty:sum']
-        )
-        
-        # Mapear cantidades por template
         qty_by_template = {}
-        for product_variant, qty_sum in grouped_data:
-            if product_variant:
-                template_id = product_variant.product_tmpl_id.id
-                qty_by_template[template_id] = qty_by_template.get(template_id, 0.0) + qty_sum
-        
-        # Asignar las cantidades calculadas
+        if self._origin.ids:
+            qty_by_template = self.env['pos.product.sales.counter']._get_qty_sold(
+                self.env.company,
+                self._origin.ids,
+                self.env.context.get('pos_sales_window_days') or 0,
+            )
+
         for product in self:
-            product.pos_total_qty_sold = qty_by_template.get(product.id, 0.0)
+            product.pos_total_qty_sold = qty_by_template.get(product._origin.id, 0.0)
 
     @api.model
     def _load_pos_data_fields(self, config_id):
@@ -65,3 +42,97 @@ class ProductTemplate(models.Model):
         fields.append('pos_total_qty_sold')
         return fields
 
+    @api.model
+    def _load_pos_data_read(self, records, config):
+        """
+        Lee los productos con la ventana de más vendidos del POS.
+        """
+        records = records.with_context(pos_sales_window_days=config.pos_sales_window_days)
+        return super()._load_pos_data_read(records, config)
+
+    @api.model
+    def _load_pos_data_domain(self, data, config):
+        """
+        Con la carga por páginas el POS inicia solo con los favoritos, los más
+        vendidos (products_initial_load) y los productos especiales del POS.
+        """
+        domain = super()._load_pos_data_domain(data, config)
+        if not config.products_lazy_loading:
+            return domain
+
+        lazy_domain = self._get_pos_lazy_product_domain(config)
+        product_ids = set(self._get_pos_ranked_product_ids(config, lazy_domain, limit=config.products_initial_load))
+        product_ids.update(self.search(lazy_domain & Domain('is_favorite', '=', True)).ids)
+        product_ids.update(config._get_special_products().product_tmpl_id.ids)
+        return Domain.AND([domain, [('id', 'in', list(product_ids))]])
+
+    @api.model
+    def _get_pos_lazy_product_domain(self, config, search_word='', categ_id=False):
+        """
+        Dominio de los productos del POS para la carga por páginas
+
+        :param config: pos.config
+        :param str search_word: texto buscado (nombre, referencia o código de barras)
+        :param int categ_id: categoría del POS seleccionada (incluye sus hijas)
+        """
+        # Dominio estándar de los productos del POS (sin la carga inicial de
+        # esta extensión), sin los productos especiales que el POS excluye
+        domain = Domain(super()._load_pos_data_domain({}, config))
+        domain &= Domain('id', 'not in', config._get_special_products().product_tmpl_id.ids)
+        if categ_id:
+            domain &= Domain('pos_categ_ids', 'child_of', categ_id)
+        if search_word:
+            domain &= (
+                Domain('name', 'ilike', search_word)
+                | Domain('default_code', 'ilike', search_word)
+                | Domain('barcode', 'ilike', search_word)
+            )
+        return domain
+
+    @api.model
+    def _get_pos_ranked_product_ids(self, config, domain, offset=0, limit=None):
+        """
+        Ids de los productos del dominio en el orden del índice de productos del POS:
+        favoritos, más vendidos (con la ventana del POS), secuencia y nombre
+        """
+        query = self._search(domain)
+        self.env.cr.execute(SQL(
+            """
+            SELECT pt.id
+              FROM product_template pt
+              LEFT JOIN (%(sales)s) s ON s.product_tmpl_id = pt.id
+             WHERE pt.id IN (%(product_ids)s)
+             ORDER BY COALESCE(pt.is_favorite, FALSE) DESC,
+                      COALESCE(s.qty_sold, 0) DESC,
+                      COALESCE(pt.pos_sequence, 0),
+                      %(name)s,
+                      pt.id
+            OFFSET %(offset)s
+             LIMIT %(limit)s
+            """,
+            sales=self.env['pos.product.sales.counter']._get_sales_query(
+                config.company_id, config.pos_sales_window_days
+            ),
+            product_ids=query.subselect(),
+            name=self._field_to_sql('pt', 'name'),
+            offset=offset,
+            limit=limit,
+        ))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def get_pos_product_page(self, config_id, search_word='', categ_id=False, offset=0, limit=20):
+        """
+        Página de productos para la carga por páginas del POS
+
+        :return: dict con los ids de la página en orden, el total de productos
+                 del dominio y los datos de los productos para el POS
+        """
+        config = self.env['pos.config'].browse(config_id)
+        domain = self._get_pos_lazy_product_domain(config, search_word, categ_id)
+        product_ids = self._get_pos_ranked_product_ids(config, domain, offset, limit)
+        return {
+            'ids': product_ids,
+            'total': self.search_count(domain),
+            'data': self.load_product_from_pos(config_id, [('id', 'in', product_ids)]) if product_ids else {},
+        }
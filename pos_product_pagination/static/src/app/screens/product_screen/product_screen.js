@@ -1,6 +1,7 @@
 import { ProductScreen } from "@point_of_sale/app/screens/product_screen/product_screen";
 import { patch } from "@web/core/utils/patch";
 import { useEffect } from "@odoo/owl";
+import { debounce } from "@web/core/utils/timing";
 
 patch(ProductScreen.prototype, {
   setup() {
@@ -24,6 +25,22 @@ patch(ProductScreen.prototype, {
       },
       () => [this.pos.totalProductPages]
     );
+
+    // Carga por páginas: traer del servidor la página consultada
+    // (con espera para no consultar en cada tecla de la búsqueda)
+    if (this.pos.isProductLazyLoading) {
+      const loadProductPage = debounce(() => this.pos.loadProductPage(), 300);
+      useEffect(
+        () => {
+          loadProductPage();
+        },
+        () => [
+          this.pos.selectedCategory,
+          this.pos.searchProductWord,
+          this.pos.currentProductPage,
+        ]
+      );
+    }
   },
 
   /**
@@ -44,7 +61,7 @@ patch(ProductScreen.prototype, {
    * Retorna la información de paginación para mostrar en la UI
    */
   get paginationInfo() {
-    const totalProducts = this.pos.productsToDisplay.length;
+    const totalProducts = this.pos.totalProductsToDisplay;
     const totalPages = this.pos.totalProductPages;
 
     // Si no hay productos, retornar valores en cero
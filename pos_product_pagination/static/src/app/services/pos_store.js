@@ -1,10 +1,73 @@
 import { PosStore } from "@point_of_sale/app/services/pos_store";
 import { patch } from "@web/core/utils/patch";
+import { markRaw, toRaw } from "@odoo/owl";
+import { ProductListIndex } from "@pos_product_pagination/app/utils/product_list_index";
+import { ProductPageCache } from "@pos_product_pagination/app/utils/product_page_cache";
 
 patch(PosStore.prototype, {
   setup() {
     super.setup(...arguments);
     this.currentProductPage = 1;
+    // Versión del catálogo: invalida el índice y la lista memorizada
+    this.productCatalogVersion = 0;
+    // Caché no reactiva: escribirla desde un getter no dispara renders
+    this._productListCache = markRaw({ indexKey: null, index: null, listKey: null, list: [] });
+    this._listenProductCatalogChanges();
+    // Carga por páginas: {búsqueda|categoría|página: {ids, total}}
+    this.lazyProductPages = {};
+  },
+
+  /**
+   * Incrementa la versión del catálogo cuando se crean, actualizan o eliminan
+   * productos (favoritos, cantidades vendidas, productos nuevos...)
+   * @private
+   */
+  _listenProductCatalogChanges() {
+    const productModel = this.models["product.template"];
+    // Los eventos del modelo no existen en todas las versiones: la cantidad
+    // de productos en la clave del índice cubre al menos altas y bajas
+    if (typeof productModel?.addEventListener !== "function") {
+      return;
+    }
+    for (const event of ["create", "update", "delete"]) {
+      productModel.addEventListener(event, () => this.invalidateProductList());
+    }
+  },
+
+  /**
+   * Invalida el índice de productos (p. ej. después de cargar productos nuevos)
+   */
+  invalidateProductList() {
+    this.productCatalogVersion++;
+  },
+
+  /**
+   * Índice del catálogo (filtrado y ordenado una vez por versión del catálogo)
+   * @private
+   */
+  _getProductListIndex(allProducts) {
+    const cache = this._productListCache;
+    const excludedProductIds = this.getExcludedProductIds();
+    const indexKey = [
+      this.productCatalogVersion,
+      allProducts.length,
+      excludedProductIds.join(","),
+    ].join("|");
+
+    if (cache.indexKey !== indexKey) {
+      const excluded = new Set(excludedProductIds);
+      const availableCateg = new Set(
+        (this.config.iface_available_categ_ids || []).map((c) => c.id)
+      );
+      cache.index = new ProductListIndex(
+        allProducts,
+        (product) => this._shouldIncludeProduct(product, excluded, availableCateg),
+        toRaw
+      );
+      cache.indexKey = indexKey;
+      cache.listKey = null;
+    }
+    return cache.index;
   },
 
   /**
@@ -15,6 +78,97 @@ patch(PosStore.prototype, {
     return this.config.products_per_page || 20;
   },
 
+  /**
+   * Indica si los productos se cargan del servidor por páginas
+   */
+  get isProductLazyLoading() {
+    return Boolean(this.config.products_lazy_loading);
+  },
+
+  /**
+   * Caché en IndexedDB de las páginas cargadas del servidor
+   * @private
+   */
+  _getProductPageCache() {
+    if (!this._productPageCache) {
+      this._productPageCache = markRaw(
+        new ProductPageCache(`pos_product_pagination_${this.config.id}`)
+      );
+    }
+    return this._productPageCache;
+  },
+
+  /**
+   * Clave de una página de la carga por páginas (búsqueda, categoría y página)
+   * @private
+   */
+  _getProductPageKey(page = this.currentProductPage) {
+    return [this.searchProductWord.trim(), this.selectedCategory?.id || 0, page].join("|");
+  },
+
+  /**
+   * Página actual de la carga por páginas ({ids, total}), si ya se cargó
+   */
+  get currentLazyProductPage() {
+    return this.lazyProductPages[this._getProductPageKey()];
+  },
+
+  /**
+   * Carga del servidor la página actual de productos, ordenada como
+   * el índice del catálogo. Sin conexión se usa la página guardada en IndexedDB.
+   */
+  async loadProductPage() {
+    const searchWord = this.searchProductWord.trim();
+    if (searchWord && !this._searchTriggered) {
+      this.setSelectedCategory(0);
+      this._searchTriggered = true;
+    } else if (!searchWord) {
+      this._searchTriggered = false;
+    }
+
+    const key = this._getProductPageKey();
+    if (this.lazyProductPages[key]) {
+      return;
+    }
+    const cacheKey = `${this.config.id}|${key}`;
+    let page;
+    try {
+      page = await this.data.call("product.template", "get_pos_product_page", [
+        this.config.id,
+        searchWord,
+        this.selectedCategory?.id || false,
+        (this.currentProductPage - 1) * this.productsPerPage,
+        this.productsPerPage,
+      ]);
+      await this._getProductPageCache().put(cacheKey, page);
+    } catch (error) {
+      // Sin conexión: usar la página guardada, si ya se había consultado
+      page = await this._getProductPageCache().get(cacheKey);
+      if (!page) {
+        console.warn("No se pudo cargar la página de productos", error);
+        return;
+      }
+    }
+
+    if (page.data && Object.keys(page.data).length) {
+      this.models.loadData(page.data, [], true);
+    }
+    this.lazyProductPages[key] = { ids: page.ids, total: page.total };
+  },
+
+  /**
+   * Productos de la página actual de la carga por páginas
+   * @private
+   */
+  _getLazyPageProducts() {
+    const page = this.currentLazyProductPage;
+    if (!page) {
+      return [];
+    }
+    const productModel = this.models["product.template"];
+    return this._filterProducts(page.ids.map((id) => productModel.get(id)).filter(Boolean));
+  },
+
   /**
    * Obtiene la lista base de productos según búsqueda o categoría
    * @private
@@ -84,64 +238,58 @@ patch(PosStore.prototype, {
   },
 
   /**
-   * Ordena los productos según el contexto (búsqueda o navegación)
-   * @private
+   * Obtiene los productos a mostrar (todas las páginas)
+   *
+   * La lista se memoriza por (búsqueda, categoría, versión del catálogo): los
+   * getters de paginación la leen varias veces por render sin volver a
+   * filtrar ni ordenar el catálogo.
    */
-  _sortProducts(products, isSearchByWord) {
-    if (isSearchByWord) {
-      // En búsqueda: ordenar por favoritos primero
-      return products.sort((a, b) => b.is_favorite - a.is_favorite);
+  get productsToDisplay() {
+    if (this.isProductLazyLoading) {
+      // Solo la página actual está en el POS
+      return this._getLazyPageProducts();
     }
 
-    // Sin búsqueda: ordenar por productos más vendidos
-    return products.sort((a, b) => {
-      // Primero por favoritos
-      if (b.is_favorite !== a.is_favorite) {
-        return b.is_favorite - a.is_favorite;
-      }
-      // Luego por cantidad vendida (más vendidos primero)
-      const qtyDiff = (b.pos_total_qty_sold || 0) - (a.pos_total_qty_sold || 0);
-      if (qtyDiff !== 0) {
-        return qtyDiff;
-      }
-      // Luego por secuencia
-      if (a.pos_sequence !== b.pos_sequence) {
-        return a.pos_sequence - b.pos_sequence;
-      }
-      // Finalmente por nombre
-      return a.name.localeCompare(b.name);
-    });
+    const searchWord = this.searchProductWord.trim();
+    const allProducts = this.models["product.template"].getAll();
+    const index = this._getProductListIndex(allProducts);
+    const cache = this._productListCache;
+    const listKey = `${searchWord}|${this.selectedCategory?.id || 0}`;
+
+    if (cache.listKey !== listKey) {
+      cache.list = this._computeProductsToDisplay(searchWord, allProducts, index);
+      // La búsqueda puede reiniciar la categoría seleccionada
+      cache.listKey = `${searchWord}|${this.selectedCategory?.id || 0}`;
+    }
+    return cache.list;
   },
 
   /**
-   * Obtiene los productos a mostrar con paginación aplicada
+   * Calcula la lista de productos a mostrar a partir del índice del catálogo
+   * @private
    */
-  get productsToDisplay() {
-    const searchWord = this.searchProductWord.trim();
-    const allProducts = this.models["product.template"].getAll();
+  _computeProductsToDisplay(searchWord, allProducts, index) {
     const isSearchByWord = searchWord !== "";
 
-    // Obtener la lista base según búsqueda o categoría
-    const list = this._getBaseProductList(searchWord, allProducts);
-
-    if (!list || list.length === 0) {
-      return [];
+    if (isSearchByWord) {
+      // Obtener los resultados de la búsqueda (en la categoría seleccionada)
+      const list = this._getBaseProductList(searchWord, allProducts);
+      return list?.length ? index.sortSearchResults(list) : [];
     }
 
-    // Aplicar filtros de exclusión y categorías disponibles
-    const filteredList = this._filterProducts(list);
+    this._searchTriggered = false;
+    if (this.selectedCategory?.id) {
+      return index.getCategoryProducts(
+        this.selectedCategory.id,
+        this.selectedCategory.associatedProducts
+      );
+    }
 
     // Verificar si todos los productos son especiales (sin búsqueda ni categoría)
-    if (
-      !isSearchByWord &&
-      !this.selectedCategory?.id &&
-      this.areAllProductsSpecial(filteredList)
-    ) {
+    if (!index.ranked.length || this.areAllProductsSpecial(index.ranked)) {
       return [];
     }
-
-    // Ordenar y retornar productos
-    return this._sortProducts(filteredList, isSearchByWord);
+    return index.ranked;
   },
 
   /**
@@ -149,16 +297,29 @@ patch(PosStore.prototype, {
    */
   get paginatedProducts() {
     const allProducts = this.productsToDisplay;
+    if (this.isProductLazyLoading) {
+      return allProducts;
+    }
     const startIdx = (this.currentProductPage - 1) * this.productsPerPage;
     const endIdx = startIdx + this.productsPerPage;
     return allProducts.slice(startIdx, endIdx);
   },
 
+  /**
+   * Retorna el total de productos a mostrar (todas las páginas)
+   */
+  get totalProductsToDisplay() {
+    if (this.isProductLazyLoading) {
+      return this.currentLazyProductPage?.total || 0;
+    }
+    return this.productsToDisplay.length;
+  },
+
   /**
    * Retorna el total de páginas
    */
   get totalProductPages() {
-    const total = this.productsToDisplay.length;
+    const total = this.totalProductsToDisplay;
     if (total === 0) {
       return 0;
     }
@@ -0,0 +1,107 @@
+/**
+ * Índice del catálogo de productos del POS para la paginación.
+ *
+ * Se construye una sola vez por versión del catálogo: calcula la clave de
+ * ordenamiento de cada producto (favorito, cantidad vendida, secuencia, nombre),
+ * ordena el catálogo completo una vez y guarda la posición (rango) de cada
+ * producto. Las listas por categoría y los resultados de búsqueda se sirven
+ * a partir de ese rango, sin volver a comparar nombres.
+ *
+ * No depende de OWL ni del PosStore para poder medirse de forma aislada
+ * (ver static/tests/benchmarks).
+ */
+
+const nameCollator = new Intl.Collator();
+
+/**
+ * Clave de ordenamiento de un producto (se calcula una vez por producto)
+ */
+export function getProductSortKey(product) {
+  return {
+    favorite: product.is_favorite ? 1 : 0,
+    qtySold: product.pos_total_qty_sold || 0,
+    sequence: product.pos_sequence || 0,
+    name: product.name || "",
+  };
+}
+
+/**
+ * Compara dos claves: favoritos primero, luego más vendidos, secuencia y nombre
+ */
+export function compareProductSortKeys(a, b) {
+  return (
+    b.favorite - a.favorite ||
+    b.qtySold - a.qtySold ||
+    a.sequence - b.sequence ||
+    nameCollator.compare(a.name, b.name)
+  );
+}
+
+export class ProductListIndex {
+  /**
+   * @param {Object[]} products catálogo completo
+   * @param {Function} includeProduct filtro (exclusiones y categorías disponibles)
+   * @param {Function} [toRaw] acceso sin reactividad a un producto
+   */
+  constructor(products, includeProduct, toRaw = (product) => product) {
+    this.toRaw = toRaw;
+    const entries = [];
+    for (const product of products) {
+      if (includeProduct(product)) {
+        entries.push({ product, key: getProductSortKey(toRaw(product)) });
+      }
+    }
+    entries.sort((a, b) => compareProductSortKeys(a.key, b.key));
+
+    this.ranked = entries.map((entry) => entry.product);
+    this.rankById = new Map();
+    this.favoriteById = new Map();
+    entries.forEach((entry, rank) => {
+      const id = toRaw(entry.product).id;
+      this.rankById.set(id, rank);
+      this.favoriteById.set(id, entry.key.favorite);
+    });
+    this.byCategory = new Map();
+  }
+
+  /**
+   * Productos incluidos de la lista dada, en el orden del catálogo
+   */
+  sortByRank(products) {
+    const ranked = [];
+    for (const product of products) {
+      const rank = this.rankById.get(this.toRaw(product).id);
+      if (rank !== undefined) {
+        ranked.push([rank, product]);
+      }
+    }
+    ranked.sort((a, b) => a[0] - b[0]);
+    return ranked.map(([, product]) => product);
+  }
+
+  /**
+   * Productos incluidos de una categoría en el orden del catálogo
+   * (índice por categoría construido la primera vez que se abre)
+   */
+  getCategoryProducts(categoryId, associatedProducts) {
+    if (!this.byCategory.has(categoryId)) {
+      this.byCategory.set(categoryId, this.sortByRank(associatedProducts));
+    }
+    return this.byCategory.get(categoryId);
+  }
+
+  /**
+   * Resultados de búsqueda incluidos: favoritos primero, conservando el orden
+   * de relevancia de la búsqueda (ordenamiento estable)
+   */
+  sortSearchResults(products) {
+    const results = products.filter((product) =>
+      this.rankById.has(this.toRaw(product).id)
+    );
+    return results.sort(
+      (a, b) =>
+        this.favoriteById.get(this.toRaw(b).id) -
+        this.favoriteById.get(this.toRaw(a).id)
+    );
+  }
+}
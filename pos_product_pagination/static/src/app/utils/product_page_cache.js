@@ -0,0 +1,61 @@
+/**
+ * Caché en IndexedDB de las páginas de productos de la carga por páginas.
+ *
+ * Guarda la respuesta del servidor de cada página (ids ordenados, total y
+ * datos de los productos) para que los productos ya consultados sigan
+ * disponibles sin conexión. Si IndexedDB no está disponible la caché queda
+ * vacía y el POS sigue funcionando en línea.
+ */
+
+const DB_VERSION = 1;
+const STORE_NAME = "pages";
+
+export class ProductPageCache {
+  constructor(dbName) {
+    this.dbName = dbName;
+    this._db = null;
+  }
+
+  _open() {
+    if (!this._db) {
+      this._db = new Promise((resolve) => {
+        if (!window.indexedDB) {
+          resolve(null);
+          return;
+        }
+        const request = window.indexedDB.open(this.dbName, DB_VERSION);
+        request.onupgradeneeded = () => request.result.createObjectStore(STORE_NAME);
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => resolve(null);
+      });
+    }
+    return this._db;
+  }
+
+  async _request(mode, callback) {
+    const db = await this._open();
+    if (!db) {
+      return null;
+    }
+    return new Promise((resolve) => {
+      const transaction = db.transaction(STORE_NAME, mode);
+      const request = callback(transaction.objectStore(STORE_NAME));
+      request.onsuccess = () => resolve(request.result ?? null);
+      request.onerror = () => resolve(null);
+    });
+  }
+
+  /**
+   * Página guardada (null si no existe)
+   */
+  get(key) {
+    return this._request("readonly", (store) => store.get(key));
+  }
+
+  /**
+   * Guarda (o reemplaza) una página
+   */
+  put(key, page) {
+    return this._request("readwrite", (store) => store.put(page, key));
+  }
+}
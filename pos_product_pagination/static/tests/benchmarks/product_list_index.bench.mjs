@@ -0,0 +1,119 @@
+/**
+ * Benchmark del índice de productos de la paginación con un catálogo de 30k
+ * productos: compara el pipeline anterior (filtrar y ordenar todo el catálogo
+ * en cada acceso, 4 accesos por render) con el índice memorizado.
+ *
+ * Uso (desde la raíz del módulo):
+ *   node --experimental-detect-module static/tests/benchmarks/product_list_index.bench.mjs
+ */
+import { ProductListIndex } from "../../src/app/utils/product_list_index.js";
+
+const CATALOG_SIZE = 30000;
+const CATEGORY_COUNT = 40;
+const PAGE_SIZE = 20;
+const ACCESSES_PER_RENDER = 4; // paginatedProducts, totalProductPages, hasNextPage, paginationInfo
+const RENDERS = 20;
+
+function makeCatalog(size) {
+  const categories = Array.from({ length: CATEGORY_COUNT }, (_, i) => ({ id: i + 1 }));
+  const products = [];
+  for (let id = 1; id <= size; id++) {
+    products.push({
+      id,
+      name: `Producto ${((id * 7919) % size).toString(36)} ${id}`,
+      is_favorite: id % 97 === 0,
+      pos_total_qty_sold: (id * 31) % 500,
+      pos_sequence: id % 10,
+      canBeDisplayed: id % 50 !== 0,
+      pos_categ_ids: [categories[id % CATEGORY_COUNT]],
+    });
+  }
+  return { products, categories };
+}
+
+function includeProduct(product) {
+  return product.canBeDisplayed;
+}
+
+// Pipeline anterior: filtrar + ordenar con localeCompare en cada acceso
+function legacyProductsToDisplay(products) {
+  return products.filter(includeProduct).sort((a, b) => {
+    if (b.is_favorite !== a.is_favorite) {
+      return b.is_favorite - a.is_favorite;
+    }
+    const qtyDiff = (b.pos_total_qty_sold || 0) - (a.pos_total_qty_sold || 0);
+    if (qtyDiff !== 0) {
+      return qtyDiff;
+    }
+    if (a.pos_sequence !== b.pos_sequence) {
+      return a.pos_sequence - b.pos_sequence;
+    }
+    return a.name.localeCompare(b.name);
+  });
+}
+
+function time(label, fn) {
+  const start = performance.now();
+  const result = fn();
+  const elapsed = performance.now() - start;
+  console.log(`${label.padEnd(48)} ${elapsed.toFixed(1).padStart(9)} ms`);
+  return result;
+}
+
+const { products, categories } = makeCatalog(CATALOG_SIZE);
+const categoryProducts = new Map(
+  categories.map((c) => [c.id, products.filter((p) => p.pos_categ_ids[0] === c)])
+);
+
+console.log(`Catálogo: ${CATALOG_SIZE} productos, ${RENDERS} renders x ${ACCESSES_PER_RENDER} accesos`);
+
+const legacy = time("Anterior: todo el catálogo", () => {
+  let list;
+  for (let i = 0; i < RENDERS * ACCESSES_PER_RENDER; i++) {
+    list = legacyProductsToDisplay(products);
+  }
+  return list;
+});
+
+const index = time("Índice: construcción (una vez por versión)", () =>
+  new ProductListIndex(products, includeProduct)
+);
+
+const memoized = time("Índice: todo el catálogo (páginas)", () => {
+  let page;
+  for (let i = 0; i < RENDERS * ACCESSES_PER_RENDER; i++) {
+    page = index.ranked.slice(i * PAGE_SIZE, (i + 1) * PAGE_SIZE);
+  }
+  return index.ranked;
+});
+
+time("Anterior: cada categoría", () => {
+  for (const [, list] of categoryProducts) {
+    legacyProductsToDisplay(list);
+  }
+});
+
+time("Índice: cada categoría (primera apertura)", () => {
+  for (const [categoryId, list] of categoryProducts) {
+    index.getCategoryProducts(categoryId, list);
+  }
+});
+
+time("Índice: cada categoría (memorizada)", () => {
+  for (const [categoryId, list] of categoryProducts) {
+    index.getCategoryProducts(categoryId, list);
+  }
+});
+
+// El índice debe producir el mismo orden que el pipeline anterior
+const sameOrder =
+  legacy.length === memoized.length && legacy.every((product, i) => product === memoized[i]);
+const sameCategoryOrder = categories.every((c) => {
+  const expected = legacyProductsToDisplay(categoryProducts.get(c.id));
+  const actual = index.getCategoryProducts(c.id, categoryProducts.get(c.id));
+  return expected.length === actual.length && expected.every((p, i) => p === actual[i]);
+});
+console.log(`Mismo orden que el pipeline anterior: ${sameOrder && sameCategoryOrder}`);
+if (!sameOrder || !sameCategoryOrder) {
+  process.exitCode = 1;
+}
@@ -1,6 +1,6 @@
 {
     'name': 'POS - Imágenes del Sitio Web de Productos',
-    'version': '1.1.0',
+    'version': '1.2.0',
     'category': 'Rutavity/POS',
     'summary': 'Muestra las imágenes del sitio web asociadas a productos en el POS',
     'description': """
@@ -12,6 +12,7 @@
         - Muestra la imagen principal del producto
         - Muestra todas las imágenes adicionales del sitio web
         - Galería con navegación y miniaturas
+        - Precarga de las imágenes de los productos visibles (una consulta por página)
         - Scrollbar personalizado y delgado
         - Fallback de descripción: usa description_ecommerce si no hay public_description
     """,
@@ -26,6 +27,7 @@
             'pos_product_website_images/static/src/app/models/product_template.js',
             'pos_product_website_images/static/src/app/popups/product_info_popup/product_info_popup.js',
             'pos_product_website_images/static/src/app/popups/product_info_popup/product_info_popup.xml',
+            'pos_product_website_images/static/src/app/screens/product_screen/product_screen.js',
             'pos_product_website_images/static/src/scss/product_info_popup.scss',
         ],
     },
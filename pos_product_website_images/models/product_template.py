@@ -1,4 +1,5 @@
 from odoo import api, models
+from odoo.tools import SQL
 
 
 class ProductTemplate(models.Model):
@@ -14,55 +15,116 @@ class ProductTemplate(models.Model):
         fields.append('description_ecommerce')
         return fields
 
+    @api.model
+    def _get_image_checksums(self, res_model, res_field, res_ids):
+        """
+        Checksum de las imágenes guardadas de los registros dados, leído de los
+        metadatos de ir.attachment sin cargar el contenido de las imágenes.
+
+        :return: {res_id: checksum} (solo los registros que tienen imagen)
+        """
+        if not res_ids:
+            return {}
+        self.env.cr.execute(SQL(
+            """
+            SELECT res_id, checksum
+              FROM ir_attachment
+             WHERE res_model = %s
+               AND res_field = %s
+               AND res_id = ANY(%s)
+            """,
+            res_model,
+            res_field,
+            list(res_ids),
+        ))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _prepare_pos_image(self, res_model, res_id, checksum, name, sequence, is_main=False):
+        """
+        Entrada de la galería del POS; el checksum se usa como parámetro unique
+        de las URLs, así el navegador las guarda en caché hasta que cambie la imagen.
+        """
+        url = f'/web/image/{res_model}/{res_id}'
+        return {
+            'id': f'main_{res_id}' if is_main else res_id,
+            'name': name,
+            'sequence': sequence,
+            'image_url': f'{url}/image_512?unique={checksum}',
+            'image_url_large': f'{url}/image_1024?unique={checksum}',
+            'is_main': is_main,
+        }
+
+    def _get_pos_image_manifests(self, product_variant=None):
+        """
+        Imágenes (principal + adicionales del sitio web) de los productos del
+        recordset, sin leer los binarios: la existencia y el checksum de cada
+        imagen se leen de los metadatos de sus adjuntos.
+
+        :param product_variant: variante cuya imagen principal se usa (un solo template)
+        :return: {product_tmpl_id: lista de imágenes ordenada por secuencia}
+        """
+        manifests = {template.id: [] for template in self}
+
+        # 1. Imagen principal - la de la variante si la tiene, si no la del template
+        variant_checksum = False
+        if product_variant:
+            variant_checksum = self._get_image_checksums(
+                'product.product', 'image_variant_1920', product_variant.ids
+            ).get(product_variant.id)
+        if variant_checksum:
+            manifests[product_variant.product_tmpl_id.id].append(self._prepare_pos_image(
+                'product.product', product_variant.id, variant_checksum, 'Imagen Principal', 0, is_main=True,
+            ))
+        else:
+            template_checksums = self._get_image_checksums('product.template', 'image_1920', self.ids)
+            for template_id, checksum in template_checksums.items():
+                if product_variant:
+                    # Misma URL que antes: la imagen de la variante cae en la del template
+                    res_model, res_id = 'product.product', product_variant.id
+                else:
+                    res_model, res_id = 'product.template', template_id
+                manifests[template_id].append(self._prepare_pos_image(
+                    res_model, res_id, checksum, 'Imagen Principal', 0, is_main=True,
+                ))
+
+        # 2. Imágenes adicionales del sitio web (product.image), solo las que tienen contenido
+        images = self.env['product.image'].search_fetch(
+            [('product_tmpl_id', 'in', self.ids)], ['name', 'sequence', 'product_tmpl_id'],
+        )
+        image_checksums = self._get_image_checksums('product.image', 'image_1920', images.ids)
+        for image in images:
+            checksum = image_checksums.get(image.id)
+            if checksum:
+                manifests[image.product_tmpl_id.id].append(self._prepare_pos_image(
+                    'product.image', image.id, checksum, image.name, image.sequence,
+                ))
+
+        for product_images in manifests.values():
+            product_images.sort(key=lambda x: x['sequence'])
+        return manifests
+
+    @api.model
+    def get_pos_image_manifests(self, product_tmpl_ids):
+        """
+        Imágenes de varios productos a la vez, para que el POS precargue las
+        imágenes de la página visible.
+
+        :param list product_tmpl_ids: ids de product.template
+        :return: {product_tmpl_id: lista de imágenes}
+        """
+        templates = self.browse(product_tmpl_ids).exists()
+        templates.check_access('read')
+        return templates._get_pos_image_manifests()
+
     def get_product_info_pos(self, price, quantity, pos_config_id, product_variant_id=False):
         """
         Extiende el método original para incluir la imagen principal y las imágenes adicionales del sitio web.
         """
         # Obtener la información base del método padre
         result = super().get_product_info_pos(price, quantity, pos_config_id, product_variant_id)
-        
-        # Lista para almacenar todas las imágenes (principal + adicionales)
-        product_images = []
-        
-        # 1. Agregar la imagen principal del producto - Determinar si usar imagen de variante o de template
-        if product_variant_id:
-            product_variant = self.env['product.product'].browse(product_variant_id)
-            main_image_model = 'product.product'
-            main_image_id = product_variant.id
-            has_main_image = product_variant.image_variant_1920 or product_variant.image_1920
-        else:
-            main_image_model = 'product.template'
-            main_image_id = self.id
-            has_main_image = self.image_1920
-        
-        if has_main_image:
-            product_images.append({
-                'id': f'main_{main_image_id}',
-                'name': 'Imagen Principal',
-                'sequence': 0,
-                'image_url': f'/web/image/{main_image_model}/{main_image_id}/image_512',
-                'image_url_large': f'/web/image/{main_image_model}/{main_image_id}/image_1024',
-                'is_main': True,
-            })
-        
-        # 2. Agregar las imágenes adicionales del producto (product.image del módulo website_sale)
-        # Usamos image_512 para un balance entre calidad y rendimiento
-        if self.product_template_image_ids:
-            for image in self.product_template_image_ids:
-                # Solo incluir imágenes que tengan contenido
-                if image.image_1920:
-                    product_images.append({
-                        'id': image.id,
-                        'name': image.name,
-                        'sequence': image.sequence,
-                        'image_url': f'/web/image/product.image/{image.id}/image_512',
-                        'image_url_large': f'/web/image/product.image/{image.id}/image_1024',
-                        'is_main': False,
-                    })
-        
-        product_images.sort(key=lambda x: x['sequence'])
-        
-        result['product_images'] = product_images
-        
-        return result
 
+        product_variant = self.env['product.product'].browse(product_variant_id) if product_variant_id else None
+        result['product_images'] = self._get_pos_image_manifests(product_variant)[self.id]
+
+        return result
@@ -0,0 +1,67 @@
+import { ProductScreen } from "@point_of_sale/app/screens/product_screen/product_screen";
+import { patch } from "@web/core/utils/patch";
+import { useEffect } from "@odoo/owl";
+
+// Imágenes ya consultadas por producto (id de template -> lista de imágenes)
+const imageManifests = new Map();
+
+/**
+ * Extiende el ProductScreen para precargar las imágenes de los productos
+ * visibles: una sola consulta por página trae las imágenes de todos sus
+ * productos, y el navegador las guarda en caché (URLs con unique) antes de
+ * abrir la información de un producto.
+ */
+patch(ProductScreen.prototype, {
+  setup() {
+    super.setup(...arguments);
+
+    useEffect(
+      (productIds) => {
+        this.prefetchProductImages(productIds.split(",").filter(Boolean).map(Number));
+      },
+      () => [this.visibleProductIds.join(",")]
+    );
+  },
+
+  /**
+   * Ids de los productos visibles (página actual)
+   */
+  get visibleProductIds() {
+    const ids = new Set();
+    for (const [, products] of this.pos.productToDisplayByCateg) {
+      for (const product of products) {
+        ids.add(product.id);
+      }
+    }
+    return [...ids];
+  },
+
+  /**
+   * Consulta las imágenes de los productos que aún no se conocen y precarga
+   * la imagen principal de cada uno
+   */
+  async prefetchProductImages(productIds) {
+    const missingIds = productIds.filter((id) => !imageManifests.has(id));
+    if (!missingIds.length) {
+      return;
+    }
+    let manifests;
+    try {
+      manifests = await this.pos.data.call("product.template", "get_pos_image_manifests", [
+        missingIds,
+      ]);
+    } catch {
+      // Sin conexión: las imágenes se cargarán al abrir el producto
+      return;
+    }
+    for (const productId of missingIds) {
+      imageManifests.set(productId, []);
+    }
+    for (const [productId, images] of Object.entries(manifests)) {
+      imageManifests.set(Number(productId), images);
+      if (images.length) {
+        new Image().src = images[0].image_url;
+      }
+    }
+  },
+});
@@ -1,6 +1,6 @@
 {
     'name': 'Inventario - Clasificación ABC de Productos',
-    'version': '1.0.0',
+    'version': '1.0.1',
     'category': 'Rutavity/Inventory',
     'summary': 'Clasificación automática ABC de productos basada en valor de ventas facturadas',
     'description': '''
@@ -37,6 +37,9 @@
           - Cálculo manual bajo demanda desde la configuración
           - Actualización automática de estadísticas de rendimiento
           - Notificaciones de finalización con resumen de clasificación
+          - Modo incremental: agregados mensuales de ventas por producto/bodega
+            actualizados al validar facturas; cada ejecución solo descarta los
+            meses vencidos antes de reclasificar
         
         **Cálculo de Ventas:**
           - Solo facturas de cliente confirmadas (out_invoice)
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """
+    Apuntar el cron diario ABC al encolado en segundo plano.
+
+    El registro está en un bloque noupdate, así que las bases existentes
+    seguían ejecutando el cálculo síncrono de product.template.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    cron = env.ref('product_abc_classification.ir_cron_calculate_abc_classification', raise_if_not_found=False)
+    if not cron:
+        return
+    cron.write({
+        'model_id': env.ref('product_abc_classification.model_abc_classification_config').id,
+        'code': 'model._cron_enqueue_abc_classification()',
+    })
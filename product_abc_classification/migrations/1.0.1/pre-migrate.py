@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+def migrate(cr, version):
+    """
+    Eliminar las clasificaciones ABC por bodega duplicadas antes de crear la
+    restricción UNIQUE(product_tmpl_id, warehouse_id).
+
+    La clase anidada Constraint de las versiones anteriores no era registrada
+    por el ORM, así que la tabla pudo acumular varias filas por producto y
+    bodega. Se conserva la fila más reciente (mayor id) de cada par.
+    """
+    cr.execute("SELECT to_regclass('product_abc_warehouse')")
+    if not cr.fetchone()[0]:
+        return
+
+    cr.execute("""
+        DELETE FROM product_abc_warehouse older
+         USING product_abc_warehouse newer
+         WHERE newer.product_tmpl_id = older.product_tmpl_id
+           AND newer.warehouse_id = older.warehouse_id
+           AND newer.id > older.id
+    """)
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 
+from . import classification_job_mixin
 from . import abc_classification_config
 from . import product_abc_warehouse
+from . import product_abc_sales_month
 from . import product_template
 from . import account_move_line
 from . import account_move
@@ -6,6 +6,7 @@ from odoo.exceptions import ValidationError
 class ABCClassificationConfig(models.Model):
     """Configuración de umbrales para clasificación ABC"""
     _name = 'abc.classification.config'
+    _inherit = ['classification.job.mixin']
     _description = 'ABC Classification Configuration'
     _rec_name = 'name'
 
@@ -67,6 +68,23 @@ class ABCClassificationConfig(models.Model):
         help='If checked, products without sales are classified as C'
     )
     
+    # Modo de cálculo
+    calculation_mode = fields.Selection([
+        ('full', 'Full Recalculation'),
+        ('incremental', 'Incremental (Monthly Aggregates)'),
+    ], string='Calculation Mode',
+       default='full',
+       required=True,
+       help='Full: scans every invoice line of the analysis period on each run.\n'
+            'Incremental: reads the monthly sales aggregates updated when invoices are posted; '
+            'each run only drops the expired months before re-ranking.')
+    
+    sales_months_start = fields.Date(
+        string='Aggregates Start Month',
+        readonly=True,
+        help='First month currently stored in the monthly sales aggregates'
+    )
+    
     # Información del último cálculo
     last_calculation_date = fields.Datetime(
         string='Last Execution',
@@ -127,9 +145,81 @@ class ABCClassificationConfig(models.Model):
             })
         return config
     
+    def action_rebuild_sales_months(self):
+        """
+        Botón para encolar la reconstrucción de los agregados mensuales de
+        ventas desde cero, seguida del cálculo ABC sobre los agregados nuevos
+        """
+        self.ensure_one()
+        self.env['product.template']._check_abc_dependencies()
+        return self.action_enqueue_job(chunks=['sales_months'] + self._get_job_chunks())
+    
     def action_calculate_abc_now(self):
-        """Botón para ejecutar el cálculo ABC manualmente"""
+        """Botón para encolar el cálculo ABC en segundo plano"""
+        self.ensure_one()
+        self.env['product.template']._check_abc_dependencies()
+        return self.action_enqueue_job()
+    
+    @api.model
+    def _cron_enqueue_abc_classification(self):
+        """Cron diario: encolar el cálculo ABC de la configuración activa"""
+        config = self.get_active_config()
+        if config.job_state not in ('queued', 'running'):
+            config.action_enqueue_job()
+    
+    # ------------------------------------------------------------------
+    # Ejecución en segundo plano (classification.job.mixin)
+    # ------------------------------------------------------------------
+    
+    def _get_job_cron(self):
+        return self.env.ref('product_abc_classification.ir_cron_abc_classification_job_runner')
+    
+    def _get_job_chunks(self):
+        """
+        Un bloque para el ABC Global y uno por cada bodega, con commit después
+        de cada uno. Todos usan una sola extracción de ventas por ejecución.
+        """
+        warehouses = self.env['stock.warehouse'].search([])
+        return ['global'] + ['warehouse:%d' % warehouse.id for warehouse in warehouses]
+    
+    def _get_job_chunk_label(self, chunk):
+        if chunk == 'global':
+            return _('ABC Global')
+        if chunk == 'sales_months':
+            return _('Agregados Mensuales')
+        warehouse = self.env['stock.warehouse'].browse(int(chunk.split(':')[1])).exists()
+        return warehouse.name or chunk
+    
+    def _run_job_chunk(self, chunk):
         self.ensure_one()
+        if chunk == 'sales_months':
+            # Reconstrucción completa de los agregados desde el inicio de la ventana
+            self.sales_months_start = False
+            self.env['product.abc.sales.month']._sync_window(self)
+            return
+        
         ProductTemplate = self.env['product.template']
-        return ProductTemplate.action_calculate_abc_classification()
+        ProductTemplate._check_abc_dependencies()
+        products = ProductTemplate._get_abc_products()
+        if not products:
+            return
+        
+        # Ventas de todas las bodegas, extraídas una vez para todos los bloques
+        sales_lines_df = self._get_job_run_data(
+            'sales_lines_df', lambda: ProductTemplate._get_abc_sales_frame(self, products.ids)
+        )
+        if chunk == 'global':
+            ProductTemplate._calculate_abc_global(products.ids, self, sales_lines_df)
+            return
+        
+        warehouse = self.env['stock.warehouse'].browse(int(chunk.split(':')[1])).exists()
+        if warehouse:
+            ProductTemplate._calculate_abc_by_warehouse(products.ids, self, sales_lines_df, warehouse)
+    
+    def _finish_job(self):
+        self.write({
+            'last_calculation_date': fields.Datetime.now(),
+            'products_calculated': len(self.env['product.template']._get_abc_products()),
+            'calculation_time': self.job_elapsed,
+        })
 
@@ -13,71 +13,106 @@ class AccountMove(models.Model):
         # Llamar al método original
         posted = super(AccountMove, self)._post(soft=soft)
         
-        # Actualizar ABC en líneas de factura de cliente
-        for move in self:
-            if move.move_type in ('out_invoice', 'out_refund') and move.state == 'posted':
-                move._update_abc_on_invoice_lines()
+        # Actualizar ABC en líneas de factura de cliente (todo el lote a la vez)
+        self.filtered(
+            lambda m: m.move_type in ('out_invoice', 'out_refund') and m.state == 'posted'
+        )._update_abc_on_invoice_lines()
+        
+        # Acumular ventas en los agregados mensuales (ABC incremental)
+        self.env['product.abc.sales.month']._add_moves(
+            posted.filtered(lambda m: m.state == 'posted')
+        )
         
         return posted
     
+    def button_draft(self):
+        """
+        Override para descontar de los agregados mensuales ABC las facturas
+        validadas que vuelven a borrador
+        """
+        self.env['product.abc.sales.month']._add_moves(
+            self.filtered(lambda m: m.state == 'posted'), sign=-1
+        )
+        return super(AccountMove, self).button_draft()
+    
     def _update_abc_on_invoice_lines(self):
         """
         Actualizar campos ABC en líneas de factura al validar
+        
+        Procesa todas las facturas del lote juntas: una sola búsqueda de ABC por
+        (producto, bodega), costos leídos en bloque por compañía y escrituras
+        agrupadas por valores idénticos.
         """
-        self.ensure_one()
+        lines = self.invoice_line_ids.filtered(
+            lambda l: l.display_type == 'product' and l.product_id
+        )
+        if not lines:
+            return
         
-        for line in self.invoice_line_ids:
-            if line.display_type == 'product' and line.product_id:
-                # Obtener ABC del producto al momento de la venta
-                product_template = line.product_id.product_tmpl_id
-                
-                # Determinar bodega de la línea desde la orden de venta
-                warehouse_id = False
-                if line.sale_line_ids:
-                    # Obtener bodega desde la orden de venta
-                    sale_order = line.sale_line_ids[0].order_id
-                    if sale_order and sale_order.warehouse_id:
-                        warehouse_id = sale_order.warehouse_id.id
-                
-                # Obtener ABC global del producto
-                abc_classification_global = product_template.abc_classification_global or 'c'
-                abc_sales_value_global = product_template.abc_sales_value_global or 0.0
-                
-                # Obtener ABC correspondiente por bodega (si existe)
-                abc_classification = 'c'
-                abc_sales_value = 0.0
-                
-                if warehouse_id:
-                    abc_warehouse = self.env['product.abc.warehouse'].search([
-                        ('product_tmpl_id', '=', product_template.id),
-                        ('warehouse_id', '=', warehouse_id)
-                    ], limit=1)
-                    if abc_warehouse:
-                        abc_classification = abc_warehouse.classification
-                        abc_sales_value = abc_warehouse.sales_value
-                    else:
-                        # Si no hay ABC por bodega, usar el global
-                        abc_classification = abc_classification_global
-                        abc_sales_value = abc_sales_value_global
-                else:
-                    # Si no hay bodega, usar ABC global
-                    abc_classification = abc_classification_global
-                    abc_sales_value = abc_sales_value_global
-                
-                # Obtener costo del producto al momento de la venta
-                product = line.product_id.with_company(line.company_id or self.env.company)
-                product_cost = product.standard_price
-                
-                # Convertir a la UoM de la línea si es diferente
-                if line.product_uom_id and line.product_uom_id != product.uom_id:
-                    product_cost = product.uom_id._compute_price(product_cost, line.product_uom_id)
-                
-                # Actualizar línea con todos los datos al momento de la venta
-                line.write({
-                    'abc_classification_global_at_sale': abc_classification_global,
-                    'abc_classification_at_sale': abc_classification,
-                    'abc_sales_value_at_sale': abc_sales_value,
-                    'abc_warehouse_id': warehouse_id,
-                    'product_cost_at_sale': product_cost,
-                })
-
+        # Determinar bodega de cada línea desde la orden de venta
+        line_warehouse = {
+            line.id: line.sale_line_ids[:1].order_id.warehouse_id.id
+            for line in lines
+        }
+        
+        # Prefetch de ABC por bodega para todos los pares (producto, bodega) del lote
+        templates = lines.product_id.product_tmpl_id
+        warehouse_ids = {wh_id for wh_id in line_warehouse.values() if wh_id}
+        abc_by_key = {}
+        if warehouse_ids:
+            abc_records = self.env['product.abc.warehouse'].search([
+                ('product_tmpl_id', 'in', templates.ids),
+                ('warehouse_id', 'in', list(warehouse_ids)),
+            ])
+            abc_by_key = {
+                (abc.product_tmpl_id.id, abc.warehouse_id.id): abc
+                for abc in abc_records
+            }
+        
+        # Costos en bloque por compañía (standard_price depende de la compañía)
+        cost_by_key = {}
+        for company, company_lines in lines.grouped(lambda l: l.company_id or self.env.company).items():
+            for product in company_lines.product_id.with_company(company):
+                cost_by_key[(company.id, product.id)] = product.standard_price
+        
+        # Calcular valores por línea y agrupar líneas con valores idénticos
+        lines_by_values = {}
+        for line in lines:
+            product_template = line.product_id.product_tmpl_id
+            warehouse_id = line_warehouse[line.id] or False
+            
+            # Obtener ABC global del producto
+            abc_classification_global = product_template.abc_classification_global or 'c'
+            abc_sales_value_global = product_template.abc_sales_value_global or 0.0
+            
+            # Obtener ABC correspondiente por bodega (si no existe, usar el global)
+            abc_warehouse = abc_by_key.get((product_template.id, warehouse_id)) if warehouse_id else None
+            if abc_warehouse:
+                abc_classification = abc_warehouse.classification
+                abc_sales_value = abc_warehouse.sales_value
+            else:
+                abc_classification = abc_classification_global
+                abc_sales_value = abc_sales_value_global
+            
+            # Obtener costo del producto al momento de la venta
+            company = line.company_id or self.env.company
+            product_cost = cost_by_key[(company.id, line.product_id.id)]
+            
+            # Convertir a la UoM de la línea si es diferente
+            product_uom = line.product_id.uom_id
+            if line.product_uom_id and line.product_uom_id != product_uom:
+                product_cost = product_uom._compute_price(product_cost, line.product_uom_id)
+            
+            values = (
+                ('abc_classification_global_at_sale', abc_classification_global),
+                ('abc_classification_at_sale', abc_classification),
+                ('abc_sales_value_at_sale', abc_sales_value),
+                ('abc_warehouse_id', warehouse_id),
+                ('product_cost_at_sale', product_cost),
+            )
+            lines_by_values.setdefault(values, []).append(line.id)
+        
+        # Actualizar líneas con todos los datos al momento de la venta
+        AccountMoveLine = self.env['account.move.line']
+        for values, line_ids in lines_by_values.items():
+            AccountMoveLine.browse(line_ids).write(dict(values))
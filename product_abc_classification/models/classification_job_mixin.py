@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Datos compartidos por los bloques de una misma ejecución en el worker
+# {(base de datos, modelo, id): (inicio de la ejecución, {nombre: valor})}
+_job_run_data = {}
+
+
+class ClassificationJobMixin(models.AbstractModel):
+    """
+    Ejecución en segundo plano de cálculos de clasificación por bloques
+
+    La configuración que hereda este mixin define sus bloques (p.ej. 'global' y
+    uno por bodega). El botón solo encola el trabajo y dispara el cron; el cron
+    ejecuta los bloques pendientes haciendo commit después de cada uno y se
+    vuelve a disparar al agotar su presupuesto de tiempo, de modo que el
+    cálculo sobrevive a los límites de los workers y no bloquea la interfaz.
+    """
+    _name = 'classification.job.mixin'
+    _description = 'Classification Background Job Mixin'
+
+    job_state = fields.Selection([
+        ('idle', 'Idle'),
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Job Status', default='idle', required=True, readonly=True, copy=False)
+
+    job_pending_chunks = fields.Json(
+        string='Pending Chunks',
+        readonly=True,
+        copy=False,
+        help='Chunks of the current run that are still pending'
+    )
+
+    job_chunks_total = fields.Integer(string='Total Chunks', readonly=True, copy=False)
+    job_chunks_done = fields.Integer(string='Chunks Done', readonly=True, copy=False)
+
+    job_progress = fields.Float(
+        string='Progress (%)',
+        compute='_compute_job_progress',
+        help='Percentage of chunks completed in the current run'
+    )
+
+    job_started_at = fields.Datetime(string='Job Started', readonly=True, copy=False)
+    job_finished_at = fields.Datetime(string='Job Finished', readonly=True, copy=False)
+
+    job_elapsed = fields.Float(
+        string='Elapsed Time (sec)',
+        readonly=True,
+        copy=False,
+        help='Processing time accumulated by the chunks of the current run'
+    )
+
+    job_chunk_timings = fields.Text(
+        string='Chunk Timings',
+        readonly=True,
+        copy=False,
+        help='Processing time of each chunk of the current run'
+    )
+
+    job_error = fields.Text(string='Job Error', readonly=True, copy=False)
+
+    job_time_budget = fields.Integer(
+        string='Cron Time Budget (sec)',
+        default=60,
+        help='Maximum time a single cron execution keeps processing chunks before '
+             'committing and rescheduling itself. Keep it below the worker time limit.'
+    )
+
+    @api.depends('job_chunks_total', 'job_chunks_done')
+    def _compute_job_progress(self):
+        for record in self:
+            record.job_progress = (
+                100.0 * record.job_chunks_done / record.job_chunks_total
+                if record.job_chunks_total else 0.0
+            )
+
+    # ------------------------------------------------------------------
+    # Métodos a implementar por cada configuración
+    # ------------------------------------------------------------------
+
+    def _get_job_chunks(self):
+        """Lista de bloques (cadenas serializables) que componen un cálculo completo"""
+        raise NotImplementedError()
+
+    def _get_job_chunk_label(self, chunk):
+        """Nombre legible de un bloque para el detalle de tiempos"""
+        return chunk
+
+    def _run_job_chunk(self, chunk):
+        """Ejecutar un bloque del cálculo"""
+        raise NotImplementedError()
+
+    def _finish_job(self):
+        """Acciones al completar todos los bloques (estadísticas del cálculo)"""
+
+    def _get_job_cron(self):
+        """Cron que procesa los trabajos encolados de este modelo"""
+        raise NotImplementedError()
+
+    def _get_job_run_data(self, name, compute):
+        """
+        Valor compartido por los bloques de la ejecución actual (p.ej. la
+        extracción de ventas): se calcula una vez por worker y ejecución, y se
+        vuelve a calcular si un bloque continúa en otro worker
+        """
+        self.ensure_one()
+        key = (self.env.cr.dbname, self._name, self.id)
+        run_started_at, values = _job_run_data.get(key, (None, {}))
+        if run_started_at != self.job_started_at:
+            values = {}
+            _job_run_data[key] = (self.job_started_at, values)
+        if name not in values:
+            values[name] = compute()
+        return values[name]
+
+    def _clear_job_run_data(self):
+        """Liberar los datos compartidos de la ejecución"""
+        _job_run_data.pop((self.env.cr.dbname, self._name, self.id), None)
+
+    # ------------------------------------------------------------------
+    # Encolado y ejecución
+    # ------------------------------------------------------------------
+
+    def action_enqueue_job(self, chunks=None):
+        """
+        Encolar un cálculo completo (o solo los bloques indicados) y disparar
+        el cron en segundo plano
+        """
+        self.ensure_one()
+        if self.job_state in ('queued', 'running'):
+            raise UserError(_('A calculation is already in progress for this configuration.'))
+
+        chunks = chunks or self._get_job_chunks()
+        self.write({
+            'job_state': 'queued',
+            'job_pending_chunks': chunks,
+            'job_chunks_total': len(chunks),
+            'job_chunks_done': 0,
+            'job_started_at': False,
+            'job_finished_at': False,
+            'job_elapsed': 0.0,
+            'job_chunk_timings': False,
+            'job_error': False,
+        })
+        self._get_job_cron()._trigger()
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Calculation Queued'),
+                'message': _('The calculation will run in the background in %d chunks.') % len(chunks),
+                'type': 'info',
+                'sticky': False,
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            }
+        }
+
+    @api.model
+    def _cron_run_jobs(self):
+        """Procesar los trabajos encolados o interrumpidos, con commit por bloque"""
+        start = time.monotonic()
+        for config in self.search([('job_state', 'in', ('queued', 'running'))]):
+            if not config._process_job(start + config.job_time_budget):
+                # Presupuesto agotado: continuar en una nueva ejecución del cron
+                self._get_job_cron()._trigger()
+                return
+
+    def _process_job(self, deadline):
+        """
+        Ejecutar bloques pendientes hasta terminar o agotar el presupuesto
+        Devuelve False si quedaron bloques pendientes
+        """
+        self.ensure_one()
+        if self.job_state == 'queued':
+            self.write({'job_state': 'running', 'job_started_at': fields.Datetime.now()})
+            self.env.cr.commit()
+
+        while self.job_pending_chunks:
+            if time.monotonic() >= deadline:
+                return False
+
+            chunk = self.job_pending_chunks[0]
+            chunk_start = time.monotonic()
+            try:
+                self._run_job_chunk(chunk)
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception('Classification chunk %s of %s failed', chunk, self)
+                self.write({
+                    'job_state': 'failed',
+                    'job_finished_at': fields.Datetime.now(),
+                    'job_error': _('Chunk %s failed: %s') % (self._get_job_chunk_label(chunk), e),
+                })
+                self.env.cr.commit()
+                self._clear_job_run_data()
+                return True
+
+            seconds = time.monotonic() - chunk_start
+            timing = '%s: %.2f s' % (self._get_job_chunk_label(chunk), seconds)
+            self.write({
+                'job_pending_chunks': self.job_pending_chunks[1:],
+                'job_chunks_done': self.job_chunks_done + 1,
+                'job_elapsed': self.job_elapsed + seconds,
+                'job_chunk_timings': '\n'.join(filter(None, [self.job_chunk_timings, timing])),
+            })
+            self.env.cr.commit()
+            _logger.info('%s - %s', self.display_name, timing)
+
+        self._finish_job()
+        self.write({'job_state': 'done', 'job_finished_at': fields.Datetime.now()})
+        self.env.cr.commit()
+        self._clear_job_run_data()
+        return True
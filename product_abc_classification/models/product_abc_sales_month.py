@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+
+class ProductABCSalesMonth(models.Model):
+    """
+    Ventas facturadas agregadas por (producto, bodega, mes, tipo de factura)
+
+    Alimentada de forma incremental al validar / pasar a borrador facturas de
+    cliente, permite recalcular el ABC sin recorrer account_move_line completo.
+    """
+    _name = 'product.abc.sales.month'
+    _description = 'Product ABC Monthly Sales Aggregate'
+    _order = 'month desc, warehouse_id, product_tmpl_id'
+    _rec_name = 'product_tmpl_id'
+
+    product_tmpl_id = fields.Many2one(
+        comodel_name='product.template',
+        string='Product',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+
+    warehouse_id = fields.Many2one(
+        comodel_name='stock.warehouse',
+        string='Warehouse',
+        ondelete='cascade',
+        index=True,
+        help='Warehouse of the originating sale order (empty if the invoice line has no sale order)'
+    )
+
+    month = fields.Date(
+        string='Month',
+        required=True,
+        index=True,
+        help='First day of the invoice month'
+    )
+
+    move_type = fields.Selection([
+        ('out_invoice', 'Customer Invoice'),
+        ('out_refund', 'Customer Credit Note'),
+    ], string='Type', required=True)
+
+    quantity = fields.Float(
+        string='Quantity',
+        help='Invoiced quantity in the month'
+    )
+
+    sales_value = fields.Float(
+        string='Sales Value',
+        help='Invoiced untaxed amount (price subtotal) in the month'
+    )
+
+    # Índice único requerido por el upsert ON CONFLICT (warehouse_id puede ser NULL)
+    _product_warehouse_month_uniq = models.UniqueIndex(
+        '(product_tmpl_id, COALESCE(warehouse_id, 0), month, move_type)'
+    )
+
+    @api.model
+    def _get_window_start(self, analysis_period_months, date_to=None):
+        """Primer mes de la ventana de análisis (mes que contiene date_to - N meses)"""
+        date_to = date_to or fields.Date.today()
+        return (date_to - relativedelta(months=analysis_period_months)).replace(day=1)
+
+    @api.model
+    def _add_moves(self, moves, sign=1):
+        """
+        Sumar (sign=1) o restar (sign=-1) las líneas de producto de las facturas
+        de cliente dadas en sus agregados mensuales, en una sola sentencia
+        """
+        moves = moves.filtered(lambda m: m.move_type in ('out_invoice', 'out_refund') and m.invoice_date)
+        if not moves:
+            return
+
+        self._upsert_from_invoice_lines(
+            SQL("am.id = ANY(%s)", moves.ids),
+            sign=sign,
+        )
+
+    @api.model
+    def _rebuild(self, month_from):
+        """Reconstruir todos los agregados desde month_from a partir de las facturas validadas"""
+        _logger.info('Reconstruyendo agregados mensuales ABC desde %s...', month_from)
+        self.flush_model()
+        self.env.cr.execute(SQL("DELETE FROM product_abc_sales_month"))
+        self._upsert_from_invoice_lines(SQL(
+            "am.move_type IN ('out_invoice', 'out_refund') AND am.state = 'posted' AND am.invoice_date >= %s",
+            month_from,
+        ))
+
+    @api.model
+    def _prune(self, month_from):
+        """Eliminar los meses que salieron de la ventana de análisis"""
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            "DELETE FROM product_abc_sales_month WHERE month < %s",
+            month_from,
+        ))
+        self.invalidate_model()
+
+    @api.model
+    def _upsert_from_invoice_lines(self, where, sign=1):
+        """Agregar líneas de factura por (producto, bodega, mes, tipo) y acumularlas en la tabla"""
+        ProductTemplate = self.env['product.template']
+        ProductTemplate._flush_invoice_sales_models()
+        self.flush_model()
+
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO product_abc_sales_month (
+                product_tmpl_id, warehouse_id, month, move_type, quantity, sales_value,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT pp.product_tmpl_id,
+                   wh.warehouse_id,
+                   date_trunc('month', am.invoice_date)::date,
+                   am.move_type,
+                   %(sign)s * SUM(aml.quantity),
+                   %(sign)s * SUM(aml.price_subtotal),
+                   %(uid)s, (now() AT TIME ZONE 'UTC'), %(uid)s, (now() AT TIME ZONE 'UTC')
+              %(from_clause)s
+             WHERE %(where)s
+               AND aml.display_type = 'product'
+             GROUP BY pp.product_tmpl_id, wh.warehouse_id, date_trunc('month', am.invoice_date), am.move_type
+            ON CONFLICT (product_tmpl_id, COALESCE(warehouse_id, 0), month, move_type) DO UPDATE
+               SET quantity = product_abc_sales_month.quantity + EXCLUDED.quantity,
+                   sales_value = product_abc_sales_month.sales_value + EXCLUDED.sales_value,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+            """,
+            from_clause=ProductTemplate._get_invoice_sales_from_clause(),
+            where=where,
+            sign=sign,
+            uid=self.env.uid,
+        ))
+        self.invalidate_model()
+
+    @api.model
+    def _get_sales_data(self, product_ids, month_from, warehouse_ids=None):
+        """
+        Ventas de la ventana leídas de los agregados mensuales, con la misma
+        forma que ProductTemplate._get_sales_data_with_pandas
+        warehouse_ids: limitar a estas bodegas (None = todas)
+        """
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            """
+            SELECT product_tmpl_id, warehouse_id, move_type, SUM(quantity), SUM(sales_value)
+              FROM product_abc_sales_month
+             WHERE month >= %(month_from)s
+               AND product_tmpl_id = ANY(%(product_ids)s)
+               %(warehouse_filter)s
+             GROUP BY product_tmpl_id, warehouse_id, move_type
+            """,
+            month_from=month_from,
+            warehouse_filter=SQL("AND warehouse_id = ANY(%s)", list(warehouse_ids)) if warehouse_ids else SQL(),
+            product_ids=list(product_ids),
+        ))
+        return self.env['product.template']._sales_rows_to_dataframe(self.env.cr.fetchall())
+
+    @api.model
+    def _sync_window(self, config):
+        """
+        Ajustar los agregados a la ventana de análisis de la configuración:
+        - sin agregados o ventana ampliada: reconstrucción completa
+        - ventana desplazada: solo se eliminan los meses vencidos
+        (los meses nuevos ya llegaron al validar las facturas)
+        """
+        month_from = self._get_window_start(config.analysis_period_months)
+        if not config.sales_months_start or config.sales_months_start > month_from:
+            self._rebuild(month_from)
+        elif config.sales_months_start < month_from:
+            self._prune(month_from)
+        else:
+            return month_from
+        config.sales_months_start = month_from
+        return month_from
@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
 from odoo import api, fields, models, _
+from odoo.tools import SQL
+
+# Filas por sentencia INSERT ... ON CONFLICT
+UPSERT_BATCH_SIZE = 5000
 
 
 class ProductABCWarehouse(models.Model):
@@ -57,11 +61,11 @@ class ProductABCWarehouse(models.Model):
         help='Date and time when this ABC was last calculated'
     )
     
-    # Constraint SQL (Odoo 19+)
-    class Constraint(models.Constraint):
-        _sql = "UNIQUE(product_tmpl_id, warehouse_id)"
-        _name = "unique_product_warehouse"
-        _message = "ABC classification must be unique per product and warehouse!"
+    # Constraint SQL (Odoo 19+), requerida por el upsert ON CONFLICT
+    _unique_product_warehouse = models.Constraint(
+        'UNIQUE(product_tmpl_id, warehouse_id)',
+        'ABC classification must be unique per product and warehouse!',
+    )
     
     def name_get(self):
         """Nombre personalizado para el modelo"""
@@ -70,4 +74,62 @@ class ProductABCWarehouse(models.Model):
             name = f"{record.product_tmpl_id.name} - {record.warehouse_id.name} [{record.classification.upper()}]"
             result.append((record.id, name))
         return result
-
+    
+    @api.model
+    def _upsert_abc_rows(self, df, calculation_date):
+        """
+        Insertar o actualizar en bloque la clasificación ABC por (producto, bodega)
+        
+        df: DataFrame con columnas product_id, warehouse_id, classification,
+            net_sales_value, cumulative_percentage, rank
+        
+        Usa INSERT ... ON CONFLICT sobre la restricción unique_product_warehouse,
+        una sentencia por lote de UPSERT_BATCH_SIZE filas.
+        """
+        if df.empty:
+            return
+        
+        self.flush_model()
+        columns = {
+            'product_ids': df['product_id'].astype(int).tolist(),
+            'warehouse_ids': df['warehouse_id'].astype(int).tolist(),
+            'classifications': df['classification'].astype(str).tolist(),
+            'sales_values': df['net_sales_value'].astype(float).tolist(),
+            'cumulative_percentages': df['cumulative_percentage'].astype(float).tolist(),
+            'ranks': df['rank'].astype(int).tolist(),
+        }
+        
+        for start in range(0, len(df), UPSERT_BATCH_SIZE):
+            batch = slice(start, start + UPSERT_BATCH_SIZE)
+            self.env.cr.execute(SQL(
+                """
+                INSERT INTO product_abc_warehouse (
+                    product_tmpl_id, warehouse_id, classification, sales_value,
+                    cumulative_percentage, rank, last_calculation,
+                    create_uid, create_date, write_uid, write_date
+                )
+                SELECT r.product_tmpl_id, r.warehouse_id, r.classification, r.sales_value,
+                       r.cumulative_percentage, r.rank, %(calculation_date)s,
+                       %(uid)s, (now() AT TIME ZONE 'UTC'), %(uid)s, (now() AT TIME ZONE 'UTC')
+                  FROM unnest(
+                        %(product_ids)s::int[], %(warehouse_ids)s::int[], %(classifications)s::varchar[],
+                        %(sales_values)s::float8[], %(cumulative_percentages)s::float8[], %(ranks)s::int[]
+                       ) AS r(product_tmpl_id, warehouse_id, classification, sales_value,
+                              cumulative_percentage, rank)
+                ON CONFLICT (product_tmpl_id, warehouse_id) DO UPDATE
+                   SET classification = EXCLUDED.classification,
+                       sales_value = EXCLUDED.sales_value,
+                       cumulative_percentage = EXCLUDED.cumulative_percentage,
+                       rank = EXCLUDED.rank,
+                       last_calculation = EXCLUDED.last_calculation,
+                       write_uid = EXCLUDED.write_uid,
+                       write_date = EXCLUDED.write_date
+                """,
+                calculation_date=calculation_date,
+                uid=self.env.uid,
+                **{key: values[batch] for key, values in columns.items()},
+            ))
+        
+        # Los registros se escribieron por SQL: limpiar la caché del ORM
+        self.invalidate_model()
+        self.env['product.template'].invalidate_model(['abc_warehouse_ids'])
@@ -13,9 +13,13 @@ except ImportError:
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+from odoo.tools import SQL
 
 _logger = logging.getLogger(__name__)
 
+# Filas por sentencia en las escrituras masivas de resultados ABC
+ABC_WRITE_BATCH_SIZE = 5000
+
 
 class ProductTemplate(models.Model):
     _inherit = 'product.template'
@@ -94,17 +98,21 @@ class ProductTemplate(models.Model):
     @api.depends('abc_selected_warehouse_id', 'abc_warehouse_ids.classification', 'abc_warehouse_ids.sales_value')
     def _compute_abc_selected_warehouse(self):
         """Calcular ABC de la bodega seleccionada"""
+        # Una sola consulta para todos los pares (producto, bodega seleccionada) del lote
+        abc_records = self.env['product.abc.warehouse'].search_fetch([
+            ('product_tmpl_id', 'in', self._origin.ids),
+            ('warehouse_id', 'in', self.abc_selected_warehouse_id.ids),
+        ], ['product_tmpl_id', 'warehouse_id', 'classification', 'sales_value'])
+        abc_by_key = {
+            (abc_record.product_tmpl_id.id, abc_record.warehouse_id.id): abc_record
+            for abc_record in abc_records
+        }
+        
         for product in self:
-            if product.abc_selected_warehouse_id:
-                abc_record = product.abc_warehouse_ids.filtered(
-                    lambda r: r.warehouse_id == product.abc_selected_warehouse_id
-                )
-                if abc_record:
-                    product.abc_selected_warehouse_classification = abc_record[0].classification
-                    product.abc_selected_warehouse_sales = abc_record[0].sales_value
-                else:
-                    product.abc_selected_warehouse_classification = False
-                    product.abc_selected_warehouse_sales = 0.0
+            abc_record = abc_by_key.get((product._origin.id, product.abc_selected_warehouse_id.id))
+            if abc_record:
+                product.abc_selected_warehouse_classification = abc_record.classification
+                product.abc_selected_warehouse_sales = abc_record.sales_value
             else:
                 product.abc_selected_warehouse_classification = False
                 product.abc_selected_warehouse_sales = 0.0
@@ -114,13 +122,12 @@ class ProductTemplate(models.Model):
         """
         Calcular clasificación ABC para todos o algunos productos
         Calcula ABC Global y ABC por cada Bodega
-        Optimizado con pandas desde el inicio
+        Optimizado con pandas desde el inicio: una sola extracción agrupada en SQL
+        alimenta el ranking global y el de todas las bodegas
+        (ejecución síncrona; ver abc.classification.config.action_enqueue_job
+        para la ejecución en segundo plano por bloques)
         """
-        if pd is None or np is None:
-            raise UserError(_(
-                'Las librerías pandas y numpy no están instaladas.\n'
-                'Instale con: pip install pandas numpy'
-            ))
+        self._check_abc_dependencies()
         
         start_time = time.time()
         _logger.info('Iniciando cálculo de clasificación ABC (Global y por Bodega)...')
@@ -128,35 +135,24 @@ class ProductTemplate(models.Model):
         # Obtener configuración
         config = self.env['abc.classification.config'].get_active_config()
         
-        # Calcular período
-        date_to = fields.Date.today()
-        date_from = date_to - relativedelta(months=config.analysis_period_months)
-        
-        # Filtrar productos almacenables
-        domain = [
-            ('type', '=', 'consu'),
-            ('is_storable', '=', True),
-        ]
-        if product_ids:
-            domain.append(('id', 'in', product_ids))
-        
-        products = self.search(domain)
+        products = self._get_abc_products(product_ids)
         
         if not products:
             return self._show_notification(_('Sin productos'), 
                                           _('No hay productos almacenables para clasificar'), 
                                           'warning')
         
+        # Extraer ventas agrupadas (producto, bodega, tipo) en UNA sola consulta
+        sales_lines_df = self._get_abc_sales_frame(config, products.ids)
+        
         # Calcular ABC Global (todas las bodegas)
         _logger.info('Calculando ABC Global...')
-        self._calculate_abc_global(products.ids, config, date_from, date_to)
+        self._calculate_abc_global(products.ids, config, sales_lines_df)
         
-        # Calcular ABC por cada bodega
+        # Calcular ABC de todas las bodegas a partir del mismo frame
         _logger.info('Calculando ABC por Bodega...')
         warehouses = self.env['stock.warehouse'].search([])
-        for warehouse in warehouses:
-            _logger.info(f'  - Procesando bodega: {warehouse.name}')
-            self._calculate_abc_by_warehouse(products.ids, config, date_from, date_to, warehouse)
+        self._calculate_abc_by_warehouse(products.ids, config, sales_lines_df, warehouses)
         
         # Actualizar estadísticas en configuración
         elapsed = time.time() - start_time
@@ -175,11 +171,47 @@ class ProductTemplate(models.Model):
         )
     
     @api.model
-    def _calculate_abc_global(self, product_ids, config, date_from, date_to):
+    def _check_abc_dependencies(self):
+        """Validar que pandas y numpy estén instalados"""
+        if pd is None or np is None:
+            raise UserError(_(
+                'Las librerías pandas y numpy no están instaladas.\n'
+                'Instale con: pip install pandas numpy'
+            ))
+    
+    @api.model
+    def _get_abc_products(self, product_ids=None):
+        """Productos almacenables a clasificar"""
+        domain = [
+            ('type', '=', 'consu'),
+            ('is_storable', '=', True),
+        ]
+        if product_ids:
+            domain.append(('id', 'in', product_ids))
+        return self.search(domain)
+    
+    @api.model
+    def _get_abc_sales_frame(self, config, product_ids, warehouse_ids=None):
+        """
+        Frame de ventas (producto, bodega, tipo) de la ventana de análisis
+        según el modo de cálculo de la configuración
+        warehouse_ids: limitar a las ventas de estas bodegas (None = todas)
+        """
+        if config.calculation_mode == 'incremental':
+            # Desde los agregados mensuales (solo se eliminan los meses vencidos)
+            SalesMonth = self.env['product.abc.sales.month']
+            month_from = SalesMonth._sync_window(config)
+            return SalesMonth._get_sales_data(product_ids, month_from, warehouse_ids=warehouse_ids)
+        
+        date_to = fields.Date.today()
+        date_from = date_to - relativedelta(months=config.analysis_period_months)
+        return self._get_sales_data_with_pandas(product_ids, date_from, date_to, warehouse_ids=warehouse_ids)
+    
+    @api.model
+    def _calculate_abc_global(self, product_ids, config, sales_lines_df):
         """Calcular ABC Global (todas las bodegas sumadas)"""
         
-        # Obtener datos de ventas con pandas optimizado
-        sales_df = self._get_sales_data_with_pandas(product_ids, date_from, date_to, warehouse_id=None)
+        sales_df = self._aggregate_net_sales(sales_lines_df)
         
         if sales_df.empty:
             # Sin ventas: todos clasificación C
@@ -201,170 +233,175 @@ class ProductTemplate(models.Model):
             self._classify_products_without_sales_global(products_without_sales_ids)
     
     @api.model
-    def _calculate_abc_by_warehouse(self, product_ids, config, date_from, date_to, warehouse):
-        """Calcular ABC para una bodega específica"""
-        
-        # Obtener datos de ventas de esta bodega con pandas optimizado
-        sales_df = self._get_sales_data_with_pandas(product_ids, date_from, date_to, warehouse_id=warehouse.id)
-        
-        if sales_df.empty:
-            # Sin ventas en esta bodega
-            if config.include_zero_sales:
-                self._classify_products_without_sales_warehouse(product_ids, warehouse)
-            return
-        
-        # Aplicar clasificación ABC
-        classified_df = self._apply_abc_classification(sales_df, config)
+    def _calculate_abc_by_warehouse(self, product_ids, config, sales_lines_df, warehouses):
+        """Calcular ABC de todas las bodegas en una sola pasada sobre el frame de ventas"""
         
-        # Guardar resultados por bodega
-        self._save_abc_results_warehouse(classified_df, warehouse)
+        warehouse_df = self._aggregate_net_sales(sales_lines_df, by_warehouse=True)
+        warehouse_df = warehouse_df[warehouse_df['warehouse_id'].isin(warehouses.ids)]
         
-        # Clasificar productos sin ventas como C en esta bodega
-        products_with_sales = set(classified_df['product_id'].tolist())
-        products_without_sales_ids = [pid for pid in product_ids if pid not in products_with_sales]
+        if not warehouse_df.empty:
+            # Aplicar clasificación ABC (ranking independiente por bodega)
+            warehouse_df = self._apply_abc_classification(warehouse_df, config, group_by='warehouse_id')
+            
+            # Guardar resultados por bodega
+            self._save_abc_results_warehouse(warehouse_df)
         
-        if products_without_sales_ids and config.include_zero_sales:
-            self._classify_products_without_sales_warehouse(products_without_sales_ids, warehouse)
+        # Clasificar productos sin ventas como C en cada bodega
+        if config.include_zero_sales:
+            self._classify_products_without_sales_warehouse(product_ids, warehouses, warehouse_df)
     
     @api.model
-    def _get_sales_data_with_pandas(self, product_ids, date_from, date_to, warehouse_id=None):
+    def _get_sales_data_with_pandas(self, product_ids, date_from, date_to, warehouse_ids=None):
         """
         Obtener datos de ventas con pandas DESDE EL INICIO
-        warehouse_id: None = todas las bodegas, int = bodega específica
         
-        Optimización: Uso de pandas desde la consulta inicial, sin loops FOR
+        Una sola consulta SQL agrupada devuelve directamente
+        (product_tmpl_id, warehouse_id, move_type, quantity, price_subtotal),
+        sin cargar registros del ORM. La bodega se toma de la orden de venta
+        vinculada a la línea (NULL si la línea no viene de una venta).
+        warehouse_ids: limitar a las líneas de estas bodegas (None = todas)
         """
-        
-        # Construir dominio base
-        domain_invoice = [
-            ('move_id.move_type', '=', 'out_invoice'),
-            ('move_id.state', '=', 'posted'),
-            ('move_id.invoice_date', '>=', date_from),
-            ('move_id.invoice_date', '<=', date_to),
-            ('product_id.product_tmpl_id', 'in', product_ids),
-            ('display_type', '=', 'product'),
+        self._flush_invoice_sales_models()
+        self.env.cr.execute(SQL(
+            """
+            SELECT pp.product_tmpl_id,
+                   wh.warehouse_id,
+                   am.move_type,
+                   SUM(aml.quantity) AS quantity,
+                   SUM(aml.price_subtotal) AS price_subtotal
+              %(from_clause)s
+             WHERE am.move_type IN ('out_invoice', 'out_refund')
+               AND am.state = 'posted'
+               AND am.invoice_date BETWEEN %(date_from)s AND %(date_to)s
+               AND aml.display_type = 'product'
+               AND pp.product_tmpl_id = ANY(%(product_ids)s)
+               %(warehouse_filter)s
+             GROUP BY pp.product_tmpl_id, wh.warehouse_id, am.move_type
+            """,
+            from_clause=self._get_invoice_sales_from_clause(),
+            warehouse_filter=SQL("AND wh.warehouse_id = ANY(%s)", list(warehouse_ids)) if warehouse_ids else SQL(),
+            date_from=date_from,
+            date_to=date_to,
+            product_ids=list(product_ids),
+        ))
+        return self._sales_rows_to_dataframe(self.env.cr.fetchall())
+    
+    @api.model
+    def _flush_invoice_sales_models(self):
+        """Volcar a la BD los campos leídos por las consultas de ventas facturadas"""
+        self.env['account.move.line'].flush_model([
+            'move_id', 'product_id', 'display_type', 'quantity', 'price_subtotal',
+        ])
+        self.env['account.move'].flush_model(['move_type', 'state', 'invoice_date'])
+        self.env['sale.order.line'].flush_model(['order_id', 'invoice_lines'])
+        self.env['sale.order'].flush_model(['warehouse_id'])
+    
+    @api.model
+    def _get_invoice_sales_from_clause(self):
+        """
+        FROM compartido por las consultas de ventas facturadas:
+        líneas de producto (aml) con su factura (am), su variante (pp) y la
+        bodega (wh.warehouse_id) de la primera línea de venta vinculada
+        """
+        return SQL(
+            """
+              FROM account_move_line aml
+              JOIN account_move am ON am.id = aml.move_id
+              JOIN product_product pp ON pp.id = aml.product_id
+              LEFT JOIN LATERAL (
+                    SELECT so.warehouse_id
+                      FROM sale_order_line_invoice_rel rel
+                      JOIN sale_order_line sol ON sol.id = rel.order_line_id
+                      JOIN sale_order so ON so.id = sol.order_id
+                     WHERE rel.invoice_line_id = aml.id
+                       AND so.warehouse_id IS NOT NULL
+                     ORDER BY sol.id
+                     LIMIT 1
+                   ) wh ON TRUE
+            """
+        )
+    
+    @api.model
+    def _sales_rows_to_dataframe(self, rows):
+        """
+        Construir el frame de ventas por columnas (sin dicts por fila)
+        rows: tuplas (product_tmpl_id, warehouse_id, move_type, quantity, price_subtotal)
+        """
+        columns = ['product_id', 'warehouse_id', 'move_type', 'quantity', 'price_subtotal']
+        values = list(zip(*rows)) if rows else [[] for _col in columns]
+        return pd.DataFrame({
+            'product_id': np.asarray(values[0], dtype=np.int64),
+            'warehouse_id': pd.array(values[1], dtype='Int64'),
+            'move_type': np.asarray(values[2], dtype=object),
+            'quantity': np.asarray(values[3], dtype=np.float64),
+            'price_subtotal': np.asarray(values[4], dtype=np.float64),
+        }, columns=columns)
+    
+    @api.model
+    def _aggregate_net_sales(self, sales_lines_df, by_warehouse=False):
+        """
+        Calcular ventas netas (facturas - notas crédito) por producto,
+        o por (bodega, producto) si by_warehouse=True, con pandas vectorizado
+        """
+        keys = ['warehouse_id', 'product_id'] if by_warehouse else ['product_id']
+        result_columns = keys + [
+            'quantity', 'sales_value', 'quantity_refunded', 'refund_value',
+            'net_sales_value', 'net_quantity',
         ]
         
-        domain_refund = [
-            ('move_id.move_type', '=', 'out_refund'),
-            ('move_id.state', '=', 'posted'),
-            ('move_id.invoice_date', '>=', date_from),
-            ('move_id.invoice_date', '<=', date_to),
-            ('product_id.product_tmpl_id', 'in', product_ids),
-            ('display_type', '=', 'product'),
-        ]
+        df = sales_lines_df
+        if by_warehouse:
+            # Las líneas sin bodega solo cuentan para el ABC Global
+            df = df[df['warehouse_id'].notna()]
+        if df.empty:
+            return pd.DataFrame(columns=result_columns)
+        
+        is_refund = (df['move_type'] == 'out_refund').to_numpy()
+        quantity = df['quantity'].to_numpy()
+        subtotal = df['price_subtotal'].to_numpy()
+        df = pd.DataFrame({
+            **{key: df[key].to_numpy() for key in keys},
+            'quantity': np.where(is_refund, 0.0, quantity),
+            'sales_value': np.where(is_refund, 0.0, subtotal),
+            'quantity_refunded': np.where(is_refund, quantity, 0.0),
+            'refund_value': np.where(is_refund, subtotal, 0.0),
+        })
+        df = df.groupby(keys, sort=False).sum().reset_index()
+        if by_warehouse:
+            df['warehouse_id'] = df['warehouse_id'].astype(np.int64)
         
-        # Obtener líneas de factura
-        invoice_lines = self.env['account.move.line'].search(domain_invoice)
-        refund_lines = self.env['account.move.line'].search(domain_refund)
-        
-        # Si se filtra por bodega, crear mapeo línea->bodega en UNA SOLA consulta (optimizado)
-        line_warehouse_map = {}
-        if warehouse_id:
-            # Obtener todas las relaciones sale.order.line -> invoice_lines de golpe
-            all_line_ids = invoice_lines.ids + refund_lines.ids
-            if all_line_ids:
-                sale_lines = self.env['sale.order.line'].search([
-                    ('invoice_lines', 'in', all_line_ids)
-                ])
-                
-                # Crear mapeo: invoice_line_id -> warehouse_id
-                for sale_line in sale_lines:
-                    if sale_line.order_id.warehouse_id:
-                        for inv_line in sale_line.invoice_lines:
-                            line_warehouse_map[inv_line.id] = sale_line.order_id.warehouse_id.id
-        
-        # Extraer datos a listas para pandas (optimizado)
-        invoice_data = []
-        for line in invoice_lines:
-            if line.product_id and line.product_id.product_tmpl_id:
-                # Filtrar por bodega si se especifica
-                if warehouse_id:
-                    line_wh = line_warehouse_map.get(line.id)
-                    if line_wh != warehouse_id:
-                        continue  # Saltar líneas de otras bodegas
-                
-                invoice_data.append({
-                    'product_tmpl_id': line.product_id.product_tmpl_id.id,
-                    'quantity': line.quantity,
-                    'price_subtotal': line.price_subtotal,
-                })
-        
-        refund_data = []
-        for line in refund_lines:
-            if line.product_id and line.product_id.product_tmpl_id:
-                # Filtrar por bodega si se especifica
-                if warehouse_id:
-                    line_wh = line_warehouse_map.get(line.id)
-                    if line_wh != warehouse_id:
-                        continue  # Saltar líneas de otras bodegas
-                
-                refund_data.append({
-                    'product_tmpl_id': line.product_id.product_tmpl_id.id,
-                    'quantity': line.quantity,
-                    'price_subtotal': line.price_subtotal,
-                })
-        
-        # Crear DataFrames y agrupar con pandas (sin loops adicionales)
-        if invoice_data:
-            df_invoices = pd.DataFrame(invoice_data)
-            # Agrupar con pandas (sin FOR loops)
-            sales_agg = df_invoices.groupby('product_tmpl_id').agg({
-                'quantity': 'sum',
-                'price_subtotal': 'sum'
-            }).reset_index()
-            sales_agg.columns = ['product_id', 'quantity', 'sales_value']
-        else:
-            sales_agg = pd.DataFrame(columns=['product_id', 'quantity', 'sales_value'])
-        
-        if refund_data:
-            df_refunds = pd.DataFrame(refund_data)
-            # Agrupar con pandas (sin FOR loops)
-            refunds_agg = df_refunds.groupby('product_tmpl_id').agg({
-                'quantity': 'sum',
-                'price_subtotal': 'sum'
-            }).reset_index()
-            refunds_agg.columns = ['product_id', 'quantity_refunded', 'refund_value']
-        else:
-            refunds_agg = pd.DataFrame(columns=['product_id', 'quantity_refunded', 'refund_value'])
-        
-        # Merge de DataFrames (sin FOR loops)
-        if not sales_agg.empty:
-            df = sales_agg.merge(refunds_agg, on='product_id', how='left')
-            # Usar infer_objects + fillna para evitar FutureWarning de pandas
-            df = df.infer_objects(copy=False)
-            df['quantity_refunded'] = df['quantity_refunded'].fillna(0)
-            df['refund_value'] = df['refund_value'].fillna(0)
-            
-            # Calcular valores netos con pandas vectorizado
-            df['net_sales_value'] = df['sales_value'] - df['refund_value']
-            df['net_quantity'] = df['quantity'] - df['quantity_refunded']
-            
-            # Filtrar productos con ventas netas positivas
-            df = df[df['net_sales_value'] > 0].reset_index(drop=True)
-            
-            return df
+        # Calcular valores netos con pandas vectorizado
+        df['net_sales_value'] = df['sales_value'] - df['refund_value']
+        df['net_quantity'] = df['quantity'] - df['quantity_refunded']
         
-        return pd.DataFrame()
+        # Filtrar productos con ventas netas positivas
+        return df[df['net_sales_value'] > 0].reset_index(drop=True)[result_columns]
     
     @api.model
-    def _apply_abc_classification(self, df, config):
+    def _apply_abc_classification(self, df, config, group_by=None):
         """
         Aplicar clasificación ABC usando pandas
+        group_by: columna opcional (p.ej. 'warehouse_id') para calcular un
+        ranking independiente por grupo en una sola pasada
         """
-        # Ordenar por valor de ventas (mayor a menor)
-        df = df.sort_values('net_sales_value', ascending=False).reset_index(drop=True)
-        
-        # Calcular total de ventas
-        total_sales = df['net_sales_value'].sum()
+        # Ordenar por valor de ventas (mayor a menor), dentro de cada grupo
+        if group_by:
+            df = df.sort_values(
+                [group_by, 'net_sales_value'], ascending=[True, False], kind='mergesort'
+            ).reset_index(drop=True)
+            groups = df.groupby(group_by, sort=False)
+            total_sales = groups['net_sales_value'].transform('sum')
+            df['cumulative_value'] = groups['net_sales_value'].cumsum()
+            df['rank'] = groups.cumcount() + 1
+        else:
+            df = df.sort_values('net_sales_value', ascending=False).reset_index(drop=True)
+            total_sales = df['net_sales_value'].sum()
+            df['cumulative_value'] = df['net_sales_value'].cumsum()
+            df['rank'] = range(1, len(df) + 1)
         
         # Calcular porcentaje acumulado (como decimal para widget percentage)
-        df['cumulative_value'] = df['net_sales_value'].cumsum()
         df['cumulative_percentage'] = (df['cumulative_value'] / total_sales)
         
-        # Asignar ranking
-        df['rank'] = range(1, len(df) + 1)
-        
         # Aplicar clasificación basada en umbrales
         conditions = [
             df['cumulative_percentage'] <= (config.threshold_aaa / 100),
@@ -379,52 +416,48 @@ class ProductTemplate(models.Model):
     
     @api.model
     def _save_abc_results_global(self, df):
-        """Guardar resultados de ABC Global en product.template"""
+        """
+        Guardar resultados de ABC Global en product.template
+        Una sentencia UPDATE por lote y por clasificación (sin write() por producto)
+        """
         calculation_date = fields.Datetime.now()
-        
-        # Actualización masiva con pandas
-        for idx, row in df.iterrows():
-            product = self.browse(int(row['product_id']))
-            product.write({
-                'abc_classification_global': row['classification'],
-                'abc_sales_value_global': float(row['net_sales_value']),
-                'abc_last_calculation': calculation_date,
-                # Actualizar también el campo abc_classification con el global
-                'abc_classification': row['classification'],
-                'abc_sales_value': float(row['net_sales_value']),
-            })
+        abc_fields = [
+            'abc_classification_global', 'abc_sales_value_global',
+            'abc_classification', 'abc_sales_value', 'abc_last_calculation',
+        ]
+        self.flush_model(abc_fields)
+        
+        for classification, group in df.groupby('classification', sort=False):
+            product_ids = group['product_id'].astype(int).tolist()
+            sales_values = group['net_sales_value'].astype(float).tolist()
+            for start in range(0, len(product_ids), ABC_WRITE_BATCH_SIZE):
+                batch = slice(start, start + ABC_WRITE_BATCH_SIZE)
+                self.env.cr.execute(SQL(
+                    """
+                    UPDATE product_template pt
+                       SET abc_classification_global = %(classification)s,
+                           abc_classification = %(classification)s,
+                           abc_sales_value_global = v.sales_value,
+                           abc_sales_value = v.sales_value,
+                           abc_last_calculation = %(calculation_date)s,
+                           write_uid = %(uid)s,
+                           write_date = (now() AT TIME ZONE 'UTC')
+                      FROM unnest(%(product_ids)s::int[], %(sales_values)s::float8[]) AS v(id, sales_value)
+                     WHERE pt.id = v.id
+                    """,
+                    classification=str(classification),
+                    calculation_date=calculation_date,
+                    uid=self.env.uid,
+                    product_ids=product_ids[batch],
+                    sales_values=sales_values[batch],
+                ))
+        
+        self.invalidate_model(abc_fields + ['write_uid', 'write_date'])
     
     @api.model
-    def _save_abc_results_warehouse(self, df, warehouse):
-        """Guardar resultados de ABC por Bodega en product.abc.warehouse"""
-        calculation_date = fields.Datetime.now()
-        ABCWarehouse = self.env['product.abc.warehouse']
-        
-        for idx, row in df.iterrows():
-            product_id = int(row['product_id'])
-            
-            # Buscar o crear registro ABC para este producto-bodega
-            abc_record = ABCWarehouse.search([
-                ('product_tmpl_id', '=', product_id),
-                ('warehouse_id', '=', warehouse.id)
-            ], limit=1)
-            
-            values = {
-                'classification': row['classification'],
-                'sales_value': float(row['net_sales_value']),
-                'cumulative_percentage': float(row['cumulative_percentage']),
-                'rank': int(row['rank']),
-                'last_calculation': calculation_date,
-            }
-            
-            if abc_record:
-                abc_record.write(values)
-            else:
-                values.update({
-                    'product_tmpl_id': product_id,
-                    'warehouse_id': warehouse.id,
-                })
-                ABCWarehouse.create(values)
+    def _save_abc_results_warehouse(self, df):
+        """Guardar resultados de ABC por Bodega en product.abc.warehouse (upsert masivo)"""
+        self.env['product.abc.warehouse']._upsert_abc_rows(df, fields.Datetime.now())
     
     @api.model
     def _classify_products_without_sales_global(self, product_ids):
@@ -441,33 +474,28 @@ class ProductTemplate(models.Model):
         })
     
     @api.model
-    def _classify_products_without_sales_warehouse(self, product_ids, warehouse):
-        """Clasificar productos sin ventas como C (por Bodega)"""
-        ABCWarehouse = self.env['product.abc.warehouse']
-        calculation_date = fields.Datetime.now()
+    def _classify_products_without_sales_warehouse(self, product_ids, warehouses, with_sales_df=None):
+        """
+        Clasificar productos sin ventas como C (por Bodega)
+        Se construyen todos los pares (bodega, producto) sin ventas con pandas
+        y se guardan con un único upsert masivo
+        """
+        pairs = pd.MultiIndex.from_product(
+            [warehouses.ids, list(product_ids)], names=['warehouse_id', 'product_id']
+        )
+        if with_sales_df is not None and not with_sales_df.empty:
+            pairs = pairs.difference(
+                pd.MultiIndex.from_frame(with_sales_df[['warehouse_id', 'product_id']])
+            )
+        if pairs.empty:
+            return
         
-        for product_id in product_ids:
-            abc_record = ABCWarehouse.search([
-                ('product_tmpl_id', '=', product_id),
-                ('warehouse_id', '=', warehouse.id)
-            ], limit=1)
-            
-            values = {
-                'classification': 'c',
-                'sales_value': 0.0,
-                'cumulative_percentage': 1.0,
-                'rank': 0,
-                'last_calculation': calculation_date,
-            }
-            
-            if abc_record:
-                abc_record.write(values)
-            else:
-                values.update({
-                    'product_tmpl_id': product_id,
-                    'warehouse_id': warehouse.id,
-                })
-                ABCWarehouse.create(values)
+        df = pairs.to_frame(index=False)
+        df['classification'] = 'c'
+        df['net_sales_value'] = 0.0
+        df['cumulative_percentage'] = 1.0
+        df['rank'] = 0
+        self.env['product.abc.warehouse']._upsert_abc_rows(df, fields.Datetime.now())
     
     @api.model
     def _show_notification(self, title, message, notification_type):
@@ -1,6 +1,6 @@
 {
     'name': 'Inventario - Clasificación por Rotación de Productos',
-    'version': '1.0.0',
+    'version': '1.0.1',
     'category': 'Rutavity/Inventory',
     'summary': 'Clasificación automática de productos por rotación de inventario basada en duración de stock',
     'description': '''
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+def migrate(cr, version):
+    """
+    Eliminar las clasificaciones por rotación duplicadas antes de crear el
+    índice único (product_tmpl_id, COALESCE(warehouse_id, 0)).
+
+    Las clases anidadas Constraint de las versiones anteriores no eran
+    registradas por el ORM, así que la tabla pudo acumular varias filas por
+    producto y bodega, o varias filas globales (warehouse_id NULL) por
+    producto. Se conserva la fila más reciente (mayor id) de cada par.
+    """
+    cr.execute("SELECT to_regclass('product_rotation_warehouse')")
+    if not cr.fetchone()[0]:
+        return
+
+    cr.execute("""
+        DELETE FROM product_rotation_warehouse older
+         USING product_rotation_warehouse newer
+         WHERE newer.product_tmpl_id = older.product_tmpl_id
+           AND COALESCE(newer.warehouse_id, 0) = COALESCE(older.warehouse_id, 0)
+           AND newer.id > older.id
+    """)
@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
 from odoo import api, fields, models, _
+from odoo.tools import SQL
+
+UPSERT_BATCH_SIZE = 5000
+# Consumos mensuales individuales guardados por registro (consumption_m0..m11)
+CONSUMPTION_COLUMNS = [f'consumption_m{i}' for i in range(12)]
 
 
 class ProductRotationWarehouse(models.Model):
@@ -78,18 +83,13 @@ class ProductRotationWarehouse(models.Model):
         help='Fecha y hora cuando esta rotación fue calculada por última vez'
     )
     
-    # Constraints SQL (Odoo 19+)
-    # Constraint 1: Único por producto cuando hay bodega específica
-    class Constraint(models.Constraint):
-        _sql = "UNIQUE(product_tmpl_id, warehouse_id)"
-        _name = "unique_product_warehouse_rotation"
-        _message = "La clasificación por rotación debe ser única por producto y bodega!"
-    
-    # Constraint 2: Solo un registro global (warehouse_id=NULL) por producto
-    class ConstraintGlobal(models.Constraint):
-        _sql = "UNIQUE(product_tmpl_id) WHERE warehouse_id IS NULL"
-        _name = "unique_product_global_rotation"
-        _message = "Solo puede haber una clasificación global por producto!"
+    # Índice único (Odoo 19+), requerido por el upsert ON CONFLICT:
+    # - único por producto y bodega
+    # - un solo registro global (warehouse_id=NULL) por producto
+    _unique_product_warehouse_rotation = models.UniqueIndex(
+        '(product_tmpl_id, COALESCE(warehouse_id, 0))',
+        "La clasificación por rotación debe ser única por producto y bodega!",
+    )
     
     def name_get(self):
         """Nombre personalizado para el modelo"""
@@ -101,3 +101,76 @@ class ProductRotationWarehouse(models.Model):
             result.append((record.id, name))
         return result
 
+
+    @api.model
+    def _upsert_rotation_rows(self, df, calculation_date):
+        """
+        Insertar o actualizar en bloque la rotación por (producto, bodega)
+        junto con sus 12 consumos mensuales
+        
+        df: DataFrame con columnas product_id, warehouse_id (0 = global),
+            rotation_classification, rotation_months, stock_qty,
+            monthly_consumption, monthly_consumption_top10, consumption_m0..m11
+        
+        Usa INSERT ... ON CONFLICT sobre el índice único (producto, bodega),
+        una sentencia por lote de UPSERT_BATCH_SIZE filas.
+        """
+        if df.empty:
+            return
+        
+        self.flush_model()
+        value_columns = [
+            'rotation_months', 'stock_qty', 'monthly_consumption', 'monthly_consumption_top10',
+        ] + CONSUMPTION_COLUMNS
+        arrays = {
+            'product_tmpl_id': (df['product_id'].astype(int).tolist(), 'int'),
+            'warehouse_id': (df['warehouse_id'].astype(int).tolist(), 'int'),
+            'rotation_classification': (df['rotation_classification'].astype(str).tolist(), 'varchar'),
+        }
+        for column in value_columns:
+            arrays[column] = (df[column].astype(float).tolist(), 'float8')
+        
+        names = SQL(', ').join(SQL.identifier(name) for name in arrays)
+        select = SQL(', ').join(
+            # warehouse_id = 0 representa la clasificación global (NULL)
+            SQL('NULLIF(r.warehouse_id, 0)') if name == 'warehouse_id'
+            else SQL.identifier('r', name)
+            for name in arrays
+        )
+        updates = SQL(', ').join(
+            SQL('%s = EXCLUDED.%s', SQL.identifier(name), SQL.identifier(name))
+            for name in ['rotation_classification'] + value_columns
+        )
+        
+        for start in range(0, len(df), UPSERT_BATCH_SIZE):
+            batch = slice(start, start + UPSERT_BATCH_SIZE)
+            unnest_args = SQL(', ').join(
+                SQL('%s::%s[]', values[batch], SQL(sql_type))
+                for values, sql_type in arrays.values()
+            )
+            self.env.cr.execute(SQL(
+                """
+                INSERT INTO product_rotation_warehouse (
+                    %(names)s, last_calculation,
+                    create_uid, create_date, write_uid, write_date
+                )
+                SELECT %(select)s, %(calculation_date)s,
+                       %(uid)s, (now() AT TIME ZONE 'UTC'), %(uid)s, (now() AT TIME ZONE 'UTC')
+                  FROM unnest(%(unnest_args)s) AS r(%(names)s)
+                ON CONFLICT (product_tmpl_id, COALESCE(warehouse_id, 0)) DO UPDATE
+                   SET %(updates)s,
+                       last_calculation = EXCLUDED.last_calculation,
+                       write_uid = EXCLUDED.write_uid,
+                       write_date = EXCLUDED.write_date
+                """,
+                names=names,
+                select=select,
+                unnest_args=unnest_args,
+                updates=updates,
+                calculation_date=calculation_date,
+                uid=self.env.uid,
+            ))
+        
+        # Los registros se escribieron por SQL: limpiar la caché del ORM
+        self.invalidate_model()
+        self.env['product.template'].invalidate_model(['rotation_warehouse_ids'])
@@ -2,7 +2,9 @@
 
 import logging
 from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
 from odoo import models, fields, api, _
+from odoo.tools import SQL
 
 _logger = logging.getLogger(__name__)
 
@@ -14,6 +16,59 @@ except ImportError:
     pd = None
     np = None
 
+# Meses individuales de consumo guardados por producto (consumption_m0..m11)
+CONSUMPTION_MONTHS = 12
+# Meses más altos promediados en monthly_consumption_top10
+TOP_CONSUMPTION_MONTHS = 10
+
+
+def month_offsets(dates, today):
+    """
+    Meses transcurridos entre el mes de cada fecha y el mes de `today`
+    (0 = mes actual, 1 = mes pasado, ...) con aritmética entera de numpy.
+    """
+    current_month = np.datetime64(today, 'M')
+    return (current_month - np.asarray(dates, dtype='datetime64[s]').astype('datetime64[M]')).astype(np.int64)
+
+
+def monthly_consumption_matrix(rows, n_rows, move_dates, move_quantities, move_is_out, today):
+    """
+    Matriz (n_rows × 12 meses) de consumo neto con un único np.bincount.
+
+    Args:
+        rows: fila destino de cada movimiento (-1 = descartar)
+        n_rows: número de filas de la matriz
+        move_dates: fecha de cada movimiento
+        move_quantities: cantidad de cada movimiento
+        move_is_out: True si el movimiento es salida (venta), False si es devolución
+        today: fecha de referencia del mes actual (M0)
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    offsets = month_offsets(move_dates, today)
+    # Consumo neto: +qty si es salida, -qty si es devolución
+    quantities = np.asarray(move_quantities, dtype=np.float64)
+    net_qty = np.where(np.asarray(move_is_out, dtype=bool), quantities, -quantities)
+
+    # Solo filas solicitadas y los últimos 12 meses
+    mask = (rows >= 0) & (offsets >= 0) & (offsets < CONSUMPTION_MONTHS)
+    return np.bincount(
+        rows[mask] * CONSUMPTION_MONTHS + offsets[mask],
+        weights=net_qty[mask],
+        minlength=n_rows * CONSUMPTION_MONTHS,
+    ).reshape(n_rows, CONSUMPTION_MONTHS)
+
+
+def top_months_average(matrix, top=TOP_CONSUMPTION_MONTHS):
+    """
+    Promedio de los `top` meses más altos de cada fila de la matriz
+    (descarta los meses más bajos con np.partition, sin ordenar la fila completa).
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    months = matrix.shape[1]
+    if months > top:
+        matrix = np.partition(matrix, months - top, axis=1)[:, months - top:]
+    return matrix.sum(axis=1) / float(top)
+
 
 class ProductTemplate(models.Model):
     """
@@ -152,12 +207,18 @@ class ProductTemplate(models.Model):
                  'rotation_warehouse_ids.monthly_consumption_top10')
     def _compute_rotation_global(self):
         """Calcular campos globales desde product.rotation.warehouse donde warehouse_id=False"""
+        # Una sola consulta para todos los productos del lote
+        rotations_global = self.env['product.rotation.warehouse'].search_fetch([
+            ('product_tmpl_id', 'in', self._origin.ids),
+            ('warehouse_id', '=', False)
+        ], [
+            'product_tmpl_id', 'rotation_classification', 'rotation_months', 'stock_qty',
+            'monthly_consumption', 'monthly_consumption_top10',
+        ])
+        rotation_by_product = {rotation.product_tmpl_id.id: rotation for rotation in rotations_global}
+        
         for product in self:
-            # Buscar registro global (warehouse_id=False)
-            rotation_global = self.env['product.rotation.warehouse'].search([
-                ('product_tmpl_id', '=', product.id),
-                ('warehouse_id', '=', False)
-            ], limit=1)
+            rotation_global = rotation_by_product.get(product._origin.id)
             
             if rotation_global:
                 product.rotation_classification_global = rotation_global.rotation_classification
@@ -175,19 +236,22 @@ class ProductTemplate(models.Model):
     @api.depends('rotation_selected_warehouse_id', 'rotation_warehouse_ids')
     def _compute_rotation_selected_warehouse(self):
         """Calcular rotación para la bodega seleccionada"""
+        # Una sola consulta para todos los pares (producto, bodega seleccionada) del lote
+        rotations_wh = self.env['product.rotation.warehouse'].search_fetch([
+            ('product_tmpl_id', 'in', self._origin.ids),
+            ('warehouse_id', 'in', self.rotation_selected_warehouse_id.ids)
+        ], ['product_tmpl_id', 'warehouse_id', 'rotation_classification', 'rotation_months'])
+        rotation_by_key = {
+            (rotation.product_tmpl_id.id, rotation.warehouse_id.id): rotation
+            for rotation in rotations_wh
+        }
+        
         for product in self:
-            if product.rotation_selected_warehouse_id:
-                rotation_wh = self.env['product.rotation.warehouse'].search([
-                    ('product_tmpl_id', '=', product.id),
-                    ('warehouse_id', '=', product.rotation_selected_warehouse_id.id)
-                ], limit=1)
-                
-                if rotation_wh:
-                    product.rotation_selected_warehouse_classification = rotation_wh.rotation_classification
-                    product.rotation_selected_warehouse_months = rotation_wh.rotation_months
-                else:
-                    product.rotation_selected_warehouse_classification = False
-                    product.rotation_selected_warehouse_months = 0.0
+            rotation_wh = rotation_by_key.get((product._origin.id, product.rotation_selected_warehouse_id.id))
+            
+            if rotation_wh:
+                product.rotation_selected_warehouse_classification = rotation_wh.rotation_classification
+                product.rotation_selected_warehouse_months = rotation_wh.rotation_months
             else:
                 product.rotation_selected_warehouse_classification = False
                 product.rotation_selected_warehouse_months = 0.0
@@ -197,34 +261,27 @@ class ProductTemplate(models.Model):
         Método principal para calcular la clasificación por rotación:
         - Global (todas las bodegas)
         - Por cada bodega individual
+        Ambas en una sola pasada sobre los movimientos de venta y el stock.
         """
-        if pd is None or np is None:
-            raise ValueError(_('pandas and numpy libraries are required for rotation calculation'))
+        self._check_rotation_dependencies()
 
         start_time = datetime.now()
         _logger.info("=== INICIO: Cálculo de Clasificación por Rotación ===")
 
         # Obtener configuración
-        config = self.env['rotation.classification.config'].search([], limit=1)
-        if not config:
-            config = self.env['rotation.classification.config'].create({})
+        config = self.env['rotation.classification.config']._get_config()
 
         # Obtener productos almacenables
-        products = self.search([
-            ('type', '=', 'consu'),
-            ('is_storable', '=', True),
-        ])
+        products = self._get_rotation_products()
         
         _logger.info(f"Productos a clasificar: {len(products)}")
 
         if not products:
             return True
 
-        # 1. Calcular rotación GLOBAL
-        self._calculate_rotation_global(config, products)
-        
-        # 2. Calcular rotación POR BODEGA
-        self._calculate_rotation_all_warehouses(config, products)
+        # Calcular rotación GLOBAL y POR BODEGA en una sola pasada
+        warehouses = self.env['stock.warehouse'].search([])
+        self._calculate_rotation(config, products, warehouses, include_global=True)
         
         # Actualizar estadísticas
         duration = (datetime.now() - start_time).total_seconds()
@@ -247,306 +304,305 @@ class ProductTemplate(models.Model):
             }
         }
 
-    def _calculate_rotation_global(self, config, products):
+    @api.model
+    def _check_rotation_dependencies(self):
+        """Validar que pandas y numpy estén instalados"""
+        if pd is None or np is None:
+            raise ValueError(_('pandas and numpy libraries are required for rotation calculation'))
+
+    @api.model
+    def _get_rotation_products(self):
+        """Productos almacenables a clasificar"""
+        return self.search([
+            ('type', '=', 'consu'),
+            ('is_storable', '=', True),
+        ])
+
+    def _calculate_rotation_global(self, config, products, rotation_data=None):
         """Calcular rotación global (todas las bodegas sumadas)"""
-        _logger.info("Calculando rotación GLOBAL...")
+        self._calculate_rotation(
+            config, products, self.env['stock.warehouse'], include_global=True, rotation_data=rotation_data
+        )
+
+    def _calculate_rotation_warehouse(self, config, products, warehouse, rotation_data=None):
+        """Calcular rotación para una bodega individual"""
+        self._calculate_rotation(
+            config, products, warehouse, include_global=False, rotation_data=rotation_data
+        )
+
+    def _get_rotation_data(self, config, products, warehouses, include_global=True):
+        """
+        Extraer los movimientos de venta y el stock de las bodegas (y global)
+        para uno o varios cálculos de rotación.
         
-        # Obtener datos de ventas con pandas (global)
-        sales_data_df = self._get_consumption_data_with_pandas(config, products, warehouse_id=None)
+        Returns:
+            dict con moves_df, global_stock_df, warehouse_stock_df, period_start y today
+        """
+        today = datetime.now().date()
+        period_start = today - timedelta(days=config.analysis_period_months * 30)
+        months_start = today.replace(day=1) - relativedelta(months=CONSUMPTION_MONTHS - 1)
         
-        # Obtener consumos mensuales individuales
-        monthly_consumption_df = self._get_monthly_consumption_data(config, products, warehouse_id=None)
+        moves_df = self._get_sale_moves_data(
+            products, warehouses, include_global, min(period_start, months_start), today
+        )
+        global_stock_df, warehouse_stock_df = self._get_free_qty_data(
+            products, warehouses=warehouses, include_global=include_global
+        )
+        return {
+            'moves_df': moves_df,
+            'global_stock_df': global_stock_df,
+            'warehouse_stock_df': warehouse_stock_df,
+            'period_start': period_start,
+            'today': today,
+        }
+
+    def _calculate_rotation(self, config, products, warehouses, include_global=True, rotation_data=None):
+        """
+        Calcular la rotación global y/o de varias bodegas en una sola pasada:
+        una extracción de movimientos de venta, una de stock y una clasificación
+        sobre un único frame agrupado por (bodega, producto).
         
-        # Combinar datos de ventas totales con consumos mensuales
-        combined_df = sales_data_df.merge(monthly_consumption_df, on='product_id', how='left')
+        Args:
+            config: Configuración con período de análisis y umbrales
+            products: Recordset de productos a clasificar
+            warehouses: Bodegas a clasificar individualmente
+            include_global: Calcular también la rotación global (warehouse_id = 0 en el frame)
+            rotation_data: Extracción ya hecha (_get_rotation_data) que cubre estas
+                bodegas, p.ej. la compartida por los bloques de un cálculo en segundo plano
+        """
+        _logger.info(
+            f"Calculando rotación {'GLOBAL + ' if include_global else ''}{len(warehouses)} bodegas..."
+        )
         
-        # Aplicar clasificación por rotación
-        classified_df = self._apply_rotation_classification(combined_df, config)
+        if rotation_data is None:
+            rotation_data = self._get_rotation_data(config, products, warehouses, include_global)
         
-        # Guardar resultados globales
-        self._save_rotation_results_global(classified_df)
+        combined_df = self._build_rotation_frame(
+            config, products, warehouses, include_global,
+            rotation_data['moves_df'], rotation_data['global_stock_df'], rotation_data['warehouse_stock_df'],
+            rotation_data['period_start'], rotation_data['today'],
+        )
         
-        _logger.info(f"Rotación global calculada para {len(classified_df)} productos")
-
-    def _calculate_rotation_all_warehouses(self, config, products):
-        """Calcular rotación para cada bodega individual"""
-        warehouses = self.env['stock.warehouse'].search([])
-        _logger.info(f"Calculando rotación para {len(warehouses)} bodegas...")
+        # Aplicar clasificación por rotación (todas las filas a la vez)
+        classified_df = self._apply_rotation_classification(combined_df, config)
         
-        for warehouse in warehouses:
-            _logger.debug(f"  Procesando bodega: {warehouse.name}")
-            
-            # Obtener datos de ventas para esta bodega
-            sales_data_df = self._get_consumption_data_with_pandas(config, products, warehouse_id=warehouse.id)
-            
-            # Obtener consumos mensuales individuales para esta bodega
-            monthly_consumption_df = self._get_monthly_consumption_data(config, products, warehouse_id=warehouse.id)
-            
-            # Combinar datos
-            combined_df = sales_data_df.merge(monthly_consumption_df, on='product_id', how='left')
-            
-            # Aplicar clasificación
-            classified_df = self._apply_rotation_classification(combined_df, config)
-            
-            # Guardar resultados por bodega
-            self._save_rotation_results_warehouse(classified_df, warehouse)
+        # Guardar resultados (global y bodegas en las mismas sentencias)
+        self._save_rotation_results(classified_df)
         
-        _logger.info(f"Rotación por bodega completada")
+        _logger.info(f"Rotación calculada para {len(classified_df)} pares bodega/producto")
 
-    def _get_consumption_data_with_pandas(self, config, products, warehouse_id=None):
+    def _get_sale_moves_data(self, products, warehouses, include_global, date_from, date_to):
         """
-        Obtiene los datos de consumo REAL usando movimientos de stock de ventas.
+        Obtiene los movimientos de stock de VENTAS (salidas y devoluciones) de
+        todas las bodegas con UNA SOLA búsqueda, etiquetando cada movimiento con
+        su bodega mediante un mapa ubicación -> bodega precalculado.
         
         Usa stock.move con sale_line_id para capturar solo ventas reales (no ajustes ni consumos internos).
-        Más preciso que usar facturas porque:
-        - Captura el movimiento físico real del inventario
-        - No depende de la facturación
-        - Acceso directo a la bodega de origen (location_id)
+        Un movimiento pertenece a una bodega si su origen o su destino está bajo
+        la ubicación de stock (lot_stock_id) de la bodega.
         
-        Args:
-            config: Registro de configuración con período de análisis
-            products: Recordset de productos a analizar
-            warehouse_id: ID de bodega (None para global)
-            
         Returns:
-            DataFrame con columnas: product_id, stock_qty, qty_invoiced, qty_returned
+            DataFrame largo con columnas: warehouse_id (0 = global), product_id,
+            date, quantity, is_out
         """
-        _logger.debug(f"Obteniendo datos de consumo de ventas {'global' if not warehouse_id else f'para bodega {warehouse_id}'}...")
-        
-        # Calcular período de análisis
-        period_end = datetime.now().date()
-        period_start = period_end - timedelta(days=config.analysis_period_months * 30)
-        
-        product_ids = products.ids
-        
-        # Obtener stock actual de productos por bodega
-        stock_data = []
-        
-        if warehouse_id:
-            # Para stock por bodega, usar free_qty con context de ubicación
-            warehouse = self.env['stock.warehouse'].browse(warehouse_id)
-            location = warehouse.lot_stock_id
-            
-            for product in products:
-                # Sumar free_qty de todas las variantes del producto en esa ubicación
-                total_free_qty = 0.0
-                for variant in product.product_variant_ids:
-                    variant_with_loc = variant.with_context(location=location.id)
-                    total_free_qty += variant_with_loc.free_qty
-                
-                stock_data.append({
-                    'product_id': product.id,
-                    'stock_qty': max(0, total_free_qty),  # Nunca negativo
-                })
-        else:
-            # Stock global (todas las bodegas)
-            for product in products:
-                # Sumar free_qty de todas las variantes sin filtro de ubicación
-                total_free_qty = 0.0
-                for variant in product.product_variant_ids:
-                    total_free_qty += variant.free_qty
-                
-                stock_data.append({
-                    'product_id': product.id,
-                    'stock_qty': max(0, total_free_qty),  # Usar free_qty de variantes + nunca negativo
-                })
-        
-        # Dominio base para movimientos de stock de VENTAS confirmadas
         domain = [
-            ('product_id.product_tmpl_id', 'in', product_ids),
+            ('product_id.product_tmpl_id', 'in', products.ids),
             ('state', '=', 'done'),  # Solo movimientos confirmados
-            ('date', '>=', period_start),
-            ('date', '<=', period_end),
+            ('date', '>=', date_from),
+            ('date', '<=', date_to),
             ('sale_line_id', '!=', False),  # Solo ventas reales (excluye ajustes, consumos internos, etc.)
             '|',
             ('is_out', '=', True),  # Salidas valoradas (ventas/consumos)
             ('is_in', '=', True),   # Entradas valoradas (devoluciones de clientes)
         ]
         
-        # Filtrar por bodega si aplica
-        if warehouse_id:
-            warehouse = self.env['stock.warehouse'].browse(warehouse_id)
-            # Movimientos que salen o entran a esta bodega específica
-            domain += [
-                '|',
-                ('location_id', 'child_of', warehouse.lot_stock_id.id),
-                ('location_dest_id', 'child_of', warehouse.lot_stock_id.id)
+        stock_paths = [(warehouse.id, warehouse.lot_stock_id.parent_path) for warehouse in warehouses]
+        if not include_global:
+            if not stock_paths:
+                return pd.DataFrame(columns=['warehouse_id', 'product_id', 'date', 'quantity', 'is_out'])
+            # Solo movimientos que salen o entran a las bodegas pedidas
+            location_leaves = [
+                (field, '=like', path + '%')
+                for _wh_id, path in stock_paths
+                for field in ('location_id.parent_path', 'location_dest_id.parent_path')
             ]
+            domain += ['|'] * (len(location_leaves) - 1) + location_leaves
         
-        # Buscar movimientos de ventas (salidas y devoluciones)
-        stock_moves = self.env['stock.move'].search(domain)
-        
+        # UNA SOLA búsqueda para todas las bodegas
+        fnames = ['product_id', 'location_id', 'location_dest_id', 'date', 'product_uom_qty', 'is_out']
+        stock_moves = self.env['stock.move'].search_fetch(domain, fnames)
         _logger.debug(f"Movimientos de stock (ventas y devoluciones) encontrados: {len(stock_moves)}")
         
-        # Convertir a lista de diccionarios para pandas
-        # Usar directamente los campos is_out/is_in que ya están calculados y almacenados
-        sales_data = []
-        for move in stock_moves:
-            if move.is_out:
-                # Salida: venta al cliente
-                sales_data.append({
-                    'product_id': move.product_id.product_tmpl_id.id,
-                    'quantity': move.product_uom_qty,
-                    'move_type': 'out',
-                })
-            elif move.is_in:
-                # Entrada: devolución de cliente
-                sales_data.append({
-                    'product_id': move.product_id.product_tmpl_id.id,
-                    'quantity': move.product_uom_qty,
-                    'move_type': 'in',
-                })
-        
-        # Crear DataFrames
-        stock_df = pd.DataFrame(stock_data)
-        
-        if sales_data:
-            sales_df = pd.DataFrame(sales_data)
-            
-            # Separar salidas (ventas) y entradas (devoluciones)
-            out_df = sales_df[sales_df['move_type'] == 'out'].groupby('product_id')['quantity'].sum()
-            in_df = sales_df[sales_df['move_type'] == 'in'].groupby('product_id')['quantity'].sum()
-            
-            # Crear DataFrame con cantidades vendidas y devueltas
-            consumption_df = pd.DataFrame({
-                'qty_invoiced': out_df,  # Mantener nombre para compatibilidad con código existente
-                'qty_returned': in_df,
-            }).fillna(0.0)
-            
-            # Combinar con stock
-            result_df = stock_df.merge(consumption_df, left_on='product_id', right_index=True, how='left')
-            result_df['qty_invoiced'] = result_df['qty_invoiced'].fillna(0.0)
-            result_df['qty_returned'] = result_df['qty_returned'].fillna(0.0)
-        else:
-            # Si no hay ventas, rellenar con ceros
-            stock_df['qty_invoiced'] = 0.0
-            stock_df['qty_returned'] = 0.0
-            result_df = stock_df
+        moves_df = pd.DataFrame({
+            'product_id': np.array([move.product_id.product_tmpl_id.id for move in stock_moves], dtype=np.int64),
+            'location_id': np.array([move.location_id.id for move in stock_moves], dtype=np.int64),
+            'location_dest_id': np.array([move.location_dest_id.id for move in stock_moves], dtype=np.int64),
+            'date': np.array(stock_moves.mapped('date'), dtype='datetime64[s]'),
+            'quantity': np.array(stock_moves.mapped('product_uom_qty'), dtype=np.float64),
+            'is_out': np.array(stock_moves.mapped('is_out'), dtype=bool),
+        })
+        
+        # Mapa ubicación -> bodega cuyo lot_stock_id la contiene
+        location_ids = set(moves_df['location_id'].tolist()) | set(moves_df['location_dest_id'].tolist())
+        location_warehouse = {}
+        for location in self.env['stock.location'].browse(location_ids):
+            for wh_id, path in stock_paths:
+                if location.parent_path.startswith(path):
+                    location_warehouse[location.id] = wh_id
+                    break
+        
+        # Etiquetar: global (todas) + bodega de origen + bodega de destino (si es otra)
+        source_wh = moves_df['location_id'].map(location_warehouse)
+        dest_wh = moves_df['location_dest_id'].map(location_warehouse)
+        columns = ['warehouse_id', 'product_id', 'date', 'quantity', 'is_out']
+        parts = [
+            moves_df.assign(warehouse_id=source_wh)[source_wh.notna()],
+            moves_df.assign(warehouse_id=dest_wh)[dest_wh.notna() & (dest_wh != source_wh)],
+        ]
+        if include_global:
+            parts.insert(0, moves_df.assign(warehouse_id=0))
+        tagged_df = pd.concat([part[columns] for part in parts], ignore_index=True)
+        tagged_df['warehouse_id'] = tagged_df['warehouse_id'].astype(np.int64)
+        return tagged_df
+
+    def _build_rotation_frame(self, config, products, warehouses, include_global,
+                              moves_df, global_stock_df, warehouse_stock_df, period_start, today):
+        """
+        Construye el frame de consumo y stock por (bodega, producto) con
+        operaciones agrupadas de numpy (sin recorrer bodegas ni productos).
+        
+        Returns:
+            DataFrame con columnas: warehouse_id (0 = global), product_id, stock_qty,
+            qty_invoiced, qty_returned, period_start, period_end, period_months,
+            consumption_m0, ..., consumption_m11
+        """
+        group_ids = ([0] if include_global else []) + warehouses.ids
+        keys = pd.MultiIndex.from_product([group_ids, products.ids], names=['warehouse_id', 'product_id'])
+        n_rows = len(keys)
+        
+        rows = keys.get_indexer(pd.MultiIndex.from_arrays(
+            [moves_df['warehouse_id'].to_numpy(dtype=np.int64), moves_df['product_id'].to_numpy(dtype=np.int64)]
+        )) if len(moves_df) else np.array([], dtype=np.int64)
+        dates = moves_df['date'].to_numpy(dtype='datetime64[s]')
+        quantities = moves_df['quantity'].to_numpy(dtype=np.float64)
+        is_out = moves_df['is_out'].to_numpy(dtype=bool)
+        
+        # Ventas y devoluciones del período de análisis
+        in_period = (rows >= 0) & (dates >= np.datetime64(period_start, 's'))
+        qty_invoiced = np.bincount(rows[in_period & is_out], weights=quantities[in_period & is_out], minlength=n_rows)
+        qty_returned = np.bincount(rows[in_period & ~is_out], weights=quantities[in_period & ~is_out], minlength=n_rows)
+        
+        # Consumos mensuales individuales (últimos 12 meses)
+        matrix = monthly_consumption_matrix(rows, n_rows, dates, quantities, is_out, today)
+        
+        # Stock por (bodega, producto)
+        stock_parts = [warehouse_stock_df]
+        if include_global:
+            stock_parts.insert(0, global_stock_df.assign(warehouse_id=0))
+        stock_qty = (
+            pd.concat(stock_parts, ignore_index=True)
+            .set_index(['warehouse_id', 'product_id'])['stock_qty']
+            .reindex(keys, fill_value=0.0)
+        )
         
-        # Agregar metadatos del período
+        result_df = keys.to_frame(index=False)
+        result_df['stock_qty'] = stock_qty.to_numpy(dtype=np.float64)
+        result_df['qty_invoiced'] = qty_invoiced
+        result_df['qty_returned'] = qty_returned
         result_df['period_start'] = period_start
-        result_df['period_end'] = period_end
+        result_df['period_end'] = today
         result_df['period_months'] = config.analysis_period_months
-        
+        for i in range(CONSUMPTION_MONTHS):
+            result_df[f'consumption_m{i}'] = matrix[:, i]
         return result_df
 
-    def _get_monthly_consumption_data(self, config, products, warehouse_id=None):
+    @api.model
+    def _get_free_qty_data(self, products, warehouses=None, include_global=True):
         """
-        Calcula consumos mensuales individuales (últimos 12 meses) para cada producto.
-        OPTIMIZADO: Carga todos los movimientos una sola vez y agrupa con Pandas.
+        Obtiene el stock libre (free_qty) por plantilla, global y por bodega,
+        con un único _read_group de stock.quant agrupado por (variante, ubicación).
+        
+        Misma semántica que product.product.free_qty (quantity - reserved_quantity
+        de las variantes activas):
+        - Global: quants bajo la ubicación vista de las bodegas de las compañías activas
+        - Por bodega: quants bajo la ubicación de stock (lot_stock_id) de la bodega
+        Las cantidades negativas se llevan a 0, igual que antes.
         
         Args:
-            config: Configuración con período de análisis
-            products: Recordset de productos
-            warehouse_id: ID de bodega (None para global)
+            products: Recordset de plantillas a analizar
+            warehouses: Bodegas para el stock por bodega (None = todas)
+            include_global: Calcular también el stock global
             
         Returns:
-            DataFrame con columnas: product_id, consumption_m0, ..., consumption_m11
+            Tupla (global_df, warehouse_df):
+            - global_df: columnas product_id, stock_qty (todos los productos)
+            - warehouse_df: columnas warehouse_id, product_id, stock_qty
+              (todos los pares bodega × producto)
         """
-        from dateutil.relativedelta import relativedelta
-        
-        _logger.debug(f"Calculando consumos mensuales {'global' if not warehouse_id else f'para bodega {warehouse_id}'}...")
-        
-        today = datetime.now().date()
-        product_ids = products.ids
-        
-        # Calcular fecha de inicio (hace 12 meses)
-        start_date = today.replace(day=1) - relativedelta(months=11)
-        
-        # Dominio optimizado: TODOS los movimientos de TODOS los productos de una sola vez
-        domain = [
-            ('product_id.product_tmpl_id', 'in', product_ids),
-            ('state', '=', 'done'),
-            ('sale_line_id', '!=', False),
-            ('date', '>=', start_date),
-            ('date', '<=', today),
-            '|',
-            ('is_out', '=', True),
-            ('is_in', '=', True),
-        ]
-        
-        # Filtrar por bodega si aplica
-        if warehouse_id:
-            warehouse = self.env['stock.warehouse'].browse(warehouse_id)
-            domain += [
-                '|',
-                ('location_id', 'child_of', warehouse.lot_stock_id.id),
-                ('location_dest_id', 'child_of', warehouse.lot_stock_id.id)
+        Warehouse = self.env['stock.warehouse']
+        if warehouses is None:
+            warehouses = Warehouse.search([])
+        
+        # Ubicaciones raíz: vistas de todas las bodegas (global) y stock de cada bodega
+        view_locations = self.env['stock.location']
+        if include_global:
+            view_locations = Warehouse.search([('company_id', 'in', self.env.companies.ids)]).view_location_id
+        root_locations = view_locations | warehouses.lot_stock_id
+        
+        rows = []
+        if root_locations and products:
+            location_domain = ['|'] * (len(root_locations) - 1) + [
+                ('location_id.parent_path', '=like', location.parent_path + '%')
+                for location in root_locations
             ]
+            rows = self.env['stock.quant']._read_group(
+                [('product_id', 'in', products.product_variant_ids.ids)] + location_domain,
+                groupby=['product_id', 'location_id'],
+                aggregates=['quantity:sum', 'reserved_quantity:sum'],
+            )
+        
+        quants_df = pd.DataFrame({
+            'product_id': np.array([product.product_tmpl_id.id for product, _loc, _qty, _res in rows], dtype=np.int64),
+            'location_id': np.array([location.id for _prod, location, _qty, _res in rows], dtype=np.int64),
+            'free_qty': np.array([qty - reserved for _prod, _loc, qty, reserved in rows], dtype=np.float64),
+        })
         
-        # UNA SOLA búsqueda para todos los movimientos
-        _logger.debug(f"Cargando movimientos de stock desde {start_date} hasta {today}...")
-        stock_moves = self.env['stock.move'].search(domain)
-        _logger.debug(f"Movimientos cargados: {len(stock_moves)}")
-        
-        # Convertir a lista de diccionarios para Pandas
-        moves_data = []
-        for move in stock_moves:
-            moves_data.append({
-                'product_id': move.product_id.product_tmpl_id.id,
-                'date': move.date.date() if hasattr(move.date, 'date') else move.date,
-                'quantity': move.product_uom_qty,
-                'is_out': move.is_out,
-                'is_in': move.is_in,
-            })
-        
-        if not moves_data:
-            # Si no hay movimientos, devolver DataFrame con ceros
-            return pd.DataFrame([{
-                'product_id': p.id,
-                **{f'consumption_m{i}': 0.0 for i in range(12)}
-            } for p in products])
-        
-        # Crear DataFrame con TODOS los movimientos
-        df = pd.DataFrame(moves_data)
-        
-        # Agregar columna de mes offset (0 = mes actual, 1 = mes pasado, etc.)
-        def get_month_offset(date):
-            current_month = today.replace(day=1)
-            move_month = date.replace(day=1)
-            delta = relativedelta(current_month, move_month)
-            return delta.years * 12 + delta.months
-        
-        df['month_offset'] = df['date'].apply(get_month_offset)
-        
-        # Filtrar solo los últimos 12 meses
-        df = df[df['month_offset'] < 12]
-        
-        # Calcular consumo neto: +qty si es salida (is_out), -qty si es devolución (is_in)
-        df['net_qty'] = df.apply(
-            lambda row: row['quantity'] if row['is_out'] else -row['quantity'],
-            axis=1
+        # Ubicación -> (¿bajo una vista global?, bodega cuyo lot_stock_id la contiene)
+        view_paths = tuple(view_locations.mapped('parent_path'))
+        stock_paths = [(warehouse.id, warehouse.lot_stock_id.parent_path) for warehouse in warehouses]
+        location_in_global = {}
+        location_warehouse = {}
+        for location in self.env['stock.location'].browse(quants_df['location_id'].unique().tolist()):
+            location_in_global[location.id] = location.parent_path.startswith(view_paths)
+            for wh_id, path in stock_paths:
+                if location.parent_path.startswith(path):
+                    location_warehouse[location.id] = wh_id
+                    break
+        
+        global_qty = (
+            quants_df[quants_df['location_id'].map(location_in_global).fillna(False).astype(bool)]
+            .groupby('product_id')['free_qty'].sum()
+        )
+        global_df = (
+            global_qty.reindex(pd.Index(products.ids, name='product_id'), fill_value=0.0)
+            .clip(lower=0.0)  # Nunca negativo
+            .rename('stock_qty').reset_index()
         )
         
-        # Agrupar por producto y mes usando Pandas (SUPER RÁPIDO)
-        consumption_grouped = df.groupby(['product_id', 'month_offset'])['net_qty'].sum().reset_index()
-        
-        # Pivotar: filas = productos, columnas = consumption_m0, m1, ... m11
-        consumption_pivot = consumption_grouped.pivot(
-            index='product_id',
-            columns='month_offset',
-            values='net_qty'
-        ).fillna(0.0)
-        
-        # Renombrar columnas a consumption_m0, consumption_m1, etc.
-        consumption_pivot.columns = [f'consumption_m{int(col)}' for col in consumption_pivot.columns]
-        
-        # Asegurar que existan todas las columnas M0-M11 (rellenar con 0 si falta algún mes)
-        for i in range(12):
-            col_name = f'consumption_m{i}'
-            if col_name not in consumption_pivot.columns:
-                consumption_pivot[col_name] = 0.0
-        
-        # Resetear index para tener product_id como columna
-        consumption_pivot = consumption_pivot.reset_index()
-        
-        # Asegurar que TODOS los productos estén presentes (incluso sin movimientos)
-        all_products_df = pd.DataFrame({'product_id': product_ids})
-        result_df = all_products_df.merge(consumption_pivot, on='product_id', how='left').fillna(0.0)
-        
-        _logger.debug(f"Consumos mensuales calculados para {len(result_df)} productos")
+        quants_df['warehouse_id'] = quants_df['location_id'].map(location_warehouse)
+        warehouse_qty = (
+            quants_df.dropna(subset=['warehouse_id'])
+            .astype({'warehouse_id': np.int64})
+            .groupby(['warehouse_id', 'product_id'])['free_qty'].sum()
+        )
+        all_pairs = pd.MultiIndex.from_product([warehouses.ids, products.ids], names=['warehouse_id', 'product_id'])
+        warehouse_df = (
+            warehouse_qty.reindex(all_pairs, fill_value=0.0)
+            .clip(lower=0.0)  # Nunca negativo
+            .rename('stock_qty').reset_index()
+        )
         
-        return result_df
+        return global_df, warehouse_df
 
     def _apply_rotation_classification(self, consumption_df, config):
         """
@@ -576,14 +632,11 @@ class ProductTemplate(models.Model):
         consumption_df['monthly_consumption'] = consumption_df['net_consumption'] / consumption_df['period_months']
         
         # Calcular consumo mensual promedio TOP 10 (si existen los campos mensuales)
-        monthly_columns = [f'consumption_m{i}' for i in range(12)]
+        monthly_columns = [f'consumption_m{i}' for i in range(CONSUMPTION_MONTHS)]
         if all(col in consumption_df.columns for col in monthly_columns):
-            def calculate_top10(row):
-                consumptions = [row[col] for col in monthly_columns]
-                top_10 = sorted(consumptions, reverse=True)[:10]
-                return sum(top_10) / 10.0 if top_10 else 0.0
-            
-            consumption_df['monthly_consumption_top10'] = consumption_df.apply(calculate_top10, axis=1)
+            consumption_df['monthly_consumption_top10'] = top_months_average(
+                consumption_df[monthly_columns].fillna(0.0).to_numpy()
+            )
         else:
             # Si no hay consumos mensuales, usar el promedio simple
             consumption_df['monthly_consumption_top10'] = consumption_df['monthly_consumption']
@@ -618,89 +671,61 @@ class ProductTemplate(models.Model):
         
         return consumption_df
 
-    def _save_rotation_results_global(self, classified_df):
-        """Guarda los resultados de rotación global en product.rotation.warehouse (con warehouse_id=False)"""
-        _logger.debug("Guardando resultados de rotación global en product.rotation.warehouse...")
+    def _save_rotation_results(self, classified_df):
+        """
+        Guarda en bloque los resultados de rotación global (warehouse_id = 0)
+        y por bodega en product.rotation.warehouse, actualiza los campos legacy
+        de product.template y recalcula los campos _global en una sola pasada.
+        """
+        _logger.debug("Guardando resultados de rotación en product.rotation.warehouse...")
         
         calculation_date = fields.Datetime.now()
+        self.env['product.rotation.warehouse']._upsert_rotation_rows(classified_df, calculation_date)
         
-        for _, row in classified_df.iterrows():
-            product_id = int(row['product_id'])
-            
-            # Buscar o crear registro de rotación global (warehouse_id=False)
-            rotation_global = self.env['product.rotation.warehouse'].search([
-                ('product_tmpl_id', '=', product_id),
-                ('warehouse_id', '=', False)
-            ], limit=1)
-            
-            values = {
-                'product_tmpl_id': product_id,
-                'warehouse_id': False,  # NULL = Global
-                'rotation_classification': row['rotation_classification'],
-                'rotation_months': float(row['rotation_months']),
-                'stock_qty': float(row['stock_qty']),
-                'monthly_consumption': float(row['monthly_consumption']),
-                'monthly_consumption_top10': float(row.get('monthly_consumption_top10', row['monthly_consumption'])),
-                'last_calculation': calculation_date,
-            }
-            
-            # Agregar consumos mensuales si existen
-            for month_offset in range(12):
-                col_name = f'consumption_m{month_offset}'
-                if col_name in row:
-                    values[col_name] = float(row[col_name])
+        global_df = classified_df[classified_df['warehouse_id'] == 0]
+        if not global_df.empty:
+            self._save_rotation_legacy_fields(global_df, calculation_date)
             
-            if rotation_global:
-                rotation_global.write(values)
-            else:
-                self.env['product.rotation.warehouse'].create(values)
-            
-            # Actualizar campos legacy en product.template para compatibilidad con módulos antiguos
-            self.browse(product_id).write({
-                'rotation_classification': row['rotation_classification'],
-                'rotation_months': float(row['rotation_months']),
-                'rotation_stock_qty': float(row['stock_qty']),
-                'rotation_monthly_consumption': float(row['monthly_consumption']),
-                'rotation_last_calculation': calculation_date,
-            })
-            
-            # Los campos _global se actualizan automáticamente vía compute
+            # Los registros se escribieron por SQL: recalcular los campos _global
+            products = self.browse(global_df['product_id'].astype(int).tolist())
+            global_fields = [
+                name for name, field in self._fields.items()
+                if field.compute == '_compute_rotation_global'
+            ]
+            for fname in global_fields:
+                self.env.add_to_compute(self._fields[fname], products)
+            self.flush_model(global_fields)
         
-        _logger.info(f"Actualizados {len(classified_df)} productos con rotación global")
+        _logger.info(f"Guardados {len(classified_df)} registros de rotación ({len(global_df)} globales)")
 
-    def _save_rotation_results_warehouse(self, classified_df, warehouse):
-        """Guarda los resultados de rotación por bodega en product.rotation.warehouse"""
-        _logger.debug(f"Guardando resultados para bodega {warehouse.name}...")
-        
-        calculation_date = fields.Datetime.now()
-        
-        for _, row in classified_df.iterrows():
-            product_id = int(row['product_id'])
-            
-            # Buscar o crear registro de rotación por bodega
-            rotation_wh = self.env['product.rotation.warehouse'].search([
-                ('product_tmpl_id', '=', product_id),
-                ('warehouse_id', '=', warehouse.id)
-            ], limit=1)
-            
-            values = {
-                'product_tmpl_id': product_id,
-                'warehouse_id': warehouse.id,
-                'rotation_classification': row['rotation_classification'],
-                'rotation_months': float(row['rotation_months']),
-                'stock_qty': float(row['stock_qty']),
-                'monthly_consumption': float(row['monthly_consumption']),
-                'monthly_consumption_top10': float(row.get('monthly_consumption_top10', row['monthly_consumption'])),
-                'last_calculation': calculation_date,
-            }
-            
-            # Agregar consumos mensuales si existen
-            for month_offset in range(12):
-                col_name = f'consumption_m{month_offset}'
-                if col_name in row:
-                    values[col_name] = float(row[col_name])
-            
-            if rotation_wh:
-                rotation_wh.write(values)
-            else:
-                self.env['product.rotation.warehouse'].create(values)
+    def _save_rotation_legacy_fields(self, global_df, calculation_date):
+        """Actualizar campos legacy en product.template para compatibilidad con módulos antiguos"""
+        legacy_fields = [
+            'rotation_classification', 'rotation_months', 'rotation_stock_qty',
+            'rotation_monthly_consumption', 'rotation_last_calculation',
+        ]
+        self.flush_model(legacy_fields)
+        self.env.cr.execute(SQL(
+            """
+            UPDATE product_template pt
+               SET rotation_classification = r.rotation_classification,
+                   rotation_months = r.rotation_months,
+                   rotation_stock_qty = r.stock_qty,
+                   rotation_monthly_consumption = r.monthly_consumption,
+                   rotation_last_calculation = %(calculation_date)s,
+                   write_uid = %(uid)s,
+                   write_date = (now() AT TIME ZONE 'UTC')
+              FROM unnest(%(product_ids)s::int[], %(classifications)s::varchar[],
+                          %(months)s::float8[], %(stock_qtys)s::float8[], %(consumptions)s::float8[])
+                   AS r(product_tmpl_id, rotation_classification, rotation_months, stock_qty, monthly_consumption)
+             WHERE pt.id = r.product_tmpl_id
+            """,
+            product_ids=global_df['product_id'].astype(int).tolist(),
+            classifications=global_df['rotation_classification'].astype(str).tolist(),
+            months=global_df['rotation_months'].astype(float).tolist(),
+            stock_qtys=global_df['stock_qty'].astype(float).tolist(),
+            consumptions=global_df['monthly_consumption'].astype(float).tolist(),
+            calculation_date=calculation_date,
+            uid=self.env.uid,
+        ))
+        self.invalidate_model(legacy_fields + ['write_uid', 'write_date'])
@@ -10,6 +10,7 @@ class RotationClassificationConfig(models.Model):
     Permite definir los umbrales de meses para cada nivel de clasificación.
     """
     _name = 'rotation.classification.config'
+    _inherit = ['classification.job.mixin']
     _description = 'Rotation Classification Configuration'
     _rec_name = 'id'
 
@@ -87,9 +88,71 @@ class RotationClassificationConfig(models.Model):
             if record.analysis_period_months > 60:
                 raise ValidationError(_('Analysis period cannot exceed 60 months'))
 
+    @api.model
+    def _get_config(self):
+        """Obtiene la configuración vigente (la crea si no existe)."""
+        config = self.search([], limit=1)
+        if not config:
+            config = self.create({})
+        return config
+
     def action_calculate_rotation_now(self):
-        """Ejecuta el cálculo de clasificación por rotación inmediatamente."""
+        """Encola el cálculo de clasificación por rotación en segundo plano."""
         self.ensure_one()
-        product_template = self.env['product.template']
-        return product_template.action_calculate_rotation_classification()
+        self.env['product.template']._check_rotation_dependencies()
+        return self.action_enqueue_job()
+
+    @api.model
+    def _cron_enqueue_rotation_classification(self):
+        """Cron diario: encola el cálculo de rotación de la configuración vigente."""
+        config = self._get_config()
+        if config.job_state not in ('queued', 'running'):
+            config.action_enqueue_job()
+
+    # ==================== EJECUCIÓN EN SEGUNDO PLANO ====================
+
+    def _get_job_cron(self):
+        return self.env.ref('product_rotation_classification.cron_rotation_classification_job_runner')
+
+    def _get_job_chunks(self):
+        """
+        Un bloque para la rotación global y uno por cada bodega, con commit
+        después de cada uno. Todos usan una sola extracción de movimientos y
+        stock por ejecución.
+        """
+        warehouses = self.env['stock.warehouse'].search([])
+        return ['global'] + ['warehouse:%d' % warehouse.id for warehouse in warehouses]
+
+    def _get_job_chunk_label(self, chunk):
+        if chunk == 'global':
+            return _('Rotación Global')
+        warehouse = self.env['stock.warehouse'].browse(int(chunk.split(':')[1])).exists()
+        return warehouse.name or chunk
+
+    def _run_job_chunk(self, chunk):
+        self.ensure_one()
+        ProductTemplate = self.env['product.template']
+        ProductTemplate._check_rotation_dependencies()
+        products = ProductTemplate._get_rotation_products()
+        if not products:
+            return
+
+        # Movimientos y stock (global y de todas las bodegas) extraídos una vez para todos los bloques
+        rotation_data = self._get_job_run_data('rotation_data', lambda: ProductTemplate._get_rotation_data(
+            self, products, self.env['stock.warehouse'].search([]), include_global=True
+        ))
+        if chunk == 'global':
+            ProductTemplate._calculate_rotation_global(self, products, rotation_data)
+            return
+
+        warehouse = self.env['stock.warehouse'].browse(int(chunk.split(':')[1])).exists()
+        if warehouse:
+            ProductTemplate._calculate_rotation_warehouse(self, products, warehouse, rotation_data)
+
+    def _finish_job(self):
+        self.write({
+            'last_calculation': fields.Datetime.now(),
+            'last_calculation_products': len(self.env['product.template']._get_rotation_products()),
+            'last_calculation_duration': self.job_elapsed,
+        })
 
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from datetime import date, datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from odoo.tests.common import tagged, BaseCase, TransactionCase
+
+try:
+    import pandas as pd
+    import numpy as np
+except ImportError:
+    pd = None
+    np = None
+
+from odoo.addons.product_rotation_classification.models.product_template import (
+    monthly_consumption_matrix,
+    top_months_average,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def _legacy_monthly_consumption(product_ids, moves_df, today):
+    """Implementación previa fila a fila (relativedelta + apply), usada como referencia."""
+    df = moves_df.copy()
+
+    def get_month_offset(move_date):
+        delta = relativedelta(today.replace(day=1), move_date.replace(day=1))
+        return delta.years * 12 + delta.months
+
+    df['month_offset'] = df['date'].apply(get_month_offset)
+    df = df[df['month_offset'] < 12]
+    df['net_qty'] = df.apply(lambda row: row['quantity'] if row['is_out'] else -row['quantity'], axis=1)
+    grouped = df.groupby(['product_id', 'month_offset'])['net_qty'].sum().reset_index()
+    pivot = grouped.pivot(index='product_id', columns='month_offset', values='net_qty').fillna(0.0)
+    pivot.columns = [f'consumption_m{int(col)}' for col in pivot.columns]
+    for i in range(12):
+        if f'consumption_m{i}' not in pivot.columns:
+            pivot[f'consumption_m{i}'] = 0.0
+    pivot = pivot.reset_index()
+    result = pd.DataFrame({'product_id': product_ids}).merge(pivot, on='product_id', how='left').fillna(0.0)
+
+    monthly_columns = [f'consumption_m{i}' for i in range(12)]
+    result['monthly_consumption_top10'] = result.apply(
+        lambda row: sum(sorted([row[col] for col in monthly_columns], reverse=True)[:10]) / 10.0,
+        axis=1,
+    )
+    return result
+
+
+def _synthetic_moves(n_moves, n_products, today, seed=42):
+    """Movimientos de venta sintéticos repartidos en los últimos 12 meses."""
+    rng = np.random.default_rng(seed)
+    days_back = rng.integers(0, 365, n_moves)
+    base = datetime.combine(today, datetime.min.time())
+    return pd.DataFrame({
+        'product_id': rng.integers(1, n_products + 1, n_moves),
+        'date': [(base - timedelta(days=int(d))).date() for d in days_back],
+        'quantity': rng.integers(1, 50, n_moves).astype(float),
+        'is_out': rng.random(n_moves) > 0.1,
+    })
+
+
+def _monthly_consumption(product_ids, moves_df, today):
+    """Consumos M0-M11 y top 10 por producto con la matriz vectorizada."""
+    rows = pd.Index(product_ids).get_indexer(moves_df['product_id'].to_numpy(dtype=np.int64))
+    matrix = monthly_consumption_matrix(
+        rows,
+        len(product_ids),
+        moves_df['date'].to_numpy(),
+        moves_df['quantity'].to_numpy(),
+        moves_df['is_out'].to_numpy(),
+        today,
+    )
+    result = pd.DataFrame(matrix, columns=[f'consumption_m{i}' for i in range(12)])
+    result.insert(0, 'product_id', product_ids)
+    result['monthly_consumption_top10'] = top_months_average(matrix)
+    return result
+
+
+@tagged('post_install', '-at_install')
+class TestMonthlyConsumption(BaseCase):
+    """Consumos mensuales vectorizados frente a la implementación fila a fila."""
+
+    def setUp(self):
+        super().setUp()
+        if pd is None or np is None:
+            self.skipTest('pandas and numpy are required')
+        self.today = date(2025, 6, 15)
+
+    def test_01_matches_legacy_implementation(self):
+        """Test: Mismos consumos M0-M11 y top 10 que la implementación anterior."""
+        product_ids = list(range(1, 201))
+        moves_df = _synthetic_moves(5000, 220, self.today)
+
+        expected = _legacy_monthly_consumption(product_ids, moves_df, self.today)
+        result = _monthly_consumption(product_ids, moves_df, self.today)
+
+        columns = [f'consumption_m{i}' for i in range(12)] + ['monthly_consumption_top10']
+        self.assertEqual(result['product_id'].tolist(), product_ids)
+        np.testing.assert_allclose(result[columns].to_numpy(), expected[columns].to_numpy())
+
+    def test_02_month_boundaries(self):
+        """Test: Fechas del mes actual, de hace 11 meses y anteriores."""
+        moves_df = pd.DataFrame({
+            'product_id': [1, 1, 1, 1],
+            'date': [date(2025, 6, 1), date(2025, 5, 31), date(2024, 7, 1), date(2024, 6, 30)],
+            'quantity': [5.0, 3.0, 2.0, 100.0],
+            'is_out': [True, True, False, True],
+        })
+        result = _monthly_consumption([1, 2], moves_df, self.today)
+
+        row = result.iloc[0]
+        self.assertEqual(row['consumption_m0'], 5.0)
+        self.assertEqual(row['consumption_m1'], 3.0)
+        self.assertEqual(row['consumption_m11'], -2.0, "Las devoluciones restan consumo")
+        self.assertEqual(result[[f'consumption_m{i}' for i in range(12)]].to_numpy().sum(), 6.0,
+                         "Los movimientos de hace 12 meses o más se descartan")
+        self.assertEqual(result.iloc[1]['monthly_consumption_top10'], 0.0)
+
+    def test_03_top10_discards_two_lowest_months(self):
+        """Test: El top 10 descarta los 2 meses más bajos."""
+        matrix = np.array([[float(i) for i in range(12)]])
+        self.assertAlmostEqual(top_months_average(matrix)[0], sum(range(2, 12)) / 10.0)
+
+    def test_04_discarded_rows(self):
+        """Test: Los movimientos sin fila destino (-1) no suman consumo."""
+        matrix = monthly_consumption_matrix(
+            [0, -1, 1],
+            2,
+            [date(2025, 6, 1), date(2025, 6, 2), date(2025, 4, 10)],
+            [4.0, 50.0, 1.5],
+            [True, True, False],
+            self.today,
+        )
+        self.assertEqual(matrix.shape, (2, 12))
+        self.assertEqual(matrix[0, 0], 4.0)
+        self.assertEqual(matrix[1, 2], -1.5)
+        self.assertEqual(matrix.sum(), 2.5)
+
+
+@tagged('post_install', '-at_install')
+class TestRotationFrame(TransactionCase):
+    """Frame de consumo y stock por (bodega, producto) de _build_rotation_frame."""
+
+    def setUp(self):
+        super().setUp()
+        if pd is None or np is None:
+            self.skipTest('pandas and numpy are required')
+        self.today = date(2025, 6, 15)
+        self.period_start = date(2025, 1, 1)
+        self.config = self.env['rotation.classification.config'].new({'analysis_period_months': 6})
+        # Solo se usan los ids: no hace falta crear los registros
+        self.products = self.env['product.template'].browse([11, 12])
+        self.warehouses = self.env['stock.warehouse'].browse([3])
+
+    def test_01_global_and_warehouse_rows(self):
+        """Test: Una fila global (bodega 0) y una por bodega para cada producto."""
+        moves_df = pd.DataFrame({
+            'warehouse_id': [0, 3, 0, 3, 0],
+            'product_id': [11, 11, 11, 11, 12],
+            'date': pd.to_datetime(['2025-06-02', '2025-06-02', '2025-05-20', '2025-05-20', '2024-12-15']),
+            'quantity': [5.0, 5.0, 2.0, 2.0, 7.0],
+            'is_out': [True, True, False, False, True],
+        })
+        global_stock_df = pd.DataFrame({'product_id': [11, 12], 'stock_qty': [40.0, 8.0]})
+        warehouse_stock_df = pd.DataFrame({'warehouse_id': [3, 3], 'product_id': [11, 12], 'stock_qty': [30.0, 0.0]})
+
+        frame = self.env['product.template']._build_rotation_frame(
+            self.config, self.products, self.warehouses, True,
+            moves_df, global_stock_df, warehouse_stock_df, self.period_start, self.today,
+        )
+
+        self.assertEqual(list(zip(frame['warehouse_id'], frame['product_id'])), [(0, 11), (0, 12), (3, 11), (3, 12)])
+        self.assertEqual(frame['stock_qty'].tolist(), [40.0, 8.0, 30.0, 0.0])
+        self.assertEqual(frame['qty_invoiced'].tolist(), [5.0, 0.0, 5.0, 0.0],
+                         "Las ventas anteriores al período no cuentan como facturadas")
+        self.assertEqual(frame['qty_returned'].tolist(), [2.0, 0.0, 2.0, 0.0])
+        self.assertEqual(frame['consumption_m0'].tolist(), [5.0, 0.0, 5.0, 0.0])
+        self.assertEqual(frame['consumption_m1'].tolist(), [-2.0, 0.0, -2.0, 0.0])
+        self.assertEqual(frame['consumption_m6'].tolist(), [0.0, 7.0, 0.0, 0.0],
+                         "Los consumos mensuales cubren 12 meses, no solo el período")
+        self.assertTrue((frame['period_months'] == 6).all())
+
+    def test_02_without_moves(self):
+        """Test: Sin movimientos el frame tiene todas las filas en cero."""
+        moves_df = pd.DataFrame({
+            'warehouse_id': pd.Series([], dtype=np.int64),
+            'product_id': pd.Series([], dtype=np.int64),
+            'date': pd.Series([], dtype='datetime64[ns]'),
+            'quantity': pd.Series([], dtype=np.float64),
+            'is_out': pd.Series([], dtype=bool),
+        })
+        global_stock_df = pd.DataFrame({'product_id': [11, 12], 'stock_qty': [1.0, 2.0]})
+        warehouse_stock_df = pd.DataFrame({'warehouse_id': [3, 3], 'product_id': [11, 12], 'stock_qty': [1.0, 2.0]})
+
+        frame = self.env['product.template']._build_rotation_frame(
+            self.config, self.products, self.warehouses, False,
+            moves_df, global_stock_df, warehouse_stock_df, self.period_start, self.today,
+        )
+
+        self.assertEqual(frame['warehouse_id'].tolist(), [3, 3])
+        self.assertEqual(frame['qty_invoiced'].tolist(), [0.0, 0.0])
+        monthly_columns = [f'consumption_m{i}' for i in range(12)]
+        self.assertEqual(frame[monthly_columns].to_numpy().sum(), 0.0)
+
+
+@tagged('-standard', 'rotation_benchmark')
+class TestMonthlyConsumptionBenchmark(BaseCase):
+    """Benchmark: un millón de movimientos sintéticos (ejecutar con --test-tags rotation_benchmark)."""
+
+    def test_benchmark_one_million_moves(self):
+        if pd is None or np is None:
+            self.skipTest('pandas and numpy are required')
+
+        today = date(2025, 6, 15)
+        product_ids = list(range(1, 20001))
+        moves_df = _synthetic_moves(1_000_000, 20000, today)
+
+        start = time.perf_counter()
+        legacy = _legacy_monthly_consumption(product_ids, moves_df, today)
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = _monthly_consumption(product_ids, moves_df, today)
+        monthly_columns = [f'consumption_m{i}' for i in range(12)]
+        vectorized_seconds = time.perf_counter() - start
+
+        np.testing.assert_allclose(
+            result[monthly_columns + ['monthly_consumption_top10']].to_numpy(),
+            legacy[monthly_columns + ['monthly_consumption_top10']].to_numpy(),
+        )
+        _logger.info(
+            'Consumo mensual (1M movimientos): fila a fila %.2fs, vectorizado %.2fs (x%.1f)',
+            legacy_seconds, vectorized_seconds, legacy_seconds / vectorized_seconds,
+        )
+        self.assertLess(vectorized_seconds, legacy_seconds)
@@ -1,6 +1,6 @@
 {
     "name": "Ventas - Comisiones por Asesor",
-    "version": "1.0.0",
+    "version": "1.1.0",
     "category": "Rutavity/Commission",
     "summary": "Sistema de comisiones por recaudo con metas y categorías jerárquicas",
     "description": """
@@ -23,6 +23,7 @@
     "data": [
         "security/ir.model.access.csv",
         "data/ir_config_parameter.xml",
+        "data/ir_cron_data.xml",
         "views/commission_plan_achievement_views.xml",
         "report/commission_collection_report_views.xml",
     ],
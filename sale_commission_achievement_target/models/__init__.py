@@ -3,4 +3,7 @@ from . import commission_plan_achievement_enhanced
 from . import commission_plan_target
 from . import account_move
 from . import commission_plan
-from . import product_public_category
\ No newline at end of file
+from . import product_public_category
+from . import commission_collection_queue
+from . import account_partial_reconcile
+from . import ir_config_parameter
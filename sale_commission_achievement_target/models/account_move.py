@@ -27,6 +27,21 @@ class AccountMove(models.Model):
         "It is used to calculate if a payment was made on time for commissions.",
     )
 
+    def write(self, vals):
+        """
+        Queue the reconciliations of the posted invoices whose salesperson
+        changes, so the commission collection report moves their rows to the
+        new salesperson on its next refresh.
+        """
+        moves = self.browse()
+        if "invoice_user_id" in vals:
+            moves = self.filtered(lambda move: move.state == "posted" and move.is_sale_document())
+        res = super().write(vals)
+        if moves:
+            partials = moves.line_ids.matched_debit_ids | moves.line_ids.matched_credit_ids
+            self.env["sale.commission.collection.queue"].sudo()._enqueue(partials.ids)
+        return res
+
     @api.depends("invoice_date_due", "line_ids.date_maturity")
     def _compute_effective_due_date(self):
         """
@@ -0,0 +1,15 @@
+from odoo import api, models
+
+
+class AccountPartialReconcile(models.Model):
+    """
+    Queue the new partial reconciliations for the commission collection report.
+    """
+
+    _inherit = "account.partial.reconcile"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        partials = super().create(vals_list)
+        self.env["sale.commission.collection.queue"].sudo()._enqueue(partials.ids)
+        return partials
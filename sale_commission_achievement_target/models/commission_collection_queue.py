@@ -0,0 +1,44 @@
+from odoo import api, models, fields
+from odoo.tools import SQL
+
+
+class SaleCommissionCollectionQueue(models.Model):
+    """
+    Queue of the partial reconciliations not yet processed by the commission
+    collection report.
+
+    The reconciliations are queued in the transaction that creates them, so a
+    reconciliation is either queued and committed or neither: the refresh of the
+    report consumes the queue instead of comparing ids, which are not committed
+    in order.
+    """
+
+    _name = "sale.commission.collection.queue"
+    _description = "Commission Collection Report Queue"
+    _log_access = False
+
+    # Not a many2one: a reconciliation removed before the refresh is handled by
+    # the report rows whose reconciliation was set to null
+    partial_reconcile_id = fields.Integer(
+        string="Partial reconciliation",
+        required=True,
+        readonly=True,
+    )
+
+    @api.model
+    def _enqueue(self, partial_reconcile_ids):
+        """
+        Queue partial reconciliations for the next refresh of the report.
+
+        Args:
+            partial_reconcile_ids (list): Ids of account.partial.reconcile
+        """
+        if not partial_reconcile_ids:
+            return
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO sale_commission_collection_queue (partial_reconcile_id)
+            SELECT unnest(%s::int[])
+            """,
+            list(partial_reconcile_ids),
+        ))
@@ -8,6 +8,29 @@ class SaleCommissionPlan(models.Model):
     """
     _inherit = "sale.commission.plan"
 
+    # Fields of the plan used by the commission collection report
+    COLLECTION_REPORT_FIELDS = {
+        "active",
+        "state",
+        "type",
+        "company_id",
+        "date_from",
+        "date_to",
+        "user_ids",
+        "achievement_ids",
+    }
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self.COLLECTION_REPORT_FIELDS.intersection(vals):
+            self.env["sale.commission.collection.report"]._request_full_refresh()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env["sale.commission.collection.report"]._request_full_refresh()
+        return res
+
     def action_open_commission(self):
         """
         Override the native action to open the commission collection report
@@ -32,6 +32,23 @@ class SaleCommissionPlanAchievement(models.Model):
         help='Categoría pública de eCommerce para filtrar productos'
     )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        achievements = super().create(vals_list)
+        self.env['sale.commission.collection.report']._request_full_refresh()
+        return achievements
+
+    def write(self, vals):
+        res = super().write(vals)
+        # Los objetivos y categorías de los logros se usan en el reporte de recaudo
+        self.env['sale.commission.collection.report']._request_full_refresh()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['sale.commission.collection.report']._request_full_refresh()
+        return res
+
     @api.depends('product_id', 'product_categ_id', 'public_categ_id', 'type', 'target_amount', 'plan_id')
     def _compute_display_name(self):
         """
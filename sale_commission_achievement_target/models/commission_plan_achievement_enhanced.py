@@ -1,8 +1,15 @@
 from odoo import models, fields, api
+from odoo.tools import SQL
 import logging
+import threading
+import time
 
 _logger = logging.getLogger(__name__)
 
+# Caché por worker (proceso) de montos reales: {clave: (monto, timestamp)}
+_actual_amount_cache = {}
+_actual_amount_cache_lock = threading.Lock()
+
 
 class SaleCommissionPlanAchievementEnhanced(models.Model):
     """
@@ -115,258 +122,313 @@ class SaleCommissionPlanAchievementEnhanced(models.Model):
         """
         return self.env['product.public.category'].get_category_with_children_ids(category_id)
     
-    # Calcular el monto real vendido/facturado según el tipo de achievement
-    def _compute_actual_amount_sql(self, achievement, priority_category_id):
+    def _get_actual_amount_cache_ttl(self):
+        """
+        Obtiene la duración (segundos) de la caché de montos reales.
 
-        if not achievement.plan_id:
-            return 0.0
-        
-        plan = achievement.plan_id
-        
-        # Validar que el plan tenga las fechas necesarias
-        if not plan.date_from or not plan.date_to:
+        Returns:
+            int: Segundos que se conserva un monto calculado (0 = caché desactivada)
+        """
+        ttl_str = self.env['ir.config_parameter'].sudo().get_param(
+            'sale_commission_achievement_target.actual_amount_cache_ttl', '0'
+        )
+        try:
+            return max(int(ttl_str), 0)
+        except (ValueError, TypeError):
             _logger.warning(
-                "Plan %s no tiene date_from o date_to configurado. No se puede calcular actual_amount.",
-                plan.name
+                "Duración de caché de montos reales '%s' inválida. Caché desactivada.", ttl_str
             )
-            return 0.0
-        
-        cr = self.env.cr
-        
-        # Obtener todas las categorías hijas de la categoría de logro (jerárquico)
-        achievement_category_ids = []
-        if achievement.public_categ_id:
-            achievement_category_ids = self._get_category_hierarchy_ids(achievement.public_categ_id.id)
-        
+            return 0
+
+    def _get_actual_amount_cache_key(self, achievement, priority_category_id):
+        """
+        Clave de caché del monto real de un logro: cambia al modificar el logro,
+        su plan (usuarios, fechas) o la categoría prioritaria configurada.
+        """
+        return (
+            self.env.cr.dbname,
+            achievement._origin.id,
+            achievement.write_date,
+            achievement.plan_id._origin.id,
+            achievement.plan_id.write_date,
+            priority_category_id,
+        )
+
+    def _compute_actual_amounts_sql(self, priority_category_id):
+        """
+        Calcula el monto real vendido/facturado de todos los logros del recordset
+        con una sola consulta agrupada por logro.
+
+        Los parámetros de cada logro (plan, fechas, compañía, tipo, producto y
+        categorías) se pasan como arreglos y se expanden con unnest, de modo que
+        ventas y facturas de todos los planes se agregan en la misma sentencia.
+
+        Args:
+            priority_category_id: ID de la categoría prioritaria (o None)
+
+        Returns:
+            dict: {achievement_id: monto real}
+        """
+        if not self:
+            return {}
+
+        # Jerarquía de categorías calculada una sola vez por categoría
+        hierarchy_ids = {}
+
+        def get_hierarchy_ids(category_id):
+            if category_id not in hierarchy_ids:
+                hierarchy_ids[category_id] = self._get_category_hierarchy_ids(category_id)
+            return hierarchy_ids[category_id]
+
         # Obtener todas las categorías hijas de la categoría prioritaria (jerárquico)
-        priority_category_ids = []
-        if priority_category_id:
-            priority_category_ids = self._get_category_hierarchy_ids(priority_category_id)
-        
-        # Construir condición de prioridad de forma segura
-        # Si este achievement NO es la categoría prioritaria, excluir productos que estén en la categoría prioritaria
-        priority_condition = ""
-        priority_params = []
-        if priority_category_ids and achievement.public_categ_id:
-            if achievement.public_categ_id.id != priority_category_id:
-                # Solo incluir productos que NO estén en la categoría prioritaria ni en sus hijas
-                priority_condition = """
-                    AND NOT EXISTS (
+        priority_category_ids = get_hierarchy_ids(priority_category_id) if priority_category_id else []
+
+        achievement_columns = {
+            'ids': [], 'plan_ids': [], 'date_froms': [], 'date_tos': [], 'company_ids': [],
+            'types': [], 'product_ids': [], 'product_categ_ids': [], 'has_categories': [],
+            'exclude_priority': [],
+        }
+        categ_achievement_ids = []
+        categ_ids = []
+        for achievement in self:
+            plan = achievement.plan_id
+            # Obtener todas las categorías hijas de la categoría de logro (jerárquico)
+            achievement_category_ids = []
+            if achievement.public_categ_id:
+                achievement_category_ids = get_hierarchy_ids(achievement.public_categ_id.id)
+            categ_achievement_ids.extend([achievement._origin.id] * len(achievement_category_ids))
+            categ_ids.extend(achievement_category_ids)
+
+            achievement_columns['ids'].append(achievement._origin.id)
+            achievement_columns['plan_ids'].append(plan._origin.id)
+            achievement_columns['date_froms'].append(plan.date_from)
+            achievement_columns['date_tos'].append(plan.date_to)
+            achievement_columns['company_ids'].append(plan.company_id.id)
+            achievement_columns['types'].append(achievement.type)
+            achievement_columns['product_ids'].append(achievement.product_id.id or None)
+            achievement_columns['product_categ_ids'].append(achievement.product_categ_id.id or None)
+            achievement_columns['has_categories'].append(bool(achievement_category_ids))
+            # Si este achievement NO es la categoría prioritaria, excluir productos
+            # que estén en la categoría prioritaria ni en sus hijas
+            achievement_columns['exclude_priority'].append(bool(
+                priority_category_ids
+                and achievement.public_categ_id
+                and achievement.public_categ_id.id != priority_category_id
+            ))
+
+        # Filtros de producto y categoría comunes a ventas y facturas
+        product_filter = SQL(
+            """
+                  AND (a.product_id IS NULL OR line.product_id = a.product_id)
+                  AND (
+                    NOT a.has_categories OR
+                    EXISTS (
+                        SELECT 1
+                        FROM achievement_categories ac
+                        JOIN product_public_category_product_template_rel ppcrel
+                            ON ppcrel.product_public_category_id = ac.public_categ_id
+                        WHERE ac.achievement_id = a.id
+                          AND ppcrel.product_template_id = pt.id
+                    )
+                  )
+                  AND (a.product_categ_id IS NULL OR a.has_categories OR pt.categ_id = a.product_categ_id)
+                  AND (
+                    NOT a.exclude_priority OR
+                    NOT EXISTS (
                         SELECT 1 FROM product_public_category_product_template_rel ppcrel_priority
                         WHERE ppcrel_priority.product_template_id = pt.id
-                          AND ppcrel_priority.product_public_category_id = ANY(%s)
+                          AND ppcrel_priority.product_public_category_id = ANY(%(priority_category_ids)s)
                     )
-                """
-                priority_params = [priority_category_ids]
-        
-        if achievement.type in ['amount_sold', 'qty_sold']:
-            # Query para ventas - usar CTE para mejor performance con jerarquía de categorías
-            query = """
-                WITH plan_user_dates AS (
-                    SELECT 
-                        scpu.user_id,
-                        COALESCE(scpu.date_from, %s) as date_from,
-                        COALESCE(scpu.date_to, %s) as date_to
-                    FROM sale_commission_plan_user scpu
-                    WHERE scpu.plan_id = %s
-                )
-                SELECT 
-                    COALESCE(SUM(
-                        CASE 
-                            WHEN %s = 'amount_sold' THEN sol.price_subtotal / COALESCE(NULLIF(so.currency_rate, 0), 1.0)
-                            WHEN %s = 'qty_sold' THEN sol.product_uom_qty
+                  )
+            """,
+            priority_category_ids=priority_category_ids or [0],
+        )
+
+        self.env.cr.execute(SQL(
+            """
+            WITH achievements AS (
+                SELECT *
+                FROM unnest(
+                    %(ids)s::int[], %(plan_ids)s::int[], %(date_froms)s::date[], %(date_tos)s::date[],
+                    %(company_ids)s::int[], %(types)s::varchar[], %(product_ids)s::int[],
+                    %(product_categ_ids)s::int[], %(has_categories)s::bool[], %(exclude_priority)s::bool[]
+                ) AS a(id, plan_id, date_from, date_to, company_id, type, product_id,
+                       product_categ_id, has_categories, exclude_priority)
+            ),
+            achievement_categories AS (
+                SELECT *
+                FROM unnest(%(categ_achievement_ids)s::int[], %(categ_ids)s::int[])
+                    AS ac(achievement_id, public_categ_id)
+            ),
+            plan_user_dates AS (
+                SELECT
+                    a.id as achievement_id,
+                    scpu.user_id,
+                    COALESCE(scpu.date_from, a.date_from) as date_from,
+                    COALESCE(scpu.date_to, a.date_to) as date_to
+                FROM achievements a
+                JOIN sale_commission_plan_user scpu ON scpu.plan_id = a.plan_id
+            )
+            SELECT achievement_id, SUM(total)
+            FROM (
+                -- Ventas
+                SELECT
+                    a.id as achievement_id,
+                    SUM(
+                        CASE
+                            WHEN a.type = 'amount_sold' THEN line.price_subtotal / COALESCE(NULLIF(so.currency_rate, 0), 1.0)
+                            WHEN a.type = 'qty_sold' THEN line.product_uom_qty
                             ELSE 0
                         END
-                    ), 0) as total
-                FROM sale_order so
-                JOIN sale_order_line sol ON sol.order_id = so.id
-                JOIN plan_user_dates pud ON pud.user_id = so.user_id
-                LEFT JOIN product_product pp ON sol.product_id = pp.id
+                    ) as total
+                FROM achievements a
+                JOIN plan_user_dates pud ON pud.achievement_id = a.id
+                JOIN sale_order so
+                    ON so.user_id = pud.user_id
+                    AND so.company_id = a.company_id
+                    AND so.date_order BETWEEN pud.date_from AND pud.date_to
+                JOIN sale_order_line line ON line.order_id = so.id
+                LEFT JOIN product_product pp ON line.product_id = pp.id
                 LEFT JOIN product_template pt ON pp.product_tmpl_id = pt.id
-                WHERE so.state = 'sale'
-                  AND so.company_id = %s
-                  AND so.date_order BETWEEN pud.date_from AND pud.date_to
-                  AND sol.display_type IS NULL
-                  AND COALESCE(sol.is_expense, false) = false
-                  AND COALESCE(sol.is_downpayment, false) = false
-                  AND (%s IS NULL OR sol.product_id = %s)
-                  AND (
-                    %s = 0 OR 
-                    EXISTS (
-                        SELECT 1 FROM product_public_category_product_template_rel ppcrel
-                        WHERE ppcrel.product_template_id = pt.id
-                          AND ppcrel.product_public_category_id = ANY(%s)
-                    )
-                  )
-                  AND (%s IS NULL OR %s != 0 OR pt.categ_id = %s)
-                  {priority_cond}
-            """.format(priority_cond=priority_condition)
-            
-            params = [
-                plan.date_from,
-                plan.date_to,
-                plan.id,
-                achievement.type,
-                achievement.type,
-                plan.company_id.id,
-                achievement.product_id.id or None,
-                achievement.product_id.id or None,
-                len(achievement_category_ids),  # Usa longitud para saber si hay categorías
-                achievement_category_ids or [0],  # Array de IDs (incluye categoría padre e hijas)
-                achievement.product_categ_id.id or None,
-                len(achievement_category_ids),  # Usa longitud para lógica condicional
-                achievement.product_categ_id.id or None,
-            ]
-            
-            # Agregar parámetros de prioridad si existen
-            params.extend(priority_params)
-            
-            cr.execute(query, params)
-            result = cr.fetchone()
-            return result[0] if result else 0.0
-            
-        elif achievement.type in ['amount_invoiced', 'qty_invoiced']:
-            # Query para facturas - usar CTE para mejor performance con jerarquía de categorías
-            query = """
-                WITH plan_user_dates AS (
-                    SELECT 
-                        scpu.user_id,
-                        COALESCE(scpu.date_from, %s) as date_from,
-                        COALESCE(scpu.date_to, %s) as date_to
-                    FROM sale_commission_plan_user scpu
-                    WHERE scpu.plan_id = %s
-                )
-                SELECT 
-                    COALESCE(SUM(
-                        CASE 
-                            WHEN %s = 'amount_invoiced' THEN
+                WHERE a.type IN ('amount_sold', 'qty_sold')
+                  AND so.state = 'sale'
+                  AND line.display_type IS NULL
+                  AND COALESCE(line.is_expense, false) = false
+                  AND COALESCE(line.is_downpayment, false) = false
+                  %(product_filter)s
+                GROUP BY a.id
+
+                UNION ALL
+
+                -- Facturas
+                SELECT
+                    a.id as achievement_id,
+                    SUM(
+                        CASE
+                            WHEN a.type = 'amount_invoiced' THEN
                                 CASE
-                                    WHEN am.move_type = 'out_invoice' THEN aml.price_subtotal / COALESCE(NULLIF(am.invoice_currency_rate, 0), 1.0)
-                                    WHEN am.move_type = 'out_refund' THEN -1 * aml.price_subtotal / COALESCE(NULLIF(am.invoice_currency_rate, 0), 1.0)
+                                    WHEN am.move_type = 'out_invoice' THEN line.price_subtotal / COALESCE(NULLIF(am.invoice_currency_rate, 0), 1.0)
+                                    WHEN am.move_type = 'out_refund' THEN -1 * line.price_subtotal / COALESCE(NULLIF(am.invoice_currency_rate, 0), 1.0)
                                     ELSE 0
                                 END
-                            WHEN %s = 'qty_invoiced' THEN
+                            WHEN a.type = 'qty_invoiced' THEN
                                 CASE
-                                    WHEN am.move_type = 'out_invoice' THEN aml.quantity
-                                    WHEN am.move_type = 'out_refund' THEN -1 * aml.quantity
+                                    WHEN am.move_type = 'out_invoice' THEN line.quantity
+                                    WHEN am.move_type = 'out_refund' THEN -1 * line.quantity
                                     ELSE 0
                                 END
                             ELSE 0
                         END
-                    ), 0) as total
-                FROM account_move am
-                JOIN account_move_line aml ON aml.move_id = am.id
-                JOIN plan_user_dates pud ON pud.user_id = am.invoice_user_id
-                LEFT JOIN product_product pp ON aml.product_id = pp.id
+                    ) as total
+                FROM achievements a
+                JOIN plan_user_dates pud ON pud.achievement_id = a.id
+                JOIN account_move am
+                    ON am.invoice_user_id = pud.user_id
+                    AND am.company_id = a.company_id
+                    AND am.date BETWEEN pud.date_from AND pud.date_to
+                JOIN account_move_line line ON line.move_id = am.id
+                LEFT JOIN product_product pp ON line.product_id = pp.id
                 LEFT JOIN product_template pt ON pp.product_tmpl_id = pt.id
-                WHERE am.state = 'posted'
+                WHERE a.type IN ('amount_invoiced', 'qty_invoiced')
+                  AND am.state = 'posted'
                   AND am.move_type IN ('out_invoice', 'out_refund')
-                  AND am.company_id = %s
-                  AND am.date BETWEEN pud.date_from AND pud.date_to
-                  AND aml.display_type = 'product'
-                  AND (%s IS NULL OR aml.product_id = %s)
-                  AND (
-                    %s = 0 OR 
-                    EXISTS (
-                        SELECT 1 FROM product_public_category_product_template_rel ppcrel
-                        WHERE ppcrel.product_template_id = pt.id
-                          AND ppcrel.product_public_category_id = ANY(%s)
-                    )
-                  )
-                  AND (%s IS NULL OR %s != 0 OR pt.categ_id = %s)
-                  {priority_cond}
-            """.format(priority_cond=priority_condition)
-            
-            params = [
-                plan.date_from,
-                plan.date_to,
-                plan.id,
-                achievement.type,
-                achievement.type,
-                plan.company_id.id,
-                achievement.product_id.id or None,
-                achievement.product_id.id or None,
-                len(achievement_category_ids),  # Usa longitud para saber si hay categorías
-                achievement_category_ids or [0],  # Array de IDs (incluye categoría padre e hijas)
-                achievement.product_categ_id.id or None,
-                len(achievement_category_ids),  # Usa longitud para lógica condicional
-                achievement.product_categ_id.id or None,
-            ]
-            
-            # Agregar parámetros de prioridad si existen
-            params.extend(priority_params)
-            
-            cr.execute(query, params)
-            result = cr.fetchone()
-            return result[0] if result else 0.0
-        
-        return 0.0
+                  AND line.display_type = 'product'
+                  %(product_filter)s
+                GROUP BY a.id
+            ) totals
+            GROUP BY achievement_id
+            """,
+            **achievement_columns,
+            categ_achievement_ids=categ_achievement_ids,
+            categ_ids=categ_ids,
+            product_filter=product_filter,
+        ))
+        return dict(self.env.cr.fetchall())
 
-    @api.depends('plan_id', 'type', 'product_id', 'product_categ_id', 'public_categ_id', 
+    @api.depends('plan_id', 'type', 'product_id', 'product_categ_id', 'public_categ_id',
                  'plan_id.date_from', 'plan_id.date_to')
     def _compute_actual_amount(self):
         """
         Calcula el monto real alcanzado en ventas o facturas según el tipo de logro.
-        
-        Este método usa consultas SQL optimizadas con CTEs (Common Table Expressions) para
-        calcular eficientemente el monto alcanzado considerando:
+
+        Todos los logros del recordset (de todos sus planes) se calculan con una
+        sola consulta SQL agrupada por logro (ver _compute_actual_amounts_sql),
+        considerando:
         - Tipo de logro (amount_sold, qty_sold, amount_invoiced, qty_invoiced)
         - Filtros de producto y categoría
         - Rango de fechas del plan
         - Lógica de categoría prioritaria (de parámetros de configuración)
-        
+
         IMPORTANTE - Dependencia de Parámetros de Configuración:
         Este método lee el parámetro 'mandatory_category_id' mediante _get_priority_category_safely().
         Como @api.depends no puede detectar cambios en ir.config_parameter, el campo usa
         store=False para asegurar que se recalcula en cada acceso, reflejando siempre la
         configuración actual del sistema.
-        
-        Para forzar recálculo después de cambiar parámetros de configuración, se puede:
-        1. Recargar la vista (F5) - el campo se recalculará automáticamente
-        2. Invalidar caché: self.env['sale.commission.plan.achievement'].invalidate_cache()
-        
+
+        Caché opcional: si el parámetro 'actual_amount_cache_ttl' es mayor que 0, los
+        montos se conservan esos segundos por worker, con una clave que incluye el
+        logro, el plan, sus write_date y la categoría prioritaria; solo los nuevos
+        pedidos y facturas tardan hasta ese tiempo en reflejarse.
+
         Returns:
             None: Actualiza el campo actual_amount de cada registro con el monto calculado.
-            
-        Optimización:
-        Usa SQL directo con CTEs en lugar de iteración Python para procesar miles de
-        transacciones de forma eficiente (100-1000x más rápido que ORM puro).
         """
         # Obtener la categoría prioritaria una sola vez para todos los achievements
         # NOTA: Este valor proviene de ir.config_parameter y puede cambiar sin disparar depends
         priority_category = self._get_priority_category_safely()
         priority_category_id = priority_category.id if priority_category else None
-        
+        cache_ttl = self._get_actual_amount_cache_ttl()
+        now = time.monotonic()
+
+        to_compute = self.browse()
         for achievement in self:
-            # Si el achievement no tiene plan o no está configurado completamente, retornar 0
-            if not achievement.plan_id or not achievement.type:
-                achievement.actual_amount = 0.0
+            achievement.actual_amount = 0.0
+            # Si el achievement no tiene plan o no está configurado completamente, queda en 0
+            # (también los registros nuevos sin guardar, que no tienen id)
+            if not achievement._origin.id or not achievement.plan_id._origin.id or not achievement.type:
                 continue
-            
             # Si el plan no tiene fechas, no se puede calcular
             if not achievement.plan_id.date_from or not achievement.plan_id.date_to:
-                achievement.actual_amount = 0.0
                 continue
-            
-            # Usar savepoint para aislar posibles errores SQL sin afectar la transacción principal
-            # SEGURIDAD: Usar nombre estático para savepoint en lugar de incluir IDs dinámicos
-            savepoint_name = 'compute_actual_amount_savepoint'
-            try:
-                self.env.cr.execute('SAVEPOINT ' + savepoint_name)
-                # Usar método SQL optimizado en lugar de iteración Python
-                achievement.actual_amount = self._compute_actual_amount_sql(achievement, priority_category_id)
-                self.env.cr.execute('RELEASE SAVEPOINT ' + savepoint_name)
-            except Exception as e:
-                # Rollback al savepoint sin afectar la transacción principal
-                self.env.cr.execute('ROLLBACK TO SAVEPOINT ' + savepoint_name)
-                _logger.error(
-                    "Error al calcular actual_amount para achievement %s (tipo: %s, plan: %s): %s. "
-                    "El achievement se establecerá en 0.0",
-                    achievement.id, achievement.type, achievement.plan_id.name if achievement.plan_id else 'N/A', 
-                    e, exc_info=True
-                )
-                # Asignar 0 en caso de error para no romper la UI
-                achievement.actual_amount = 0.0
+            if cache_ttl:
+                key = self._get_actual_amount_cache_key(achievement, priority_category_id)
+                with _actual_amount_cache_lock:
+                    cached = _actual_amount_cache.get(key)
+                if cached and now - cached[1] < cache_ttl:
+                    achievement.actual_amount = cached[0]
+                    continue
+            to_compute |= achievement
+
+        if not to_compute:
+            return
+
+        try:
+            # Aislar posibles errores SQL sin afectar la transacción principal
+            with self.env.cr.savepoint(flush=False):
+                amounts = to_compute._compute_actual_amounts_sql(priority_category_id)
+        except Exception as e:
+            _logger.error(
+                "Error al calcular actual_amount para los achievements %s: %s. "
+                "Los achievements se establecerán en 0.0",
+                to_compute._origin.ids, e, exc_info=True
+            )
+            # Dejar 0 en caso de error para no romper la UI
+            return
+
+        for achievement in to_compute:
+            amount = amounts.get(achievement._origin.id) or 0.0
+            achievement.actual_amount = amount
+            if cache_ttl:
+                key = self._get_actual_amount_cache_key(achievement, priority_category_id)
+                with _actual_amount_cache_lock:
+                    _actual_amount_cache[key] = (amount, now)
+
+        if cache_ttl:
+            # Descartar los montos vencidos para acotar la memoria del worker
+            with _actual_amount_cache_lock:
+                for key in [key for key, (_amount, timestamp) in _actual_amount_cache.items()
+                            if now - timestamp >= cache_ttl]:
+                    del _actual_amount_cache[key]
 
     @api.depends('actual_amount', 'target_amount')
     def _compute_achievement_percentage(self):
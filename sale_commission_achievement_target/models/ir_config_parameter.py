@@ -0,0 +1,40 @@
+from odoo import api, models
+
+# Parameters read by the commission collection report query
+COLLECTION_REPORT_PARAMS = {
+    "sale_commission_achievement_target.on_time_commission_rate",
+    "sale_commission_achievement_target.collection_grace_days",
+    "sale_commission_achievement_target.mandatory_category_id",
+}
+
+
+class IrConfigParameter(models.Model):
+    """
+    Request a full rebuild of the commission collection report when one of the
+    parameters of its query changes.
+    """
+
+    _inherit = "ir.config_parameter"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        if COLLECTION_REPORT_PARAMS.intersection(records.mapped("key")):
+            self.env["sale.commission.collection.report"]._request_full_refresh()
+        return records
+
+    def write(self, vals):
+        keys = set(self.mapped("key"))
+        if "key" in vals:
+            keys.add(vals["key"])
+        res = super().write(vals)
+        if COLLECTION_REPORT_PARAMS.intersection(keys):
+            self.env["sale.commission.collection.report"]._request_full_refresh()
+        return res
+
+    def unlink(self):
+        keys = set(self.mapped("key"))
+        res = super().unlink()
+        if COLLECTION_REPORT_PARAMS.intersection(keys):
+            self.env["sale.commission.collection.report"]._request_full_refresh()
+        return res
@@ -1,8 +1,37 @@
-from odoo import models, fields, _
+from odoo import api, models, fields, _
+from odoo.exceptions import AccessError
+from odoo.tools import SQL
+from odoo.tools.sql import TableKind, drop_view_if_exists, table_kind
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Columnas materializadas del reporte, en el orden de la consulta de cálculo
+REPORT_COLUMNS = [
+    "partial_reconcile_id",
+    "invoice_id",
+    "payment_id",
+    "plan_id",
+    "user_id",
+    "partner_id",
+    "company_id",
+    "currency_id",
+    "collected_amount",
+    "on_time_commission_amount",
+    "target_commission_amount",
+    "total_commission",
+    "public_categ_id",
+    "category_collected_amount",
+    "target_amount",
+    "target_achieved",
+    "commission_rate",
+    "payment_date",
+    "invoice_date_due",
+    "effective_due_date",
+    "is_on_time",
+    "promotion_requirement_met",
+]
+
 
 class SaleCommissionCollectionReport(models.Model):
     """
@@ -14,25 +43,45 @@ class SaleCommissionCollectionReport(models.Model):
     - Additional category-based commissions when targets are met
     - Validates mandatory promotion category requirements
     - Prorates partial payments across invoice products by category
+
+    The rows are materialized in an indexed table instead of being derived on
+    every read. A cron refreshes them incrementally: only the salespeople with
+    partial reconciliations queued since the last refresh (or removed since
+    the last refresh) are recomputed, since every aggregate of the report
+    (category totals, targets, promotion requirement) is per salesperson.
+    Changes of the plans, their achievements or the commission parameters
+    request a full rebuild, also available on demand.
     """
 
     _name = "sale.commission.collection.report"
     _description = "Commission Report Based on Collections"
-    _auto = False
+    _log_access = False
     _order = "payment_date desc, id desc"
 
     # ==== Identification Fields ====
     partial_reconcile_id = fields.Many2one(
-        "account.partial.reconcile", string="Partial reconciliation", readonly=True
+        "account.partial.reconcile",
+        string="Partial reconciliation",
+        readonly=True,
+        index=True,
+        ondelete="set null",
+        help="Empty when the reconciliation was removed: the rows of the "
+        "salesperson are recomputed in the next refresh",
     )
     invoice_id = fields.Many2one("account.move", string="Invoice", readonly=True)
     payment_id = fields.Many2one("account.payment", string="Payment", readonly=True)
 
     # ==== Plan and User Fields ====
     plan_id = fields.Many2one(
-        "sale.commission.plan", string="Commission plan", readonly=True
+        "sale.commission.plan",
+        string="Commission plan",
+        readonly=True,
+        index=True,
+        ondelete="cascade",
+    )
+    user_id = fields.Many2one(
+        "res.users", string="Salesperson", readonly=True, index=True
     )
-    user_id = fields.Many2one("res.users", string="Salesperson", readonly=True)
     partner_id = fields.Many2one("res.partner", string="Customer", readonly=True)
 
     # ==== Amount Fields ====
@@ -91,7 +140,7 @@ class SaleCommissionCollectionReport(models.Model):
     )
 
     # ==== Date and Time Control Fields ====
-    payment_date = fields.Date(string="Payment date", readonly=True)
+    payment_date = fields.Date(string="Payment date", readonly=True, index=True)
     invoice_date_due = fields.Date(string="Original due date", readonly=True)
     effective_due_date = fields.Date(
         string="Effective due date",
@@ -111,21 +160,180 @@ class SaleCommissionCollectionReport(models.Model):
         help="Indicates if the promotion requirement was met (mandatory)",
     )
 
-    @property
-    def _table_query(self):
+    _user_payment_date_idx = models.Index("(user_id, payment_date)")
+
+    # ==== Refresh Parameters ====
+    FULL_REFRESH_PARAM = "sale_commission_achievement_target.collection_report_full_refresh"
+
+    def _auto_init(self):
+        """
+        Drop the SQL view of the previous versions of the report: the rows are
+        now stored in a table with the same name.
+        """
+        if table_kind(self.env.cr, self._table) == TableKind.View:
+            drop_view_if_exists(self.env.cr, self._table)
+        return super()._auto_init()
+
+    # ==== Refresh Methods ====
+    @api.model
+    def _insert_report_rows(self, user_ids=None):
         """
-        Generate the SQL query for the virtual table.
+        Compute the report rows with the collection commission query and store them.
 
-        This property returns the complete SQL query that defines the structure
-        and data of this report model. Uses CTEs for better performance and
-        readability.
+        Args:
+            user_ids (list|None): Only compute the rows of these salespeople (None = all)
+        """
+        columns = SQL(", ").join(SQL.identifier(column) for column in REPORT_COLUMNS)
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO sale_commission_collection_report (%(columns)s)
+            SELECT %(columns)s
+              FROM (%(query)s) AS q
+            """,
+            columns=columns,
+            query=self._get_collection_commission_query(user_ids),
+        ))
+        return self.env.cr.rowcount
+
+    @api.model
+    def _refresh_report(self, full=False):
+        """
+        Refresh the materialized report.
+
+        The incremental refresh recomputes every row of the salespeople of the
+        queued partial reconciliations (current salesperson of the invoice and
+        salesperson of its existing rows), and of the rows whose reconciliation
+        was removed. The queue is consumed with the snapshot of the refresh:
+        the reconciliations committed after it stay queued for the next run,
+        whatever their id. The full refresh recomputes the table.
+
+        Args:
+            full (bool): Rebuild the whole table
+        """
+        IrConfigParam = self.env["ir.config_parameter"].sudo()
+        cr = self.env.cr
+        self.env.flush_all()
+        # Serialize the refreshes with an advisory lock: a table lock would also
+        # block the "set null" of the rows when a reconciliation is removed
+        cr.execute(SQL("SELECT pg_try_advisory_xact_lock(hashtext(%s))", self._table))
+        if not cr.fetchone()[0]:
+            _logger.info("Commission collection report is already being refreshed")
+            return
+
+        # Never refreshed yet (no parameter) or rebuild requested
+        full = full or IrConfigParam.get_param(self.FULL_REFRESH_PARAM) != "0"
+
+        cr.execute("DELETE FROM sale_commission_collection_queue RETURNING partial_reconcile_id")
+        queued_reconcile_ids = [row[0] for row in cr.fetchall()]
+
+        if full:
+            cr.execute("DELETE FROM sale_commission_collection_report")
+            row_count = self._insert_report_rows()
+            _logger.info("Commission collection report rebuilt: %s rows", row_count)
+        else:
+            # Salespeople of the queued reconciliations (either side of the reconciliation)
+            cr.execute(SQL(
+                """
+                SELECT am.invoice_user_id
+                  FROM account_partial_reconcile apr
+                  JOIN account_move_line aml ON aml.id IN (apr.debit_move_id, apr.credit_move_id)
+                  JOIN account_move am ON am.id = aml.move_id
+                 WHERE apr.id = ANY(%(reconcile_ids)s)
+                   AND am.invoice_user_id IS NOT NULL
+                 UNION
+                SELECT user_id
+                  FROM sale_commission_collection_report
+                 WHERE partial_reconcile_id IS NULL
+                    OR partial_reconcile_id = ANY(%(reconcile_ids)s)
+                """,
+                reconcile_ids=queued_reconcile_ids,
+            ))
+            user_ids = [row[0] for row in cr.fetchall()]
+            if user_ids:
+                cr.execute(SQL(
+                    """
+                    DELETE FROM sale_commission_collection_report
+                     WHERE user_id = ANY(%s) OR partial_reconcile_id IS NULL
+                    """,
+                    user_ids,
+                ))
+                row_count = self._insert_report_rows(user_ids)
+                _logger.info(
+                    "Commission collection report refreshed for %s salespeople: %s rows",
+                    len(user_ids),
+                    row_count,
+                )
+
+        if full:
+            IrConfigParam.set_param(self.FULL_REFRESH_PARAM, "0")
+        self.invalidate_model()
+
+    @api.model
+    def _request_full_refresh(self):
+        """Schedule a full rebuild of the report in the next cron run."""
+        self.env["ir.config_parameter"].sudo().set_param(self.FULL_REFRESH_PARAM, "1")
+        cron = self.env.ref(
+            "sale_commission_achievement_target.ir_cron_refresh_commission_collection_report",
+            raise_if_not_found=False,
+        )
+        # The cron does not exist yet while the module data is being loaded
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _cron_refresh_report(self):
+        """Incremental refresh of the report (full if a rebuild was requested)."""
+        self._refresh_report()
+
+    @api.model
+    def action_rebuild_report(self):
+        """
+        Rebuild the whole report on demand (after changing the commission
+        parameters, for example). The rebuild runs in the refresh cron.
+        """
+        if not self.env.user.has_group("sales_team.group_sale_manager"):
+            raise AccessError(_("Only sales managers can rebuild the commission report."))
+        self._request_full_refresh()
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Report Rebuild Scheduled"),
+                "message": _("The commission report will be rebuilt in the background in a few minutes."),
+                "type": "info",
+                "sticky": False,
+            },
+        }
+
+    def _get_collection_plan_bounds(self, user_ids=None):
+        """
+        Get the widest date range of the active plan users.
+
+        The range is pushed down into the reconciliation CTE so that only the
+        reconciliations (and their invoices) of the plans periods are read.
+
+        Args:
+            user_ids (list|None): Only consider these salespeople (None = all)
 
         Returns:
-            str: SQL query as string
+            tuple: (date_from, date_to), (None, None) if there is no active plan user
         """
-        return self._get_collection_commission_query()
+        self.env.cr.execute(SQL(
+            """
+            SELECT MIN(COALESCE(scpu.date_from, scp.date_from)),
+                   MAX(COALESCE(scpu.date_to, scp.date_to))
+              FROM sale_commission_plan_user scpu
+              JOIN sale_commission_plan scp ON scp.id = scpu.plan_id
+             WHERE scp.active = true
+               AND scp.state = 'approved'
+               AND scp.type = 'achieve'
+               %(user_filter)s
+            """,
+            user_filter=SQL("AND scpu.user_id = ANY(%s)", list(user_ids)) if user_ids is not None else SQL(),
+        ))
+        return self.env.cr.fetchone()
 
-    def _get_collection_commission_query(self):
+    def _get_collection_commission_query(self, user_ids=None):
         """
         Build the complete SQL query for commission calculations based on collections.
 
@@ -138,8 +346,15 @@ class SaleCommissionCollectionReport(models.Model):
         6. Validate mandatory promotion category requirement
         7. Calculate final commissions
 
+        The plan date range and the plan users are pushed down into the
+        reconciliation, invoice and product distribution CTEs, so only the
+        reconciliations of the plans periods and their invoices are read.
+
+        Args:
+            user_ids (list|None): Only compute the rows of these salespeople (None = all)
+
         Returns:
-            str: Complete SQL query as string
+            SQL: Complete SQL query
         """
         IrConfigParam = self.env["ir.config_parameter"].sudo()
 
@@ -209,17 +424,20 @@ class SaleCommissionCollectionReport(models.Model):
                 )
 
         # Build promotion validation SQL
-        promotion_validation_sql = ""
+        promotion_validation_sql = SQL()
+        promotion_condition_sql = SQL()
+        promotion_requirement_sql = SQL("true")
+        promotion_join_sql = SQL()
         if mandatory_category_id:
-            validated_mandatory_id = str(int(mandatory_category_id))
-            promotion_validation_sql = f"""
+            promotion_validation_sql = SQL(
+                """
                 , promotion_category_validation AS (
                     SELECT
                         ca.plan_id,
                         ca.user_id,
                         BOOL_AND(
                             CASE
-                                WHEN ca.public_categ_id = {validated_mandatory_id}
+                                WHEN ca.public_categ_id = %s
                                 THEN ca.target_achieved
                                 ELSE true
                             END
@@ -227,15 +445,21 @@ class SaleCommissionCollectionReport(models.Model):
                     FROM category_achievement ca
                     GROUP BY ca.plan_id, ca.user_id
                 )
-            """
+                """,
+                int(mandatory_category_id),
+            )
+            promotion_condition_sql = SQL("AND pcv.promotion_requirement_met")
+            promotion_requirement_sql = SQL("COALESCE(pcv.promotion_requirement_met, false)")
+            promotion_join_sql = SQL(
+                "LEFT JOIN promotion_category_validation pcv ON pcv.user_id = otc.user_id AND pcv.plan_id = pu.plan_id"
+            )
 
-        # Validated parameters for SQL
-        validated_on_time_rate = str(float(on_time_rate))
-        validated_grace_days = str(int(grace_days))
+        # Widest period of the plans: bounds of the reconciliations to read
+        date_from, date_to = self._get_collection_plan_bounds(user_ids)
 
-        query = (
-            f"""
-            WITH 
+        return SQL(
+            """
+            WITH
             -- Get active commission plans with their date ranges
             active_plans AS (
                 SELECT
@@ -258,25 +482,7 @@ class SaleCommissionCollectionReport(models.Model):
                     COALESCE(scpu.date_to, ap.date_to) as date_to
                 FROM sale_commission_plan_user scpu
                 JOIN active_plans ap ON ap.plan_id = scpu.plan_id
-            ),
-            -- Get invoice details with effective due date
-            invoice_details AS (
-                SELECT
-                    am.id as invoice_id,
-                    am.invoice_user_id as user_id,
-                    am.partner_id,
-                    am.company_id,
-                    rc.id as currency_id,
-                    am.invoice_date_due,
-                    -- Calculate effective due date: invoice_date_due + grace_days
-                    am.invoice_date_due + INTERVAL '{validated_grace_days} days' as effective_due_date,
-                    am.move_type,
-                    am.state
-                FROM account_move am
-                JOIN res_company rcomp ON am.company_id = rcomp.id
-                JOIN res_currency rc ON rcomp.currency_id = rc.id
-                WHERE am.move_type IN ('out_invoice', 'out_refund')
-                  AND am.state = 'posted'
+                WHERE %(plan_user_filter)s
             ),
             -- Get payment reconciliations with invoice and payment data
             -- Note: This assumes standard Odoo reconciliation pattern where:
@@ -285,6 +491,7 @@ class SaleCommissionCollectionReport(models.Model):
             --   - Credit notes (out_refund) are handled in the on_time_commission CTE
             -- For more complex scenarios (e.g., credit note reconciliations), consider using
             -- dynamic move identification based on account_type checks on both sides.
+            -- Only the reconciliations within the plans periods are read.
             payment_reconciliations AS (
                 SELECT
                     apr.id as partial_reconcile_id,
@@ -302,8 +509,32 @@ class SaleCommissionCollectionReport(models.Model):
                 JOIN account_account aa ON invoice_aml.account_id = aa.id
                 WHERE aa.account_type = 'asset_receivable'
                   AND apr.amount > 0
+                  AND apr.max_date BETWEEN %(date_from)s AND %(date_to)s
+            ),
+            -- Get invoice details with effective due date
+            -- (only the invoices of plan users reconciled within the plans periods)
+            invoice_details AS (
+                SELECT
+                    am.id as invoice_id,
+                    am.invoice_user_id as user_id,
+                    am.partner_id,
+                    am.company_id,
+                    rc.id as currency_id,
+                    am.invoice_date_due,
+                    -- Calculate effective due date: invoice_date_due + grace_days
+                    am.invoice_date_due + %(grace_days)s * INTERVAL '1 day' as effective_due_date,
+                    am.move_type,
+                    am.state
+                FROM account_move am
+                JOIN res_company rcomp ON am.company_id = rcomp.id
+                JOIN res_currency rc ON rcomp.currency_id = rc.id
+                WHERE am.move_type IN ('out_invoice', 'out_refund')
+                  AND am.state = 'posted'
+                  AND am.id IN (SELECT pr.payment_move_id FROM payment_reconciliations pr)
+                  AND am.invoice_user_id IN (SELECT pu.user_id FROM plan_users pu)
             ),
             -- Calculate product weight distribution per invoice
+            -- (whole invoices are read, so the weights are not affected by the pruning)
             invoice_product_distribution AS (
                 SELECT
                     aml.move_id as invoice_id,
@@ -319,6 +550,7 @@ class SaleCommissionCollectionReport(models.Model):
                 JOIN product_product pp ON aml.product_id = pp.id
                 WHERE aml.display_type = 'product'
                   AND aml.price_subtotal != 0
+                  AND aml.move_id IN (SELECT inv.invoice_id FROM invoice_details inv)
             ),
             -- Categorize products by public category
             product_categories AS (
@@ -331,7 +563,7 @@ class SaleCommissionCollectionReport(models.Model):
                     ipd.price_subtotal
                 FROM invoice_product_distribution ipd
                 JOIN product_template pt ON ipd.product_tmpl_id = pt.id
-                JOIN product_public_category_product_template_rel ppcrel 
+                JOIN product_public_category_product_template_rel ppcrel
                     ON pt.id = ppcrel.product_template_id
             ),
             -- Calculate on-time commission and prorate amounts by category
@@ -361,8 +593,8 @@ class SaleCommissionCollectionReport(models.Model):
                     CASE
                         WHEN pr.payment_date <= inv.effective_due_date THEN
                             CASE
-                                WHEN inv.move_type = 'out_refund' THEN -1 * pr.reconcile_amount * pc.product_weight * {validated_on_time_rate}
-                                ELSE pr.reconcile_amount * pc.product_weight * {validated_on_time_rate}
+                                WHEN inv.move_type = 'out_refund' THEN -1 * pr.reconcile_amount * pc.product_weight * %(on_time_rate)s
+                                ELSE pr.reconcile_amount * pc.product_weight * %(on_time_rate)s
                             END
                         ELSE 0
                     END as on_time_commission
@@ -370,6 +602,15 @@ class SaleCommissionCollectionReport(models.Model):
                 JOIN invoice_details inv ON pr.payment_move_id = inv.invoice_id
                 JOIN product_categories pc ON pc.invoice_id = inv.invoice_id
             ),
+            -- Payment of the payment moves (join instead of a subquery per row)
+            payment_moves AS (
+                SELECT
+                    ap.move_id,
+                    MIN(ap.id) as payment_id
+                FROM account_payment ap
+                WHERE ap.move_id IN (SELECT otc.payment_move_id FROM on_time_commission otc)
+                GROUP BY ap.move_id
+            ),
             -- Aggregate collected amounts by user and category
             user_category_totals AS (
                 SELECT
@@ -399,23 +640,22 @@ class SaleCommissionCollectionReport(models.Model):
                 FROM sale_commission_plan_achievement scpa
                 JOIN active_plans ap ON ap.plan_id = scpa.plan_id
                 JOIN plan_users pu ON pu.plan_id = ap.plan_id
-                LEFT JOIN user_category_totals uct 
-                    ON uct.user_id = pu.user_id 
+                LEFT JOIN user_category_totals uct
+                    ON uct.user_id = pu.user_id
                     AND uct.public_categ_id = scpa.public_categ_id
                     AND uct.company_id = ap.company_id
                 WHERE scpa.public_categ_id IS NOT NULL
                   AND scpa.target_amount > 0
-            ){promotion_validation_sql}
+            )%(promotion_validation)s
             -- Final commission calculation
             SELECT
                 -- Generate unique ID
-                (otc.partial_reconcile_id::bigint * 1000000 + 
-                 COALESCE(otc.public_categ_id, 0)::bigint * 100 + 
+                (otc.partial_reconcile_id::bigint * 1000000 +
+                 COALESCE(otc.public_categ_id, 0)::bigint * 100 +
                  COALESCE(pu.plan_id, 0)::bigint)::bigint as id,
                 otc.partial_reconcile_id,
                 otc.invoice_id,
-                -- Get payment_id from payment move if it exists
-                (SELECT ap.id FROM account_payment ap WHERE ap.move_id = otc.payment_move_id LIMIT 1) as payment_id,
+                pm.payment_id,
                 pu.plan_id,
                 otc.user_id,
                 otc.partner_id,
@@ -425,19 +665,15 @@ class SaleCommissionCollectionReport(models.Model):
                 otc.on_time_commission as on_time_commission_amount,
                 -- Calculate target commission
                 CASE
-                    WHEN ca.target_achieved"""
-            + (f" AND pcv.promotion_requirement_met" if mandatory_category_id else "")
-            + f"""
+                    WHEN ca.target_achieved %(promotion_condition)s
                         AND otc.is_on_time = true
                     THEN otc.category_collected_amount * ca.commission_rate
                     ELSE 0
                 END as target_commission_amount,
                 -- Calculate total commission
-                otc.on_time_commission + 
+                otc.on_time_commission +
                 CASE
-                    WHEN ca.target_achieved"""
-            + (f" AND pcv.promotion_requirement_met" if mandatory_category_id else "")
-            + f"""
+                    WHEN ca.target_achieved %(promotion_condition)s
                         AND otc.is_on_time = true
                     THEN otc.category_collected_amount * ca.commission_rate
                     ELSE 0
@@ -451,50 +687,59 @@ class SaleCommissionCollectionReport(models.Model):
                 otc.invoice_date_due,
                 otc.effective_due_date,
                 otc.is_on_time,
-                """
-            + (
-                f"COALESCE(pcv.promotion_requirement_met, false)"
-                if mandatory_category_id
-                else "true"
-            )
-            + f""" as promotion_requirement_met
+                %(promotion_requirement)s as promotion_requirement_met
             FROM on_time_commission otc
             JOIN plan_users pu ON pu.user_id = otc.user_id
             JOIN invoice_details inv ON otc.invoice_id = inv.invoice_id
-            LEFT JOIN category_achievement ca 
-                ON ca.user_id = otc.user_id 
+            LEFT JOIN payment_moves pm ON pm.move_id = otc.payment_move_id
+            LEFT JOIN category_achievement ca
+                ON ca.user_id = otc.user_id
                 AND ca.public_categ_id = otc.public_categ_id
                 AND ca.plan_id = pu.plan_id
             LEFT JOIN user_category_totals uct
                 ON uct.user_id = otc.user_id
                 AND uct.public_categ_id = otc.public_categ_id
                 AND uct.company_id = inv.company_id
-            """
-            + (
-                f"LEFT JOIN promotion_category_validation pcv ON pcv.user_id = otc.user_id AND pcv.plan_id = pu.plan_id"
-                if mandatory_category_id
-                else ""
-            )
-            + f"""
+            %(promotion_join)s
             WHERE otc.payment_date BETWEEN pu.date_from AND pu.date_to
-        """
+            """,
+            plan_user_filter=SQL("scpu.user_id = ANY(%s)", list(user_ids)) if user_ids is not None else SQL("true"),
+            date_from=date_from,
+            date_to=date_to,
+            grace_days=int(grace_days),
+            on_time_rate=float(on_time_rate),
+            promotion_validation=promotion_validation_sql,
+            promotion_condition=promotion_condition_sql,
+            promotion_requirement=promotion_requirement_sql,
+            promotion_join=promotion_join_sql,
         )
 
-        return query
-
     def init(self):
         """
         Create database indexes for better performance.
 
-        Creates indexes on key fields used in the query joins and filters.
+        Creates indexes on key fields used in the query joins and filters,
+        including the partial indexes used by the pruned CTEs: reconciliations
+        by date, posted customer invoices by salesperson and product lines by
+        invoice.
         """
         self.env.cr.execute(
             """
-            CREATE INDEX IF NOT EXISTS account_partial_reconcile_amount_idx 
+            CREATE INDEX IF NOT EXISTS account_partial_reconcile_amount_idx
             ON account_partial_reconcile (amount) WHERE amount > 0;
-            
-            CREATE INDEX IF NOT EXISTS account_move_line_reconcile_idx 
+
+            CREATE INDEX IF NOT EXISTS account_move_line_reconcile_idx
             ON account_move_line (move_id, account_id) WHERE reconciled = false;
+
+            CREATE INDEX IF NOT EXISTS account_partial_reconcile_collection_date_idx
+            ON account_partial_reconcile (max_date) WHERE amount > 0;
+
+            CREATE INDEX IF NOT EXISTS account_move_collection_invoice_user_idx
+            ON account_move (invoice_user_id)
+            WHERE move_type IN ('out_invoice', 'out_refund') AND state = 'posted';
+
+            CREATE INDEX IF NOT EXISTS account_move_line_collection_product_idx
+            ON account_move_line (move_id) WHERE display_type = 'product';
         """
         )
         super().init()
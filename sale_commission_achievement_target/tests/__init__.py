@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import test_collection_report_query
+from . import test_collection_report_refresh
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import json
+from datetime import date
+
+from odoo.fields import Command
+from odoo.tests.common import tagged
+from odoo.tools import SQL
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCollectionReportQuery(AccountTestInvoicingCommon):
+    """
+    Regresión del plan de la consulta del reporte de comisiones por recaudo:
+    con un plan de un mes, account_move_line solo debe leerse por índice
+    (las fechas y los usuarios del plan se aplican dentro de los CTEs).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.salesperson = cls.env['res.users'].create({
+            'name': 'Collection Salesperson',
+            'login': 'collection_salesperson',
+            'group_ids': [Command.link(cls.env.ref('sales_team.group_sale_salesman').id)],
+        })
+        cls.plan = cls.env['sale.commission.plan'].create({
+            'name': 'One month plan',
+            'company_id': cls.env.company.id,
+            'date_from': date(2025, 1, 1),
+            'date_to': date(2025, 1, 31),
+            'periodicity': 'month',
+            'type': 'achieve',
+            'user_type': 'person',
+            'user_ids': [Command.create({'user_id': cls.salesperson.id})],
+            'achievement_ids': [Command.create({'type': 'amount_invoiced', 'rate': 0.05})],
+        })
+        cls.plan.action_approve()
+
+    def _get_seq_scanned_relations(self, node):
+        """Relaciones leídas con un Seq Scan en el plan (recursivo)"""
+        relations = set()
+        if node.get('Node Type') == 'Seq Scan':
+            relations.add(node.get('Relation Name'))
+        for child in node.get('Plans', []):
+            relations |= self._get_seq_scanned_relations(child)
+        return relations
+
+    def test_one_month_plan_does_not_seq_scan_move_lines(self):
+        Report = self.env['sale.commission.collection.report']
+        self.env.flush_all()
+        # Con las tablas de prueba casi vacías un Seq Scan siempre es más
+        # barato: desactivarlo deja ver si existe un camino por índice
+        self.env.cr.execute("SET LOCAL enable_seqscan = off")
+        self.env.cr.execute(SQL(
+            "EXPLAIN (FORMAT JSON) %s",
+            Report._get_collection_commission_query(),
+        ))
+        plan = self.env.cr.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        self.env.cr.execute("SET LOCAL enable_seqscan = on")
+
+        self.assertNotIn('account_move_line', self._get_seq_scanned_relations(plan[0]['Plan']))
+
+    def test_plan_bounds(self):
+        Report = self.env['sale.commission.collection.report']
+        self.assertEqual(
+            Report._get_collection_plan_bounds([self.salesperson.id]),
+            (date(2025, 1, 1), date(2025, 1, 31)),
+        )
+        self.assertEqual(
+            Report._get_collection_plan_bounds([self.env.user.id]),
+            (None, None),
+        )
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+from odoo.fields import Command
+from odoo.tests.common import tagged
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCollectionReportRefresh(AccountTestInvoicingCommon):
+    """
+    Refresco incremental del reporte materializado de comisiones por recaudo:
+    las conciliaciones encoladas agregan filas, las eliminadas las quitan y el
+    cambio de vendedor de una factura las mueve al nuevo vendedor.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        salesman_group = cls.env.ref('sales_team.group_sale_salesman')
+        cls.salesperson = cls.env['res.users'].create({
+            'name': 'Refresh Salesperson',
+            'login': 'refresh_salesperson',
+            'group_ids': [Command.link(salesman_group.id)],
+        })
+        cls.other_salesperson = cls.env['res.users'].create({
+            'name': 'Other Refresh Salesperson',
+            'login': 'other_refresh_salesperson',
+            'group_ids': [Command.link(salesman_group.id)],
+        })
+        cls.public_category = cls.env['product.public.category'].create({'name': 'Refresh Category'})
+        cls.product = cls.env['product.product'].create({
+            'name': 'Refresh Product',
+            'lst_price': 1000.0,
+            'public_categ_ids': [Command.link(cls.public_category.id)],
+        })
+        cls.plan = cls.env['sale.commission.plan'].create({
+            'name': 'Refresh plan',
+            'company_id': cls.env.company.id,
+            'date_from': date(2025, 1, 1),
+            'date_to': date(2025, 1, 31),
+            'periodicity': 'month',
+            'type': 'achieve',
+            'user_type': 'person',
+            'user_ids': [
+                Command.create({'user_id': cls.salesperson.id}),
+                Command.create({'user_id': cls.other_salesperson.id}),
+            ],
+            'achievement_ids': [Command.create({'type': 'amount_invoiced', 'rate': 0.05})],
+        })
+        cls.plan.action_approve()
+
+    def setUp(self):
+        super().setUp()
+        self.Report = self.env['sale.commission.collection.report']
+        # Punto de partida: reporte completo y cola vacía
+        self.Report._refresh_report(full=True)
+
+    def _create_paid_invoice(self):
+        invoice = self.init_invoice(
+            'out_invoice', partner=self.partner_a, invoice_date='2025-01-05', products=self.product,
+        )
+        invoice.invoice_user_id = self.salesperson
+        invoice.action_post()
+        self.env['account.payment.register'].with_context(
+            active_model='account.move', active_ids=invoice.ids,
+        ).create({'payment_date': date(2025, 1, 10)})._create_payments()
+        return invoice
+
+    def _get_invoice_rows(self, invoice):
+        return self.Report.search([('invoice_id', '=', invoice.id)])
+
+    def test_01_new_reconciliation_adds_rows(self):
+        invoice = self._create_paid_invoice()
+        self.assertFalse(self._get_invoice_rows(invoice), "The rows appear on the next refresh")
+
+        self.Report._refresh_report()
+
+        rows = self._get_invoice_rows(invoice)
+        self.assertTrue(rows)
+        self.assertEqual(rows.user_id, self.salesperson)
+        self.assertEqual(rows.partial_reconcile_id, invoice.line_ids.matched_credit_ids)
+        self.assertFalse(self.env['sale.commission.collection.queue'].search_count([]))
+
+    def test_02_unreconcile_removes_rows(self):
+        invoice = self._create_paid_invoice()
+        self.Report._refresh_report()
+        self.assertTrue(self._get_invoice_rows(invoice))
+
+        invoice.line_ids.remove_move_reconcile()
+        self.Report._refresh_report()
+
+        self.assertFalse(self._get_invoice_rows(invoice))
+        self.assertFalse(self.Report.search_count([('partial_reconcile_id', '=', False)]))
+
+    def test_03_salesperson_change_moves_rows(self):
+        invoice = self._create_paid_invoice()
+        self.Report._refresh_report()
+
+        invoice.invoice_user_id = self.other_salesperson
+        self.Report._refresh_report()
+
+        rows = self._get_invoice_rows(invoice)
+        self.assertTrue(rows)
+        self.assertEqual(rows.user_id, self.other_salesperson)
+        self.assertFalse(self.Report.search_count([('user_id', '=', self.salesperson.id)]))